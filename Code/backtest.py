@@ -0,0 +1,249 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from Code.price_store import PriceStore
+from Code.garch_models import fit_garch_batch, standardize_residuals
+from Code.ranks import pseudo_observations
+from Code.copula_models import fit_vine_copula, simulate_joint_returns
+from Code.vecm_views import fit_vecm, generate_views
+from Code.black_litterman import compute_equilibrium_return, scenario_posterior
+from Code.optimization import PortfolioOptimizer
+
+STRATEGIES = ["Max Sharpe", "Min CVaR", "Max STARR"]
+
+DEFAULT_CONFIG = {
+    "window": 500,           # nombre de dates de prix utilisées à chaque rebalancement
+    "rebalance_every": 21,   # fréquence de rebalancement (jours de bourse)
+    "n_sim": 1000,           # scénarios simulés par la copule
+    "alpha": 0.01,           # niveau de la CVaR
+    "tau": 0.05,
+    "delta": 2.5,
+    "seed": 0,
+}
+
+CHECKPOINT_SUBDIR = "dates"
+RUN_FILE = "run.json"
+
+# État propre à chaque processus du pool : la base de prix est ouverte une seule fois
+# par processus, en np.memmap (les pages sont partagées entre processus, aucune copie),
+# et l'optimiseur garde ses problèmes compilés d'une date à l'autre.
+_worker = {}
+
+
+def _init_worker(store_path, config):
+    _worker["closes"] = PriceStore(store_path).closes()
+    _worker["config"] = config
+    _worker["optimizer"] = PortfolioOptimizer()
+
+
+def _date_seeds(seed, position):
+    """
+    Graines de la simulation pour une date : identiques quel que soit le processus
+    ou l'ordre d'exécution, donc une reprise redonne les mêmes poids.
+    """
+    return (np.random.SeedSequence([seed, position]).generate_state(4) >> 1).tolist()  # entiers signés 32 bits
+
+
+def _rebalance(position):
+    """
+    Chaîne complète GARCH → Vine → VECM → Black–Litterman → optimisation,
+    avec uniquement les prix connus à la date de rang position.
+
+    Output:
+        dict : date et poids de chaque stratégie
+    """
+    closes = _worker["closes"]
+    config = _worker["config"]
+    optimizer = _worker["optimizer"]
+
+    prices = closes.iloc[position - config["window"] + 1:position + 1]
+    returns = np.log(prices / prices.shift(1)).dropna()
+
+    residuals, sigmas, _ = fit_garch_batch(returns, n_jobs=1)
+    standardized = standardize_residuals(residuals, sigmas)
+    pseudo_obs = pseudo_observations(pd.DataFrame(standardized, index=returns.index, columns=returns.columns))
+    vine = fit_vine_copula(pseudo_obs)
+    all_sigmas = pd.DataFrame(sigmas, index=returns.index, columns=returns.columns)
+    sim_returns = simulate_joint_returns(vine, all_sigmas, returns, n_sim=config["n_sim"],
+                                         seeds=_date_seeds(config["seed"], position))
+
+    forecast = fit_vecm(prices)
+    P, q = generate_views(prices.iloc[-1], forecast)
+
+    cov_matrix = returns.cov().values
+    market_weights = np.ones(len(returns.columns)) / len(returns.columns)
+    pi = compute_equilibrium_return(cov_matrix, market_weights, delta=config["delta"])
+    scenarios, probs = scenario_posterior(sim_returns.to_numpy(dtype=float), pi, cov_matrix, P, q,
+                                          tau=config["tau"])
+
+    w_sharpe, _, _ = optimizer.max_sharpe(scenarios, probs=probs)
+    w_cvar, _ = optimizer.min_cvar(scenarios, alpha=config["alpha"], probs=probs)
+    w_starr, _, _ = optimizer.max_starr(scenarios, alpha=config["alpha"], probs=probs)
+
+    return {
+        "date": str(prices.index[-1].date()),
+        "weights": {name: np.asarray(w, dtype=float).tolist()
+                    for name, w in zip(STRATEGIES, [w_sharpe, w_cvar, w_starr])},
+    }
+
+
+def run_key(config, tickers):
+    """
+    Empreinte d'un backtest : paramètres complets (dont window et rebalance_every) et univers.
+    Les points de reprise sont rangés sous cette clé : un autre paramétrage ne réutilise
+    jamais les poids d'un précédent.
+    """
+    content = json.dumps({"config": config, "tickers": list(tickers)}, sort_keys=True, default=str)
+    return hashlib.sha256(content.encode()).hexdigest()[:16]
+
+
+def _run_dir(checkpoint_dir, key):
+    return os.path.join(checkpoint_dir, CHECKPOINT_SUBDIR, key)
+
+
+def _checkpoint_path(checkpoint_dir, key, date):
+    return os.path.join(_run_dir(checkpoint_dir, key), f"{date}.json")
+
+
+def _open_run(checkpoint_dir, key, config, tickers):
+    """
+    Crée le dossier des points de reprise d'un paramétrage, ou vérifie à la reprise que
+    celui qui existe a bien été calculé avec les mêmes paramètres et le même univers.
+    """
+    run_dir = _run_dir(checkpoint_dir, key)
+    os.makedirs(run_dir, exist_ok=True)
+    run = {"key": key, "config": config, "tickers": list(tickers)}
+    path = os.path.join(run_dir, RUN_FILE)
+    if os.path.exists(path):
+        with open(path) as f:
+            saved = json.load(f)
+        if json.dumps(saved, sort_keys=True, default=str) != json.dumps(run, sort_keys=True, default=str):
+            raise ValueError(f"Points de reprise de {run_dir} calculés avec un autre paramétrage")
+        return
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(run, f, default=str)
+    os.replace(tmp_path, path)
+
+
+def _load_checkpoint(checkpoint_dir, key, date):
+    with open(_checkpoint_path(checkpoint_dir, key, date)) as f:
+        result = json.load(f)
+    if result.get("run") != key:
+        raise ValueError(f"Point de reprise du {date} issu d'un autre paramétrage")
+    return result
+
+
+def _save_checkpoint(checkpoint_dir, key, result):
+    """
+    Écriture atomique (fichier temporaire puis renommage) : une interruption ne laisse
+    jamais de fichier de date à moitié écrit.
+    """
+    result = {**result, "run": key}
+    path = _checkpoint_path(checkpoint_dir, key, result["date"])
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(result, f)
+    os.replace(tmp_path, path)
+
+
+def rebalance_positions(n_rows, window, rebalance_every):
+    """
+    Rangs des dates de rebalancement : dès que window dates de prix sont disponibles,
+    puis toutes les rebalance_every dates.
+    """
+    return list(range(window - 1, n_rows, rebalance_every))
+
+
+def run_backtest(store, checkpoint_dir="Output/backtest", config=None, n_jobs=None, cost_bps=0.0):
+    """
+    Backtest walk-forward : à chaque date de rebalancement, la chaîne complète est
+    ré-estimée sur la fenêtre glissante, puis les poids sont conservés jusqu'à la date suivante.
+
+    Les dates sont indépendantes et réparties sur un pool de processus ; chaque processus
+    lit les prix dans la base mappée en mémoire (PriceStore). Chaque date terminée est
+    sauvegardée dans checkpoint_dir/dates/<clé> (cf. run_key) : relancer le backtest avec
+    les mêmes paramètres reprend là où il s'est arrêté, un autre paramétrage repart de zéro.
+
+    Inputs:
+        store : PriceStore contenant les prix de clôture
+        checkpoint_dir : dossier des points de reprise et des résultats
+        config : paramètres (défaut : DEFAULT_CONFIG)
+        n_jobs : nombre de processus (défaut : nombre de coeurs, 1 = exécution séquentielle)
+        cost_bps : coûts de transaction en points de base, appliqués au turnover
+
+    Output:
+        dict de DataFrames : weights (index (date, stratégie), colonnes = actifs),
+        turnover et pnl (index = date, colonnes = stratégies)
+    """
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    key = run_key(config, store.tickers)
+    _open_run(checkpoint_dir, key, config, store.tickers)
+
+    dates = store.dates()
+    positions = rebalance_positions(store.n_rows, config["window"], config["rebalance_every"])
+    pending = [pos for pos in positions
+               if not os.path.exists(_checkpoint_path(checkpoint_dir, key, str(dates[pos].date())))]
+    print(f"\n Backtest {key} : {len(positions)} dates de rebalancement, "
+          f"{len(positions) - len(pending)} déjà calculées.")
+
+    n_jobs = min(n_jobs or os.cpu_count() or 1, max(len(pending), 1))
+    if n_jobs <= 1:
+        _init_worker(store.path, config)
+        for pos in tqdm(pending):
+            _save_checkpoint(checkpoint_dir, key, _rebalance(pos))
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                 initargs=(store.path, config)) as pool:
+            futures = [pool.submit(_rebalance, pos) for pos in pending]
+            for future in tqdm(as_completed(futures), total=len(futures)):
+                _save_checkpoint(checkpoint_dir, key, future.result())
+
+    results = backtest_results(store, checkpoint_dir, key, [dates[pos] for pos in positions], cost_bps)
+    results["weights"].to_csv(os.path.join(checkpoint_dir, "weights.csv"))
+    results["turnover"].to_csv(os.path.join(checkpoint_dir, "turnover.csv"))
+    results["pnl"].to_csv(os.path.join(checkpoint_dir, "pnl.csv"))
+    return results
+
+
+def backtest_results(store, checkpoint_dir, key, rebalance_dates, cost_bps=0.0):
+    """
+    Assemble les points de reprise du paramétrage key (cf. run_key) : poids, turnover
+    (Σ|w_t - w_{t-1}|, le premier rebalancement part du cash) et P&L réalisé de chaque période de détention
+    (poids conservés jusqu'à la date de rebalancement suivante, ou la dernière date de la base).
+    """
+    closes = store.closes()
+    tickers = list(closes.columns)
+
+    weights = {}
+    for date in rebalance_dates:
+        weights[date] = _load_checkpoint(checkpoint_dir, key, str(date.date()))["weights"]
+
+    index = pd.DatetimeIndex(rebalance_dates, name="Date")
+    turnover = pd.DataFrame(index=index, columns=STRATEGIES, dtype=float)
+    pnl = pd.DataFrame(index=index, columns=STRATEGIES, dtype=float)
+    end_dates = list(rebalance_dates[1:]) + [closes.index[-1]]
+
+    for name in STRATEGIES:
+        previous = np.zeros(len(tickers))
+        for date, end in zip(rebalance_dates, end_dates):
+            w = np.asarray(weights[date][name])
+            turnover.loc[date, name] = np.abs(w - previous).sum()
+            period_return = closes.loc[end].to_numpy() / closes.loc[date].to_numpy() - 1
+            pnl.loc[date, name] = w @ period_return - cost_bps * 1e-4 * turnover.loc[date, name]
+            # dérive des poids pendant la période de détention
+            grown = w * (1 + period_return)
+            previous = grown / grown.sum()
+
+    weights_df = pd.DataFrame(
+        [weights[date][name] for date in rebalance_dates for name in STRATEGIES],
+        index=pd.MultiIndex.from_product([index, STRATEGIES], names=["Date", "Strategy"]),
+        columns=tickers,
+    )
+    return {"weights": weights_df, "turnover": turnover, "pnl": pnl}
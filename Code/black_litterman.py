@@ -1,5 +1,13 @@
+import warnings
+
 import numpy as np
 import pandas as pd
+from scipy.linalg import cho_factor, cho_solve
+from scipy.optimize import minimize
+from scipy.special import logsumexp
+
+from Code.covariance import FactorCovariance
+from Code.instrumentation import record_event
 
 def compute_equilibrium_return(cov_matrix, market_weights, delta=2.5):
     """
@@ -32,30 +40,266 @@ def compute_posterior(pi, cov, P, q, tau=0.05, Omega=None):
         mu_post : rendements ajustés
         cov_post : covariance ajustée
     """
-    tau_sigma = tau * cov
+    # Résolution par facteur de Cholesky (pas d'inverse explicite), cf. compute_posterior_batch
+    mu_posts, cov_post = compute_posterior_batch(pi, cov, P, np.asarray(q).reshape(1, -1), tau=tau, Omega=Omega)
+
+    # 🧼 aplatir pour qu’il ait forme (n,)
+    mu_post = mu_posts[0]
+
+    return mu_post, cov_post
+
+def compute_posterior_batch(pi, cov, P, Q, tau=0.05, Omega=None, cov_factor=None, return_cov=True):
+    """
+    Black–Litterman pour plusieurs jeux de vues (même matrice P) en une passe vectorisée.
+
+    Les produits P·τΣ ne sont calculés qu'une fois, et la matrice (P τΣ Pᵀ + Ω) est
+    factorisée (Cholesky) puis utilisée en résolution de systèmes, jamais inversée.
+
+    Inputs:
+        pi : rendements d'équilibre (n,)
+        cov : matrice de covariance Σ (n, n) (peut être None si cov_factor est fourni et return_cov=False)
+        P : matrice des vues (k, n)
+        Q : matrice (m, k) des m vecteurs de vues
+        tau : incertitude sur le marché
+        Omega : None (auto : diag(P τΣ Pᵀ)), matrice (k, k) commune, ou pile (m, k, k)
+        cov_factor : facteur F tel que Σ = F Fᵀ (Cholesky ou modèle à facteurs, (n, r)), optionnel
+        return_cov : calculer aussi la (ou les) covariance(s) a posteriori
+
+    Outputs:
+        mu_posts : array (m, n) des rendements ajustés
+        cov_post : covariance ajustée (n, n) si Omega est commun, (m, n, n) sinon (None si return_cov=False)
+    """
+    pi = np.asarray(pi, dtype=float).flatten()
+    P = np.atleast_2d(np.asarray(P, dtype=float))
+    Q = np.atleast_2d(np.asarray(Q, dtype=float))
+
+    if isinstance(cov, FactorCovariance):
+        if Omega is None or np.ndim(Omega) < 3:
+            return _factor_posterior(pi, cov, P, Q, tau, Omega, return_cov)
+        cov = cov.dense()  # une matrice Ω par jeu de vues : chemin dense
+
+    # τ Σ Pᵀ (n, k) et P τΣ Pᵀ (k, k), calculés une seule fois
+    if cov_factor is not None:
+        PF = P @ cov_factor
+        sigma_Pt = tau * (cov_factor @ PF.T)
+        P_sigma_Pt = tau * (PF @ PF.T)
+    else:
+        sigma_Pt = tau * (cov @ P.T)
+        P_sigma_Pt = P @ sigma_Pt
 
     if Omega is None:
-        Omega = np.diag(np.diag(P @ tau_sigma @ P.T))
+        Omega = np.diag(np.diag(P_sigma_Pt))
+    Omega = np.asarray(Omega, dtype=float)
 
-    middle = np.linalg.inv(P @ tau_sigma @ P.T + Omega)
+    residual_views = (Q - P @ pi).T  # (k, m)
 
-    # ⚠️ correction ici : assure que pi est bien 2D colonne pour broadcast
-    pi = pi.reshape(-1, 1)
-    mu_post = pi + tau_sigma @ P.T @ middle @ (q - P @ pi)
+    if Omega.ndim == 2:
+        factor = cho_factor(P_sigma_Pt + Omega)
+        mu_posts = pi + (sigma_Pt @ cho_solve(factor, residual_views)).T
+        cov_post = None
+        if return_cov:
+            cov_post = _prior_cov(cov, cov_factor, tau) - sigma_Pt @ cho_solve(factor, sigma_Pt.T)
+        return mu_posts, cov_post
 
-    # 🧼 aplatir pour qu’il ait forme (n,)
-    mu_post = mu_post.flatten()
+    # Une matrice Ω par jeu de vues : résolutions batchées (m, k, k)
+    middle = P_sigma_Pt + Omega
+    solved_views = np.linalg.solve(middle, residual_views.T[:, :, None])[:, :, 0]  # (m, k)
+    mu_posts = pi + solved_views @ sigma_Pt.T
+    cov_post = None
+    if return_cov:
+        rhs = np.broadcast_to(sigma_Pt.T, (middle.shape[0],) + sigma_Pt.T.shape)
+        cov_post = _prior_cov(cov, cov_factor, tau) - sigma_Pt @ np.linalg.solve(middle, rhs)
+    return mu_posts, cov_post
+
+def _view_solver(cov, P, PB, tau, Omega):
+    """
+    Résolution de A y = r avec A = P τΣ Pᵀ + Ω = τ (PB)(PB)ᵀ + τ P D Pᵀ + Ω (k × k).
 
-    cov_post = cov + tau_sigma - tau_sigma @ P.T @ middle @ P @ tau_sigma
+    Si chaque actif apparaît dans au plus une vue (ex. P = identité) et Ω est diagonale,
+    τ P D Pᵀ + Ω est diagonale : A est elle-même facteurs + diagonale et se résout par
+    Woodbury en O(k · n_facteurs²). Sinon A est formée et factorisée (Cholesky).
+    """
+    one_view_per_asset = (np.count_nonzero(P, axis=0) <= 1).all()
+    if one_view_per_asset and Omega.ndim == 1:
+        return FactorCovariance(np.sqrt(tau) * PB, tau * (P ** 2) @ cov.specific + Omega).solve
+    omega = np.diag(Omega) if Omega.ndim == 1 else Omega
+    factor = cho_factor(tau * (PB @ PB.T + (P * cov.specific) @ P.T) + omega)
+    return lambda r: cho_solve(factor, r)
 
-    return mu_post, cov_post
+def _factor_posterior(pi, cov, P, Q, tau, Omega, return_cov):
+    """
+    compute_posterior_batch pour une covariance FactorCovariance : seuls des produits
+    Σ x (O(n · n_facteurs)) et un système de la taille des vues sont calculés.
+    """
+    PB = P @ cov.loadings
+    if Omega is None:
+        Omega = tau * (np.einsum("ij,ij->i", PB, PB) + (P ** 2) @ cov.specific)  # diag(P τΣ Pᵀ)
+    Omega = np.asarray(Omega, dtype=float)
+    if Omega.ndim == 2 and np.count_nonzero(Omega - np.diag(np.diag(Omega))) == 0:
+        Omega = np.diag(Omega).copy()
+    solve = _view_solver(cov, P, PB, tau, Omega)
+
+    residual_views = (Q - P @ pi).T  # (k, m)
+    mu_posts = pi + (tau * (cov @ (P.T @ solve(residual_views)))).T
+    cov_post = PosteriorCovariance(cov, P, Omega, tau, solve) if return_cov else None
+    return mu_posts, cov_post
+
+class PosteriorCovariance:
+    """
+    Covariance a posteriori Black–Litterman pour un a priori FactorCovariance, gardée
+    sous forme implicite : Σ_post = (1 + τ) Σ - τΣPᵀ A⁻¹ P τΣ, A = P τΣ Pᵀ + Ω.
+
+    Produits Σ_post x et tirages N(0, Σ_post) en O(n · n_facteurs) par vecteur, sans
+    matrice n × n ; dense() la forme explicitement si nécessaire.
+    """
 
-def generate_posterior_returns(mu_post, cov_post, n_sim=1000):
+    def __init__(self, prior, P, Omega, tau, solve):
+        self.prior = prior
+        self.P = P
+        self.Omega = Omega
+        self.tau = tau
+        self._solve = solve
+
+    @property
+    def shape(self):
+        return self.prior.shape
+
+    def __matmul__(self, x):
+        sigma_x = self.prior @ np.asarray(x, dtype=float)
+        return (1 + self.tau) * sigma_x - self.tau ** 2 * (self.prior @ (self.P.T @ self._solve(self.P @ sigma_x)))
+
+    def sample(self, n_sim, rng=None):
+        """
+        Tirages N(0, Σ_post) (règle de Matheron) : ε + θ - τΣPᵀ A⁻¹ (P θ + ν), avec
+        ε ~ N(0, Σ), θ ~ N(0, τΣ), ν ~ N(0, Ω) ; le dernier terme retire exactement
+        la part de l'incertitude de l'a priori expliquée par les vues.
+        """
+        rng = np.random.default_rng(rng)
+        eps = self.prior.sample(n_sim, rng)
+        theta = np.sqrt(self.tau) * self.prior.sample(n_sim, rng)
+        k = self.P.shape[0]
+        if self.Omega.ndim == 1:
+            nu = rng.standard_normal((n_sim, k)) * np.sqrt(self.Omega)
+        else:
+            nu = rng.standard_normal((n_sim, k)) @ np.linalg.cholesky(self.Omega).T
+        correction = self.tau * (self.prior @ (self.P.T @ self._solve((theta @ self.P.T + nu).T)))
+        return eps + theta - correction.T
+
+    def dense(self):
+        sigma = self.prior.dense()
+        sigma_Pt = self.tau * (sigma @ self.P.T)
+        return (1 + self.tau) * sigma - sigma_Pt @ self._solve(sigma_Pt.T)
+
+    def __array__(self, dtype=None, copy=None):
+        return self.dense() if dtype is None else self.dense().astype(dtype)
+
+def _prior_cov(cov, cov_factor, tau):
+    """
+    (1 + τ) Σ, à partir de Σ ou de son facteur.
+    """
+    if cov is None:
+        cov = cov_factor @ cov_factor.T
+    return (1 + tau) * cov
+
+def generate_posterior_returns(mu_post, cov_post, n_sim=1000, rng=None):
     """
     Génère des rendements simulés selon la distribution postérieure.
+    rng : np.random.Generator, SeedSequence ou graine pour un tirage reproductible
+          (défaut : nouveau générateur, jamais l'état global de numpy ; cf.
+          scenario_service.ScenarioService pour des tirages en cache)
 
     Output : DataFrame (n_sim, n_assets)
     """
     mu_post = mu_post.flatten()  
-    sim = np.random.multivariate_normal(mu_post, cov_post, size=n_sim)
+    if isinstance(cov_post, PosteriorCovariance):
+        # a priori à facteurs : tirages sans matrice n × n (cf. PosteriorCovariance.sample)
+        return mu_post + cov_post.sample(n_sim, rng)
+    sim = np.random.default_rng(rng).multivariate_normal(mu_post, cov_post, size=n_sim)
     return sim
+
+def entropy_pooling(scenarios, A, b, prior_probs=None, tol=1e-6):
+    """
+    Entropy pooling (Meucci) : probabilités des scénarios les plus proches (entropie
+    relative) des probabilités a priori, sous les contraintes de vues E_p[A x] = b.
+
+    Inputs:
+        scenarios : array (n_sim, n_assets) de rendements simulés
+        A : matrice (k, n_assets) des portefeuilles de vues
+        b : vecteur (k,) des espérances visées
+        prior_probs : probabilités a priori (défaut : équipondérées)
+        tol : écart maximal toléré |E_p[A x] - b|, en écarts-types de chaque vue
+
+    Output:
+        probs : vecteur (n_sim,) des probabilités a posteriori
+
+    Lève RuntimeError si les vues ne sont pas atteintes (ex. une espérance visée hors de
+    l'intervalle des scénarios : le problème dual n'a alors pas de minimum).
+    """
+    n = scenarios.shape[0]
+    log_p0 = np.log(prior_probs) if prior_probs is not None else np.full(n, -np.log(n))
+    b = np.asarray(b, dtype=float).flatten()
+
+    # Mise à l'échelle des contraintes pour un problème dual bien conditionné
+    g = scenarios @ np.asarray(A, dtype=float).T
+    scale = g.std(axis=0)
+    scale[scale == 0] = 1.0
+    g = g / scale
+    b = b / scale
+
+    def dual(lam):
+        log_p = log_p0 + g @ lam
+        log_z = logsumexp(log_p)
+        p = np.exp(log_p - log_z)
+        return log_z - lam @ b, p.T @ g - b
+
+    def hess(lam):
+        log_p = log_p0 + g @ lam
+        p = np.exp(log_p - logsumexp(log_p))
+        centered = g - p @ g
+        return (centered * p[:, None]).T @ centered
+
+    # le gradient du dual est l'écart aux vues : on le pousse bien sous tol
+    res = minimize(dual, np.zeros(g.shape[1]), jac=True, hess=hess, method="trust-exact",
+                   options={"gtol": tol * 1e-2})
+    log_p = log_p0 + g @ res.x
+    probs = np.exp(log_p - logsumexp(log_p))
+
+    residual = np.abs(probs @ g - b).max(initial=0.0)
+    record_event("entropy_pooling", success=bool(res.success), iterations=int(res.nit), residual=float(residual))
+    if not np.isfinite(residual) or residual > tol:
+        raise RuntimeError(f"Entropy pooling : vues non atteintes (écart {residual:.2e} écart-type, "
+                           f"{res.message})")
+    return probs
+
+def scenario_posterior(scenarios, pi, cov, P, q, tau=0.05, Omega=None, method="reweight"):
+    """
+    Black–Litterman sur scénarios : la moyenne postérieure BL (compute_posterior) est
+    imposée directement aux scénarios de la copule, sans nouvelle simulation gaussienne,
+    ce qui conserve les queues et la dépendance de queue de la Vine.
+
+    Inputs:
+        scenarios : array (n_sim, n_assets) des rendements simulés par la copule
+        pi, cov, P, q, tau, Omega : mêmes entrées que compute_posterior
+        method : "reweight" (entropy pooling : nouvelles probabilités des scénarios ;
+                 si les vues sont hors d'atteinte des scénarios, avertissement et repli
+                 sur une translation d'une copie des scénarios)
+                 ou "shift" (translation des scénarios, modifiés sur place)
+
+    Outputs:
+        scenarios : scénarios a posteriori (le même tableau si method="shift")
+        probs : probabilités des scénarios (None si équipondérés)
+    """
+    mu_post, _ = compute_posterior(pi, cov, P, q, tau=tau, Omega=Omega)
+    view_targets = P @ mu_post
+
+    if method == "reweight":
+        try:
+            probs = entropy_pooling(scenarios, P, view_targets)
+        except RuntimeError as error:
+            warnings.warn(f"{error} : repli sur la translation des scénarios", RuntimeWarning)
+            return scenarios + (mu_post - scenarios.mean(axis=0)), None
+        return scenarios, probs
+    if method == "shift":
+        scenarios += mu_post - scenarios.mean(axis=0)
+        return scenarios, None
+    raise ValueError(f"Méthode non supportée : {method}")
@@ -1,33 +1,21 @@
 import os
-import pandas as pd
+import sys
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Code.price_store import PriceStore
 
 # 📁 Dossier contenant les fichiers CSV de chaque actif
 data_folder = "Data/"
 files = ["BNP.csv", "Airbus.csv", "Deutsche.csv", "Enel.csv", "LVMH.csv", "Sanofi.csv"]
 
-all_prices = {}
-
-for file in files:
-    ticker = file.replace(".csv", "")
-    path = os.path.join(data_folder, file)
-
-    # Chargement des données
-    df = pd.read_csv(path, parse_dates=True)
-    
-    # Vérification du nom de la colonne "Date" si nécessaire
-    if 'Date' in df.columns:
-        df['Date'] = pd.to_datetime(df['Date'])
-        df.set_index('Date', inplace=True)
-
-    # Stocker la série des prix "Close"
-    all_prices[ticker] = df["Close"]
-
-# 🔁 Combinaison des séries et suppression des dates incomplètes
-prices_df = pd.DataFrame(all_prices).dropna()
+# 🔁 Ingestion unique des CSV dans la base mappée en mémoire (dates communes uniquement)
+store = PriceStore.ingest_csvs(data_folder, files, os.path.join(data_folder, "store"))
+prices_df = store.closes()
 
-# 💾 Sauvegarde du fichier CSV
+# 💾 Export CSV (lecture humaine / compatibilité) à partir de la base
 output_path = "Data/prices_aligned.csv"
 prices_df.to_csv(output_path)
 
+print(f"✅ Base de prix créée : {store.path} ({store.n_rows} dates)")
 print(f"✅ Fichier sauvegardé : {output_path}")
 print(prices_df.head())
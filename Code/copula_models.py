@@ -62,31 +62,69 @@ def plot_real_vs_simulated(u1, u2, copula, copula_name=""):
     plt.tight_layout()
     plt.show()
 
-def fit_vine_copula(u_data):
+VINE_FAMILIES = [
+    BicopFamily.clayton,
+    BicopFamily.frank,
+    BicopFamily.gumbel,
+    BicopFamily.gaussian,
+    BicopFamily.student
+]
+
+def fit_vine_copula(u_data, trunc_lvl="auto", num_threads=1):
     """
     Ajuste une Vine Copula multivariée à partir des pseudo-observations [0,1]^d.
     Compatible avec les versions récentes de pyvinecopulib.
+
+    Inputs:
+        u_data : DataFrame (ou array) des pseudo-observations
+        trunc_lvl : "auto" (niveau de troncature choisi par le critère mBICV : les arbres
+                    supérieurs, coûteux et peu informatifs en grande dimension, sont omis),
+                    un entier (troncature fixe) ou None (Vine complète)
+        num_threads : nombre de threads du backend C++ pour l'ajustement des copules d'un arbre
     """
-    u = np.asfortranarray(u_data.values)  # Format attendu par le backend C++
+    u = np.asfortranarray(np.asarray(u_data, dtype=float))  # Format attendu par le backend C++
+
+    options = {"select_trunc_lvl": True} if trunc_lvl == "auto" else {}
+    if trunc_lvl not in ("auto", None):
+        options["trunc_lvl"] = int(trunc_lvl)
 
     control = FitControlsVinecop(
-        family_set=[
-            BicopFamily.clayton,
-            BicopFamily.frank,
-            BicopFamily.gumbel,
-            BicopFamily.gaussian,
-            BicopFamily.student
-        ],
+        family_set=VINE_FAMILIES,
         selection_criterion="mbicv",
-        trunc_lvl=0
+        num_threads=num_threads,
+        **options
     )
 
     vine = Vinecop(d=u.shape[1])
-    vine.select(data=u, controls=control)
+    vine.select(u, controls=control)
 
     return vine
 
-def simulate_joint_returns(vine_copula, sigmas_dict, residuals_dict, n_sim=1000):
+def refit_vine_parameters(vine, u_data, num_threads=1):
+    """
+    Ré-estime uniquement les paramètres des copules de paires d'une Vine déjà ajustée :
+    la structure (arbre R-vine), les familles et la troncature sont conservées.
+    """
+    u = np.asfortranarray(np.asarray(u_data, dtype=float))
+    control = FitControlsVinecop(select_families=False, num_threads=num_threads)
+    vine.select(u, controls=control)
+    return vine
+
+def save_vine(vine, filepath):
+    """
+    Sauvegarde une Vine ajustée (structure, familles et paramètres) au format JSON.
+    """
+    with open(filepath, "w") as f:
+        f.write(vine.to_json())
+
+def load_vine(filepath):
+    """
+    Recharge une Vine sauvegardée par save_vine.
+    """
+    with open(filepath) as f:
+        return Vinecop.from_json(f.read())
+
+def simulate_joint_returns(vine_copula, sigmas_dict, residuals_dict, n_sim=1000, seeds=None, marginals=None):
     """
     Simule des rendements multivariés conditionnels à partir :
     - d'une vine copula ajustée
@@ -97,16 +135,18 @@ def simulate_joint_returns(vine_copula, sigmas_dict, residuals_dict, n_sim=1000)
         sigmas_dict : dict des séries sigma_t (volatilités conditionnelles) par actif
         residuals_dict : dict des résidus GARCH par actif
         n_sim : nombre de simulations à générer
+        seeds : graines du générateur de la Vine (liste d'entiers, tirage aléatoire par défaut)
+        marginals : tables de quantiles des résidus (cf. marginals.fit_marginals), N(0,1) par défaut
 
     Output :
         DataFrame des rendements simulés de taille (n_sim, nb_actifs)
     """
     # Étape 1 : simulation dans l’espace [0,1]^d
-    u_sim = vine_copula.simulate(n_sim)  # shape (n_sim, d)
+    u_sim = vine_copula.simulate(n_sim, seeds=seeds)  # shape (n_sim, d)
     tickers = list(sigmas_dict.keys())
 
-    # Étape 2 : inversion des marges avec quantile normal (on suppose résidus ~ N(0,1))
-    z_sim = norm.ppf(u_sim)
+    # Étape 2 : inversion des marges (tables de quantiles, ou quantile normal si résidus ~ N(0,1))
+    z_sim = norm.ppf(u_sim) if marginals is None else marginals.ppf(u_sim)
 
     # Étape 3 : reconstruction des rendements simulés : r = z * sigma_t
     last_sigmas = np.array([sigmas_dict[ticker].iloc[-1] for ticker in tickers])
@@ -0,0 +1,212 @@
+import numpy as np
+from scipy.linalg import cho_factor, cho_solve
+
+COV_MODELS = ("sample", "pca", "ledoit_wolf")
+DEFAULT_N_FACTORS = 10
+
+# Taille des blocs de lignes pour les produits de Gram (T × T) de Ledoit–Wolf
+GRAM_BLOCK_SIZE = 2048
+
+
+class FactorCovariance:
+    """
+    Covariance à structure facteurs + diagonale : Σ = B Bᵀ + diag(d).
+
+    Stocke B (n_assets × k) et d (n_assets,) : O(n·k) mémoire au lieu de O(n²).
+    Σ x coûte O(n·k), et Σ⁻¹ x se calcule par la formule de Woodbury
+    (un système k × k), sans jamais former ni factoriser la matrice n × n.
+    Utilisable à la place d'une matrice de covariance dense dans
+    compute_equilibrium_return, compute_posterior et max_sharpe_portfolio.
+    """
+
+    def __init__(self, loadings, specific):
+        """
+        Inputs:
+            loadings : expositions aux facteurs B (n_assets, k)
+            specific : variances spécifiques d (n_assets,), strictement positives
+        """
+        self.loadings = np.asarray(loadings, dtype=float)
+        self.specific = np.asarray(specific, dtype=float)
+        self._woodbury = None
+
+    @property
+    def shape(self):
+        n = self.specific.shape[0]
+        return (n, n)
+
+    @property
+    def n_factors(self):
+        return self.loadings.shape[1]
+
+    def __matmul__(self, x):
+        """
+        Σ x pour un vecteur (n,) ou une matrice (n, m).
+        """
+        x = np.asarray(x, dtype=float)
+        d = self.specific if x.ndim == 1 else self.specific[:, None]
+        return self.loadings @ (self.loadings.T @ x) + d * x
+
+    def __mul__(self, scalar):
+        return FactorCovariance(np.sqrt(scalar) * self.loadings, scalar * self.specific)
+
+    __rmul__ = __mul__
+
+    def diagonal(self):
+        return np.einsum("ij,ij->i", self.loadings, self.loadings) + self.specific
+
+    def quad(self, w):
+        """
+        Variance wᵀ Σ w d'un portefeuille.
+        """
+        w = np.asarray(w, dtype=float)
+        return float(np.sum((self.loadings.T @ w) ** 2) + np.sum(self.specific * w ** 2))
+
+    def solve(self, x):
+        """
+        Σ⁻¹ x par Woodbury : D⁻¹x - D⁻¹B (I + Bᵀ D⁻¹ B)⁻¹ Bᵀ D⁻¹ x.
+        """
+        x = np.asarray(x, dtype=float)
+        inv_d = 1.0 / (self.specific if x.ndim == 1 else self.specific[:, None])
+        if self._woodbury is None:
+            scaled = self.loadings / self.specific[:, None]
+            self._woodbury = cho_factor(np.eye(self.n_factors) + self.loadings.T @ scaled)
+        y = inv_d * x
+        return y - (self.loadings @ cho_solve(self._woodbury, self.loadings.T @ y)) * inv_d
+
+    def sample(self, n_sim, rng=None):
+        """
+        Tirages N(0, Σ) : B z₁ + √d ∘ z₂, en O(n·k) par tirage.
+        """
+        rng = np.random.default_rng(rng)
+        n, k = self.loadings.shape
+        common = rng.standard_normal((n_sim, k)) @ self.loadings.T
+        return common + rng.standard_normal((n_sim, n)) * np.sqrt(self.specific)
+
+    def dense(self):
+        """
+        Matrice n × n (pour les petits univers ou les contrôles).
+        """
+        return self.loadings @ self.loadings.T + np.diag(self.specific)
+
+    def __array__(self, dtype=None, copy=None):
+        return self.dense() if dtype is None else self.dense().astype(dtype)
+
+
+def _centered(returns, probs):
+    """
+    Rendements centrés et pondérés √p (T, n) : Σ_échantillon = Xᵀ X.
+    """
+    x = np.asarray(returns, dtype=float)
+    T = x.shape[0]
+    p = np.full(T, 1.0 / (T - 1)) if probs is None else np.asarray(probs, dtype=float)
+    mean = np.average(x, axis=0, weights=None if probs is None else p)
+    if probs is not None:
+        # même normalisation que np.cov(..., aweights=probs)
+        p = p / (1 - np.sum(p ** 2))
+    return (x - mean) * np.sqrt(p)[:, None], p
+
+
+def _truncated_factors(x, n_factors):
+    """
+    Facteurs statistiques : k premières composantes principales de Xᵀ X (SVD de X).
+    """
+    _, s, vt = np.linalg.svd(x, full_matrices=False)
+    k = min(n_factors, s.size)
+    return vt[:k].T * s[:k]
+
+
+def pca_covariance(returns, n_factors=DEFAULT_N_FACTORS, probs=None):
+    """
+    Modèle à facteurs statistiques : les k premières composantes principales forment B,
+    la variance résiduelle de chaque actif forme d (la diagonale de Σ est conservée).
+
+    Inputs:
+        returns : array ou DataFrame (T, n_assets) des rendements (ou scénarios)
+        n_factors : nombre de facteurs k
+        probs : probabilités des observations (équipondérées par défaut)
+
+    Output:
+        FactorCovariance
+    """
+    x, _ = _centered(returns, probs)
+    variances = np.einsum("ij,ij->j", x, x)
+    B = _truncated_factors(x, n_factors)
+    specific = variances - np.einsum("ij,ij->i", B, B)
+    return FactorCovariance(B, np.maximum(specific, 1e-12 * variances.mean()))
+
+
+def _ledoit_wolf_intensity(x, p):
+    """
+    Intensité de rétrécissement de Ledoit–Wolf (2004) vers m·I, m = tr(S) / n, calculée
+    sans former S = Xᵀ X : ‖S‖²_F = ‖X Xᵀ‖²_F et xₜᵀ S xₜ / pₜ via le Gram X Xᵀ par blocs
+    (ou via S si n < T, le plus petit des deux).
+    """
+    T, n = x.shape
+    raw_sq = np.einsum("ij,ij->i", x, x) / p  # ‖rₜ‖² (rendements centrés non pondérés)
+    if T <= n:
+        quad = np.empty(T)
+        frob = 0.0
+        for start in range(0, T, GRAM_BLOCK_SIZE):
+            gram = x[start:start + GRAM_BLOCK_SIZE] @ x.T
+            frob += np.sum(gram ** 2)
+            quad[start:start + GRAM_BLOCK_SIZE] = np.sum(gram ** 2, axis=1)
+    else:
+        S = x.T @ x
+        frob = np.sum(S ** 2)
+        quad = np.einsum("ij,ij->i", x @ S, x)
+    quad = quad / p  # rₜᵀ S rₜ
+
+    trace = raw_sq @ p
+    m = trace / n
+    delta_sq = frob - n * m ** 2                            # ‖S - m I‖²_F
+    # b̄² = Σ pₜ² ‖rₜ rₜᵀ - S‖²_F
+    beta_sq = np.sum(p ** 2 * (raw_sq ** 2 - 2 * quad + frob))
+    shrinkage = min(beta_sq, delta_sq) / delta_sq if delta_sq > 0 else 1.0
+    return shrinkage, m
+
+
+def ledoit_wolf_covariance(returns, n_factors=None, probs=None):
+    """
+    Covariance de Ledoit–Wolf : (1 - s) S + s m I, avec s l'intensité optimale de
+    rétrécissement et m la variance moyenne, sous forme facteurs + diagonale
+    (B = √(1 - s) Xᵀ, d = s m) : aucune matrice n × n n'est formée si T ≤ n.
+
+    n_factors : tronque B à ses k premières composantes (la variance retirée est
+                reportée sur d, la diagonale de Σ est conservée)
+    """
+    x, p = _centered(returns, probs)
+    T, n = x.shape
+    shrinkage, m = _ledoit_wolf_intensity(x, p)
+    scaled = np.sqrt(1 - shrinkage) * x
+
+    if n_factors is None:
+        if T <= n:
+            return FactorCovariance(scaled.T, np.full(n, shrinkage * m))
+        n_factors = n
+    B = _truncated_factors(scaled, n_factors)
+    specific = shrinkage * m + np.einsum("ij,ij->j", scaled, scaled) - np.einsum("ij,ij->i", B, B)
+    return FactorCovariance(B, np.maximum(specific, 1e-12 * m))
+
+
+def estimate_covariance(returns, method="sample", n_factors=None, probs=None):
+    """
+    Estimateur de covariance des rendements.
+
+    Inputs:
+        returns : array ou DataFrame (T, n_assets)
+        method : "sample" (matrice dense, comme returns.cov()), "pca" (facteurs statistiques)
+                 ou "ledoit_wolf" (rétrécissement), ces deux derniers en FactorCovariance
+        n_factors : nombre de facteurs (défaut : DEFAULT_N_FACTORS pour "pca", rang
+                    complet pour "ledoit_wolf")
+        probs : probabilités des observations (équipondérées par défaut)
+
+    Output:
+        array (n, n) ou FactorCovariance
+    """
+    if method == "sample":
+        return np.cov(np.asarray(returns, dtype=float).T, aweights=probs)
+    if method == "pca":
+        return pca_covariance(returns, n_factors or DEFAULT_N_FACTORS, probs)
+    if method == "ledoit_wolf":
+        return ledoit_wolf_covariance(returns, n_factors, probs)
+    raise ValueError(f"Modèle de covariance non supporté : {method}")
@@ -0,0 +1,273 @@
+import warnings
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import linprog
+
+from Code.instrumentation import record_event
+
+# Nombre de scénarios traités par bloc lors des produits matrice-vecteur : la matrice
+# de scénarios (éventuellement un np.memmap) n'est jamais copiée en entier.
+DEFAULT_BLOCK_SIZE = 65_536
+
+# En dessous de ce nombre de scénarios, pas de résolution préalable sur sous-échantillon
+COARSE_MIN_SCENARIOS = 40_000
+
+# Tolérance relative d'arrondi sur alpha·n et sur les probabilités cumulées : alpha = 0.07
+# sur 100 scénarios donne alpha·n = 7.000000000000001, qui doit compter 7 scénarios
+VAR_TOLERANCE = 1e-9
+
+
+def _portfolio_losses(returns, w, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Pertes -Rw de chaque scénario, calculées par blocs de lignes
+    (w : vecteur de poids, ou matrice (n_assets, k) pour k portefeuilles).
+    """
+    n = returns.shape[0]
+    losses = np.empty((n,) + np.shape(w)[1:])
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        losses[start:stop] = -(returns[start:stop] @ w)
+    return losses
+
+
+def _mean_returns(returns, probs=None, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Rendement espéré de chaque actif (équipondéré ou pondéré par probs), par blocs.
+    """
+    n, d = returns.shape
+    total = np.zeros(d)
+    for start in range(0, n, block_size):
+        stop = min(start + block_size, n)
+        block = np.asarray(returns[start:stop], dtype=float)
+        total += block.sum(axis=0) if probs is None else probs[start:stop] @ block
+    return total / n if probs is None else total
+
+
+def var_rank(k, n):
+    """
+    Rang (0 = plus grande perte) de la VaR de scénarios équipondérés, k = alpha·n :
+    ⌈k⌉ - 1, la plus petite perte de la queue de probabilité alpha (la même que le
+    cas pondéré avec des probabilités uniformes).
+    """
+    return min(max(int(np.ceil(k * (1 - VAR_TOLERANCE))) - 1, 0), n - 1)
+
+
+def _tail_stats(losses, alpha=0.01, probs=None):
+    """
+    CVaR (Rockafellar–Uryasev) et VaR d'un vecteur de pertes.
+
+    La CVaR est la moyenne des pertes dans la queue de probabilité alpha : avec des
+    scénarios équipondérés, les alpha·n plus grandes pertes (sélection par np.partition),
+    la dernière étant comptée pour sa fraction. La VaR est la plus petite perte de cette
+    queue : la ⌈alpha·n⌉-ième plus grande perte (équipondéré), ou la première perte à
+    laquelle la probabilité cumulée des plus grandes pertes atteint alpha (pondéré).
+    """
+    n = losses.shape[0]
+
+    if probs is None:
+        k = alpha * n
+        m = var_rank(k, n)
+        tail = np.sort(np.partition(losses, n - m - 1)[n - m - 1:])[::-1]
+        tail_weights = np.full(m + 1, 1.0 / k)
+        tail_weights[m] = (k - m) / k
+    else:
+        order = np.argsort(losses)[::-1]
+        cum = np.cumsum(probs[order])
+        m = min(int(np.searchsorted(cum, alpha * (1 - VAR_TOLERANCE), side="left")), n - 1)
+        tail = losses[order[:m + 1]]
+        tail_weights = probs[order[:m + 1]] / alpha
+        tail_weights[m] = (alpha - (cum[m - 1] if m > 0 else 0.0)) / alpha
+
+    return tail_weights @ tail, tail[-1]
+
+
+def portfolio_cvar(returns, w, alpha=0.01, probs=None, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    CVaR (Rockafellar–Uryasev) et VaR du portefeuille w sur les scénarios.
+
+    Outputs:
+        cvar : valeur de la CVaR
+        var : valeur de la VaR (seuil de la queue)
+    """
+    return _tail_stats(_portfolio_losses(returns, w, block_size), alpha, probs)
+
+
+def risk_report(returns, weights, alpha=0.01, probs=None, block_size=DEFAULT_BLOCK_SIZE):
+    """
+    Statistiques de risque de plusieurs portefeuilles sur une matrice de scénarios,
+    lue par blocs (ex. fichier de scenario_generator.write_scenarios en np.memmap).
+    Cf. risk_analytics.evaluate_portfolios (ratio de Sharpe, richesse et drawdown).
+
+    Inputs:
+        returns : array ou np.memmap (n_scenarios, n_assets)
+        weights : DataFrame des poids (index = actifs, colonnes = portefeuilles)
+        alpha : niveau de la VaR / CVaR
+        probs : probabilités des scénarios (équipondérés par défaut)
+
+    Output:
+        DataFrame (index = portefeuilles) : mean, volatility, VaR, CVaR, STARR
+    """
+    from Code.risk_analytics import PORTFOLIO_BLOCK, evaluate_portfolios
+
+    block_bytes = 8 * block_size * min(weights.shape[1], PORTFOLIO_BLOCK)
+    report = evaluate_portfolios(returns, weights, alpha, probs=probs, block_bytes=block_bytes)
+    return report[["mean", "volatility", "VaR", "CVaR", "STARR"]]
+
+
+def _tail_candidates(losses, count):
+    """
+    Indices des count plus grandes pertes.
+    """
+    n = losses.shape[0]
+    count = min(count, n)
+    return np.argpartition(losses, n - count)[n - count:]
+
+
+def _tail_by_mass(losses, p, mass, count):
+    """
+    Indices des plus grandes pertes dont la probabilité cumulée atteint mass (toutes si
+    leur probabilité totale est inférieure), en partant des count plus grandes.
+    Avec des scénarios pondérés, un nombre fixe de scénarios peut porter moins que alpha
+    de la masse : le LP restreint est alors non borné (v → -∞).
+    """
+    n = losses.shape[0]
+    while True:
+        idx = _tail_candidates(losses, count)
+        idx = idx[np.argsort(-losses[idx], kind="stable")]
+        k = int(np.searchsorted(np.cumsum(p[idx]), mass))
+        if k < idx.size or count >= n:
+            return idx[:k + 1]
+        count = min(2 * count, n)
+
+
+def _solve_restricted_lp(R_S, p_S, mu, lambda_cvar, alpha, bounds):
+    """
+    LP de Rockafellar–Uryasev restreint aux scénarios S (les autres ont z = 0) :
+        min  -mu·w + λ (v + Σ_S p_i z_i / alpha)
+        s.c. z_i >= -r_i·w - v,  z >= 0,  Σ w = 1,  w dans bounds
+    Variables : [w (d), v, z (|S|)], matrice creuse construite directement pour HiGHS.
+    """
+    s, d = R_S.shape
+    c = np.concatenate([-mu, [lambda_cvar], lambda_cvar * p_S / alpha])
+
+    # -R_S w - v - z <= 0
+    A_ub = sparse.hstack([sparse.csr_matrix(-R_S), sparse.csr_matrix(-np.ones((s, 1))), -sparse.identity(s)],
+                         format="csr")
+    A_eq = sparse.csr_matrix(np.concatenate([np.ones(d), np.zeros(1 + s)])[None, :])
+    var_bounds = [bounds] * d + [(None, None)] + [(0, None)] * s
+
+    res = linprog(c, A_ub=A_ub, b_ub=np.zeros(s), A_eq=A_eq, b_eq=[1.0], bounds=var_bounds, method="highs")
+    if res.status != 0:
+        raise RuntimeError(f"Échec du LP CVaR : {res.message}")
+    return res.x[:d], res.x[d]
+
+
+def _active_set_cvar(returns, mu, lambda_cvar, alpha, probs, max_iter, block_size, bounds, w0=None):
+    """
+    Génération de scénarios : seul le LP restreint aux scénarios de queue est résolu.
+    Omettre des scénarios ne peut que baisser la CVaR, donc le LP restreint minore le
+    problème complet ; si aucun scénario exclu n'a une perte au-delà de la VaR trouvée,
+    la solution est optimale pour tous les scénarios. Sinon les scénarios violant la
+    contrainte sont ajoutés et le LP est résolu à nouveau (quelques itérations en pratique).
+    Chaque itération ne coûte qu'un produit matrice-vecteur sur l'ensemble des scénarios.
+    converged est faux si max_iter itérations n'ont pas suffi : w n'est alors optimal
+    que pour les scénarios retenus.
+
+    L'ensemble initial est la queue du portefeuille w0 : plus w0 est proche de l'optimum,
+    plus le LP reste petit et moins il faut d'itérations. Il est pris par probabilité
+    cumulée (2 · alpha de la masse), pas par nombre de scénarios : avec des probabilités
+    (entropy pooling), le LP restreint doit porter au moins alpha de la masse pour être borné.
+    """
+    n, d = returns.shape
+    p = np.full(n, 1.0 / n) if probs is None else np.asarray(probs, dtype=float)
+    mu = np.zeros(d) if mu is None else np.asarray(mu, dtype=float)
+    batch = max(int(np.ceil(alpha * n)), 1)
+
+    # Ensemble initial : queue de w0 (défaut : équipondéré) portant 2 · alpha de la masse
+    w = np.full(d, 1.0 / d) if w0 is None else w0
+    active = np.zeros(n, dtype=bool)
+    active[_tail_by_mass(_portfolio_losses(returns, w, block_size), p, 2 * alpha, 2 * batch)] = True
+
+    converged = False
+    for iteration in range(max_iter):
+        idx = np.flatnonzero(active)
+        w, var = _solve_restricted_lp(np.asarray(returns[idx], dtype=float), p[idx], mu, lambda_cvar, alpha,
+                                      bounds)
+        losses = _portfolio_losses(returns, w, block_size)
+        violated = ~active & (losses > var + 1e-12)
+        if not violated.any():
+            converged = True
+            break
+        # ajout des pires scénarios violés (au plus alpha de la masse par itération)
+        candidates = np.flatnonzero(violated)
+        active[candidates[_tail_by_mass(losses[candidates], p[candidates], alpha, batch)]] = True
+
+    cvar, _ = portfolio_cvar(returns, w, alpha, probs, block_size)
+    return w, cvar, iteration + 1, converged
+
+
+def _record_solve(problem, iterations, converged, value):
+    record_event("solver", problem=problem, solver="HIGHS (génération de scénarios)",
+                 status="optimal" if converged else "max_iter", iterations=iterations, value=value)
+    if not converged:
+        warnings.warn(f"{problem} : génération de scénarios non convergée après {iterations} itérations, "
+                      "solution optimale pour les seuls scénarios retenus", RuntimeWarning)
+
+
+def _coarse_start(returns, mu, lambda_cvar, alpha, probs, max_iter, block_size, bounds):
+    """
+    Point de départ obtenu en résolvant le même problème sur un sous-échantillon
+    (1/8 des scénarios, récursivement) : sur l'échantillon complet, la queue de ce
+    portefeuille est déjà presque la bonne et le LP converge en une ou deux itérations.
+    """
+    n = returns.shape[0]
+    if n < COARSE_MIN_SCENARIOS:
+        return None
+    rng = np.random.default_rng(0)
+    sub = np.sort(rng.choice(n, n // 8, replace=False))
+    sub_probs = None
+    if probs is not None:
+        sub_probs = probs[sub] / probs[sub].sum()
+    sub_returns = np.asarray(returns[sub], dtype=float)
+    w0 = _coarse_start(sub_returns, mu, lambda_cvar, alpha, sub_probs, max_iter, block_size, bounds)
+    w, _, _, _ = _active_set_cvar(sub_returns, mu, lambda_cvar, alpha, sub_probs, max_iter, block_size, bounds, w0)
+    return w
+
+
+def solve_min_cvar(returns, alpha=0.01, probs=None, max_iter=100,
+                   block_size=DEFAULT_BLOCK_SIZE, bounds=(0.0, 1.0)):
+    """
+    Minimise la CVaR empirique (long-only, somme des poids = 1) sans modèle cvxpy :
+    adapté à 100k+ scénarios (la matrice de scénarios peut être un np.memmap).
+
+    Outputs:
+        w : poids optimaux
+        cvar : CVaR du portefeuille
+    """
+    w0 = _coarse_start(returns, None, 1.0, alpha, probs, max_iter, block_size, bounds)
+    w, cvar, iterations, converged = _active_set_cvar(returns, None, 1.0, alpha, probs, max_iter, block_size,
+                                                      bounds, w0)
+    _record_solve("min_cvar", iterations, converged, cvar)
+    return w, cvar
+
+
+def solve_max_starr(returns, alpha=0.01, lambda_cvar=10, probs=None, max_iter=100,
+                    block_size=DEFAULT_BLOCK_SIZE, bounds=(0.0, 1.0), w0=None):
+    """
+    Maximise (rendement espéré - λ · CVaR), même objectif que max_starr_portfolio,
+    par génération de scénarios sur le LP de Rockafellar–Uryasev.
+    w0 : portefeuille de départ (ex. solution pour un λ voisin) dont la queue initialise le LP.
+
+    Outputs:
+        w : poids optimaux
+        mean_return : rendement espéré du portefeuille
+        cvar : CVaR du portefeuille
+    """
+    mu = _mean_returns(returns, probs, block_size)
+    if w0 is None:
+        w0 = _coarse_start(returns, mu, lambda_cvar, alpha, probs, max_iter, block_size, bounds)
+    w, cvar, iterations, converged = _active_set_cvar(returns, mu, lambda_cvar, alpha, probs, max_iter, block_size,
+                                                      bounds, w0)
+    _record_solve("max_starr", iterations, converged, mu @ w - lambda_cvar * cvar)
+    return w, mu @ w, cvar
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+from scipy.optimize import minimize_scalar
+
+from Code.optimization import PortfolioOptimizer, _covariance_factor
+from Code.cvar_solver import solve_max_starr
+
+# Grille par défaut de l'aversion au risque λ (échelle log), parcourue dans l'ordre
+# croissant : chaque point démarre à chaud de la solution du point voisin.
+DEFAULT_LAMBDAS = np.logspace(-3, 4, 29)
+
+
+def _sweep(evaluate, lambdas):
+    """
+    Évalue la frontière sur la grille (λ croissant).
+
+    Outputs:
+        frontier : DataFrame indexé par λ (mean, risk, ratio = mean / risk)
+        weights : array (len(lambdas), n_assets) des poids de chaque point
+    """
+    lambdas = np.sort(np.asarray(lambdas, dtype=float))
+    points = [evaluate(lam) for lam in lambdas]
+    frontier = pd.DataFrame({
+        "mean": [p[1] for p in points],
+        "risk": [p[2] for p in points],
+    }, index=pd.Index(lambdas, name="lambda"))
+    frontier["ratio"] = frontier["mean"] / frontier["risk"]
+    return frontier, np.array([np.array(p[0]) for p in points])
+
+
+def _max_ratio(evaluate, lambdas, xtol):
+    """
+    Recherche 1-D du ratio mean / risk maximal le long de la frontière : la grille
+    localise le maximum, puis une recherche bornée (en log λ) entre les deux points
+    voisins l'affine.
+
+    Outputs:
+        w, mean, risk, lam : point de ratio maximal
+        frontier : DataFrame de la grille
+    """
+    frontier, weights = _sweep(evaluate, lambdas)
+    grid = frontier.index.to_numpy()
+    best = int(np.nanargmax(frontier["ratio"].to_numpy()))
+    low, high = np.log(grid[max(best - 1, 0)]), np.log(grid[min(best + 1, len(grid) - 1)])
+
+    candidates = [(frontier["ratio"].iloc[best], weights[best], frontier["mean"].iloc[best],
+                   frontier["risk"].iloc[best], grid[best])]
+    if high > low:
+        def negative_ratio(log_lam):
+            w, mean, risk = evaluate(np.exp(log_lam))
+            candidates.append((mean / risk, np.array(w), mean, risk, np.exp(log_lam)))
+            return -mean / risk
+
+        minimize_scalar(negative_ratio, bounds=(low, high), method="bounded", options={"xatol": xtol})
+
+    _, w, mean, risk, lam = max(candidates, key=lambda c: c[0])
+    return w, mean, risk, lam, frontier
+
+
+def _mean_variance_evaluator(returns, probs, optimizer):
+    mu = np.average(returns, axis=0, weights=probs)
+    factor = _covariance_factor(np.cov(returns.T, aweights=probs))
+    optimizer = optimizer or PortfolioOptimizer()
+    return lambda lam: optimizer.mean_variance(mu, factor, lam)
+
+
+def _mean_cvar_evaluator(returns, alpha, probs, optimizer, solver):
+    if solver == "lp":
+        previous = {}
+
+        def evaluate(lam):
+            # la queue de la solution précédente (λ voisin) initialise le LP
+            w, mean, cvar = solve_max_starr(returns, alpha=alpha, lambda_cvar=lam, probs=probs,
+                                            w0=previous.get("w"))
+            previous["w"] = w
+            return w, mean, cvar
+        return evaluate
+
+    optimizer = optimizer or PortfolioOptimizer()
+    return lambda lam: optimizer.max_starr(returns, alpha=alpha, lambda_cvar=lam, probs=probs)
+
+
+def mean_variance_frontier(returns, lambdas=DEFAULT_LAMBDAS, probs=None, optimizer=None):
+    """
+    Frontière moyenne-variance : max μᵗw - λ·wᵗΣw pour chaque λ de la grille,
+    sur un seul problème compilé (PortfolioOptimizer) démarré à chaud d'un point à l'autre.
+
+    Outputs:
+        frontier : DataFrame indexé par λ (mean, risk = volatilité, ratio = Sharpe)
+        weights : array (len(lambdas), n_assets)
+    """
+    return _sweep(_mean_variance_evaluator(returns, probs, optimizer), lambdas)
+
+
+def mean_cvar_frontier(returns, lambdas=DEFAULT_LAMBDAS, alpha=0.01, probs=None, optimizer=None,
+                       solver="lp"):
+    """
+    Frontière moyenne-CVaR : max (mean - λ · CVaR) pour chaque λ de la grille.
+    solver="lp" (défaut) : solveur dédié (cvar_solver), initialisé par la solution du λ voisin ;
+    solver="cvxpy" : problème compilé une fois (PortfolioOptimizer).
+
+    Outputs:
+        frontier : DataFrame indexé par λ (mean, risk = CVaR, ratio = STARR)
+        weights : array (len(lambdas), n_assets)
+    """
+    return _sweep(_mean_cvar_evaluator(returns, alpha, probs, optimizer, solver), lambdas)
+
+
+def max_sharpe_frontier(returns, lambdas=DEFAULT_LAMBDAS, probs=None, optimizer=None, xtol=1e-3):
+    """
+    Portefeuille de Sharpe maximal (mean / volatilité, taux sans risque nul) le long
+    de la frontière moyenne-variance, sans fixer λ à la main.
+
+    Outputs:
+        w : poids optimaux
+        ret : rendement espéré
+        risk : volatilité
+        lam : aversion au risque correspondante
+        frontier : DataFrame de la grille
+    """
+    return _max_ratio(_mean_variance_evaluator(returns, probs, optimizer), lambdas, xtol)
+
+
+def max_starr_frontier(returns, lambdas=DEFAULT_LAMBDAS, alpha=0.01, probs=None, optimizer=None,
+                       solver="lp", xtol=1e-3):
+    """
+    Portefeuille de STARR maximal (mean / CVaR) le long de la frontière moyenne-CVaR.
+
+    Outputs:
+        w : poids optimaux
+        ret : rendement espéré
+        cvar : CVaR du portefeuille
+        lam : valeur de λ correspondante
+        frontier : DataFrame de la grille
+    """
+    return _max_ratio(_mean_cvar_evaluator(returns, alpha, probs, optimizer, solver), lambdas, xtol)
@@ -1,8 +1,16 @@
 from arch import arch_model
+from arch.univariate.base import DataScaleWarning
+from concurrent.futures import ProcessPoolExecutor
+import os
+import warnings
 import numpy as np
 import pandas as pd
 from scipy.stats import rankdata
 
+from Code.instrumentation import record_event
+
+GARCH_PARAM_NAMES = ["mu", "omega", "alpha[1]", "beta[1]"]
+
 def fit_garch(returns):
     """
     Ajuste un modèle GARCH(1,1) sur les rendements.
@@ -16,6 +24,114 @@ def fit_garch(returns):
 
     return residuals, sigma
 
+def _fit_garch_column(args):
+    """
+    Ajuste un GARCH(1,1) sur une seule colonne (exécuté dans un processus du pool).
+    Si le démarrage à chaud ne converge pas, on relance l'optimisation à froid.
+    """
+    values, starting_values = args
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DataScaleWarning)
+        model = arch_model(values, vol='Garch', p=1, q=1, dist='normal')
+        res = model.fit(disp='off', starting_values=starting_values)
+        if starting_values is not None and res.convergence_flag != 0:
+            res = model.fit(disp='off')
+
+    return res.resid, res.conditional_volatility, np.asarray(res.params), res.convergence_flag
+
+def fit_garch_batch(returns, starting_values=None, n_jobs=None, engine="arch"):
+    """
+    Ajuste un modèle GARCH(1,1) sur chaque actif en parallèle (un processus par actif).
+
+    Inputs:
+        returns : DataFrame des rendements (colonnes = actifs), les dates incomplètes sont supprimées
+        starting_values : DataFrame des paramètres de la veille (index = actifs,
+                          colonnes = GARCH_PARAM_NAMES) pour démarrer l'optimisation à chaud
+        n_jobs : nombre de processus (défaut : nombre de coeurs, 1 = exécution séquentielle)
+        engine : "arch" (un ajustement arch par actif dans un pool de processus) ou
+                 "numpy" (récursion et vraisemblance vectorisées sur tous les actifs, cf. garch_vectorized)
+
+    Outputs:
+        residuals : array (T, N) des résidus, aligné sur returns.dropna()
+        sigmas : array (T, N) des volatilités conditionnelles
+        params : DataFrame (N, 4) des paramètres estimés (+ colonne convergence_flag)
+    """
+    returns = returns.dropna()
+    tickers = list(returns.columns)
+
+    if engine == "numpy":
+        from Code.garch_vectorized import fit_garch_vectorized
+        start = None
+        if starting_values is not None:
+            start = starting_values.reindex(tickers)[GARCH_PARAM_NAMES].to_numpy(dtype=float)
+        residuals, sigmas, params = fit_garch_vectorized(returns, starting_values=start)
+        _record_convergence(engine, params)
+        return residuals, sigmas, params
+    if engine != "arch":
+        raise ValueError(f"Moteur GARCH non supporté : {engine}")
+
+    values = returns.to_numpy(dtype=float)
+
+    tasks = []
+    for j, ticker in enumerate(tickers):
+        start = None
+        if starting_values is not None and ticker in starting_values.index:
+            start = starting_values.loc[ticker, GARCH_PARAM_NAMES].to_numpy(dtype=float)
+            if not np.all(np.isfinite(start)):
+                start = None
+        tasks.append((values[:, j], start))
+
+    n_jobs = n_jobs or os.cpu_count() or 1
+    n_jobs = min(n_jobs, len(tasks))
+    if n_jobs <= 1:
+        results = [_fit_garch_column(task) for task in tasks]
+    else:
+        chunksize = max(1, len(tasks) // (4 * n_jobs))
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            results = list(pool.map(_fit_garch_column, tasks, chunksize=chunksize))
+
+    residuals = np.column_stack([r[0] for r in results])
+    sigmas = np.column_stack([r[1] for r in results])
+    params = pd.DataFrame([r[2] for r in results], index=tickers, columns=GARCH_PARAM_NAMES)
+    params["convergence_flag"] = [r[3] for r in results]
+    _record_convergence(engine, params)
+
+    return residuals, sigmas, params
+
+def _record_convergence(engine, params):
+    """
+    Diagnostic de convergence pour le rapport d'exécution (cf. instrumentation).
+    """
+    flags = params["convergence_flag"]
+    record_event("garch", engine=engine, n_assets=len(flags), n_failed=int((flags != 0).sum()),
+                 convergence_flags=flags.astype(int).to_dict())
+
+def garch_next_variance(params, residuals, sigmas):
+    """
+    Variance conditionnelle prévue pour t+1 : ω + α ε_T² + β σ_T².
+
+    Inputs:
+        params : DataFrame des paramètres GARCH (colonnes GARCH_PARAM_NAMES), un actif par ligne
+        residuals, sigmas : arrays (T, n_assets) des résidus et volatilités conditionnelles
+    """
+    p = params[GARCH_PARAM_NAMES].to_numpy(dtype=float)
+    return p[:, 1] + p[:, 2] * residuals[-1] ** 2 + p[:, 3] * sigmas[-1] ** 2
+
+def save_garch_params(params, filepath):
+    """
+    Sauvegarde les paramètres GARCH estimés (utilisés comme point de départ au prochain ajustement).
+    """
+    params.to_csv(filepath, index_label="Ticker")
+
+def load_garch_params(filepath):
+    """
+    Charge les paramètres GARCH de la veille. Retourne None si le fichier n'existe pas.
+    """
+    if not os.path.exists(filepath):
+        return None
+    return pd.read_csv(filepath, index_col="Ticker")
+
 def standardize_residuals(residuals, sigma):
     """
     Standardise les résidus par leur volatilité conditionnelle.
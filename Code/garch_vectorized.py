@@ -0,0 +1,396 @@
+import numpy as np
+import pandas as pd
+from scipy.special import digamma, gammaln
+
+try:
+    import numba
+except ImportError:  # numba est optionnel : on retombe sur la boucle NumPy
+    numba = None
+
+# Grille de points de départ (alpha, beta), comme dans arch
+_STARTING_GRID = [(0.01, 0.97), (0.05, 0.90), (0.10, 0.80), (0.10, 0.88), (0.15, 0.80)]
+_MAX_PERSISTENCE = 1.0
+_MIN_NU = 2.05
+_LOG_2PI = np.log(2 * np.pi)
+
+
+def backcast(resids):
+    """
+    Valeur initiale de la variance (identique à arch) : moyenne pondérée
+    (poids 0.94^i) des 75 premiers résidus au carré, pour chaque colonne.
+    """
+    tau = min(75, resids.shape[0])
+    w = 0.94 ** np.arange(tau)
+    w = w / w.sum()
+    return w @ resids[:tau] ** 2
+
+
+def _recursion_numpy(eps, omega, alpha, beta, bc, with_grad):
+    T, N = eps.shape
+    sigma2 = np.empty((T, N))
+    dsigma2 = np.empty((T, N, 4)) if with_grad else None
+
+    e_prev = bc.copy()
+    s_prev = bc.copy()
+    for t in range(T):
+        sigma2[t] = omega + alpha * e_prev + beta * s_prev
+        if with_grad:
+            # ordre des paramètres : mu, omega, alpha, beta
+            if t == 0:
+                dsigma2[0, :, 0] = 0.0
+                dsigma2[0, :, 1] = 1.0
+                dsigma2[0, :, 2] = bc
+                dsigma2[0, :, 3] = bc
+            else:
+                prev = dsigma2[t - 1]
+                dsigma2[t, :, 0] = -2.0 * alpha * eps[t - 1] + beta * prev[:, 0]
+                dsigma2[t, :, 1] = 1.0 + beta * prev[:, 1]
+                dsigma2[t, :, 2] = e_prev + beta * prev[:, 2]
+                dsigma2[t, :, 3] = s_prev + beta * prev[:, 3]
+        e_prev = eps[t] ** 2
+        s_prev = sigma2[t]
+
+    return sigma2, dsigma2
+
+
+if numba is not None:
+    @numba.njit(cache=True)
+    def _recursion_numba(eps, omega, alpha, beta, bc, with_grad):
+        T, N = eps.shape
+        sigma2 = np.empty((T, N))
+        dsigma2 = np.empty((T, N, 4)) if with_grad else np.empty((0, N, 4))
+        e_prev = bc.copy()
+        s_prev = bc.copy()
+        for t in range(T):
+            for i in range(N):
+                s = omega[i] + alpha[i] * e_prev[i] + beta[i] * s_prev[i]
+                sigma2[t, i] = s
+                if with_grad:
+                    if t == 0:
+                        dsigma2[0, i, 0] = 0.0
+                        dsigma2[0, i, 1] = 1.0
+                        dsigma2[0, i, 2] = bc[i]
+                        dsigma2[0, i, 3] = bc[i]
+                    else:
+                        dsigma2[t, i, 0] = -2.0 * alpha[i] * eps[t - 1, i] + beta[i] * dsigma2[t - 1, i, 0]
+                        dsigma2[t, i, 1] = 1.0 + beta[i] * dsigma2[t - 1, i, 1]
+                        dsigma2[t, i, 2] = e_prev[i] + beta[i] * dsigma2[t - 1, i, 2]
+                        dsigma2[t, i, 3] = s_prev[i] + beta[i] * dsigma2[t - 1, i, 3]
+                e_prev[i] = eps[t, i] * eps[t, i]
+                s_prev[i] = s
+        return sigma2, dsigma2
+
+    @numba.njit(cache=True, parallel=True, fastmath=False)
+    def _scores_numba(yT, theta, bc, student, nu_const, nu_grad):
+        """
+        Récursion, log-vraisemblance, gradient et matrice BHHH (Σ_t s_t s_tᵀ) de chaque
+        actif en une seule passe sur ses T observations, sans tableau (T, N, k).
+        """
+        N, T = yT.shape
+        k = theta.shape[1]
+        ll = np.empty(N)
+        grad = np.zeros((N, k))
+        info = np.zeros((N, k, k))
+        for i in numba.prange(N):
+            mu, omega, alpha, beta = theta[i, 0], theta[i, 1], theta[i, 2], theta[i, 3]
+            nu = theta[i, 4] if student else 0.0
+            e_prev = bc[i]
+            s_prev = bc[i]
+            eps_prev = 0.0
+            d0, d1, d2, d3 = 0.0, 1.0, bc[i], bc[i]
+            total = 0.0
+            g = np.empty(k)
+            for t in range(T):
+                s = omega + alpha * e_prev + beta * s_prev
+                if t > 0:
+                    d0 = -2.0 * alpha * eps_prev + beta * d0
+                    d1 = 1.0 + beta * d1
+                    d2 = e_prev + beta * d2
+                    d3 = s_prev + beta * d3
+                eps = yT[i, t] - mu
+                if student:
+                    x = eps * eps / (s * (nu - 2.0))
+                    log1px = np.log1p(x)
+                    total += nu_const[i] - 0.5 * np.log(s) - 0.5 * (nu + 1.0) * log1px
+                    w = (nu + 1.0) / (1.0 + x)
+                    d_eps = -w * eps / (s * (nu - 2.0))
+                    d_s = 0.5 * (w * x - 1.0) / s
+                    g[4] = nu_grad[i] - 0.5 * log1px + 0.5 * w * x / (nu - 2.0)
+                else:
+                    total += -0.5 * (_LOG_2PI + np.log(s) + eps * eps / s)
+                    d_eps = -eps / s
+                    d_s = 0.5 * (eps * eps / s - 1.0) / s
+                g[0] = d_s * d0 - d_eps
+                g[1] = d_s * d1
+                g[2] = d_s * d2
+                g[3] = d_s * d3
+                for a in range(k):
+                    grad[i, a] += g[a]
+                    for b in range(a + 1):
+                        info[i, a, b] += g[a] * g[b]
+                e_prev = eps * eps
+                s_prev = s
+                eps_prev = eps
+            ll[i] = total
+            for a in range(k):
+                for b in range(a):
+                    info[i, b, a] = info[i, a, b]
+        return ll, grad, info
+else:
+    _recursion_numba = None
+    _scores_numba = None
+
+
+def _recursion(eps, omega, alpha, beta, bc, with_grad=False, use_numba=None):
+    if use_numba is None:
+        use_numba = _recursion_numba is not None
+    if use_numba:
+        if _recursion_numba is None:
+            raise ImportError("numba n'est pas installé : utiliser use_numba=False")
+        sigma2, dsigma2 = _recursion_numba(np.ascontiguousarray(eps), omega, alpha, beta, bc, with_grad)
+        return sigma2, (dsigma2 if with_grad else None)
+    return _recursion_numpy(eps, omega, alpha, beta, bc, with_grad)
+
+
+def garch_filter(returns, mu, omega, alpha, beta, bc=None, use_numba=None):
+    """
+    Récursion de variance conditionnelle GARCH(1,1) pour tous les actifs à la fois.
+
+    Inputs:
+        returns : array (T, N) des rendements
+        mu, omega, alpha, beta : arrays (N,) des paramètres
+        bc : valeur initiale de la variance (défaut : backcast à la arch)
+        use_numba : force (True) ou désactive (False) la boucle compilée (défaut : si disponible)
+
+    Output:
+        sigma2 : array (T, N) des variances conditionnelles
+    """
+    returns = np.asarray(returns, dtype=float)
+    eps = returns - mu
+    if bc is None:
+        bc = backcast(returns - returns.mean(axis=0))
+    sigma2, _ = _recursion(eps, *(np.asarray(x, dtype=float) for x in (omega, alpha, beta, bc)),
+                           use_numba=use_numba)
+    return sigma2
+
+
+def _loglik_terms(eps, sigma2, dist, nu):
+    """
+    Log-vraisemblances par observation (T, N) et dérivées par rapport à eps, sigma2 et nu.
+    """
+    if dist == "normal":
+        ll = -0.5 * (np.log(2 * np.pi) + np.log(sigma2) + eps ** 2 / sigma2)
+        d_eps = -eps / sigma2
+        d_sigma2 = 0.5 * (eps ** 2 / sigma2 - 1.0) / sigma2
+        return ll, d_eps, d_sigma2, None
+    if dist == "t":
+        x = eps ** 2 / (sigma2 * (nu - 2))
+        log1px = np.log1p(x)
+        ll = (gammaln((nu + 1) / 2) - gammaln(nu / 2) - 0.5 * np.log(np.pi * (nu - 2))
+              - 0.5 * np.log(sigma2) - 0.5 * (nu + 1) * log1px)
+        w = (nu + 1) / (1 + x)
+        d_eps = -w * eps / (sigma2 * (nu - 2))
+        d_sigma2 = 0.5 * (w * x - 1.0) / sigma2
+        d_nu = (0.5 * (digamma((nu + 1) / 2) - digamma(nu / 2)) - 0.5 / (nu - 2)
+                - 0.5 * log1px + 0.5 * w * x / (nu - 2))
+        return ll, d_eps, d_sigma2, d_nu
+    raise ValueError(f"Distribution non supportée : {dist}")
+
+
+def garch_loglik(returns, params, dist="normal", use_numba=None):
+    """
+    Log-vraisemblance GARCH(1,1) de chaque actif, évaluée en une passe vectorisée.
+
+    Inputs:
+        returns : array (T, N) des rendements
+        params : array (N, 4) [mu, omega, alpha, beta], ou (N, 5) avec nu pour dist="t"
+        dist : "normal" ou "t" (Student)
+
+    Output:
+        loglik : array (N,) des log-vraisemblances
+    """
+    returns = np.asarray(returns, dtype=float)
+    bc = backcast(returns - returns.mean(axis=0))
+    return _loglik(returns, np.asarray(params, dtype=float), bc, dist, use_numba)
+
+
+def _loglik(y, theta, bc, dist, use_numba):
+    eps = y - theta[:, 0]
+    sigma2, _ = _recursion(eps, theta[:, 1], theta[:, 2], theta[:, 3], bc, use_numba=use_numba)
+    nu = theta[:, 4] if dist == "t" else None
+    ll, _, _, _ = _loglik_terms(eps, sigma2, dist, nu)
+    return ll.sum(axis=0)
+
+
+def _loglik_and_scores(y, theta, bc, dist, use_numba):
+    eps = y - theta[:, 0]
+    sigma2, dsigma2 = _recursion(eps, theta[:, 1], theta[:, 2], theta[:, 3], bc,
+                                 with_grad=True, use_numba=use_numba)
+    nu = theta[:, 4] if dist == "t" else None
+    ll, d_eps, d_sigma2, d_nu = _loglik_terms(eps, sigma2, dist, nu)
+
+    scores = d_sigma2[:, :, None] * dsigma2
+    scores[:, :, 0] -= d_eps  # d eps / d mu = -1
+    if dist == "t":
+        scores = np.concatenate([scores, d_nu[:, :, None]], axis=2)
+    return ll.sum(axis=0), scores
+
+
+def _evaluate(y, yT, theta, bc, dist, use_numba):
+    """
+    Log-vraisemblance (N,), gradient (N, k) et matrice d'information BHHH (N, k, k) :
+    une passe fusionnée par actif avec numba, sinon scores (T, N, k) en NumPy.
+    yT : mêmes rendements que y, transposés (N, T) et contigus (utilisés par numba).
+    """
+    if use_numba is None:
+        use_numba = _scores_numba is not None
+    if use_numba:
+        if _scores_numba is None:
+            raise ImportError("numba n'est pas installé : utiliser use_numba=False")
+        student = dist == "t"
+        nu = theta[:, 4] if student else np.full(theta.shape[0], 3.0)
+        nu_const = gammaln((nu + 1) / 2) - gammaln(nu / 2) - 0.5 * np.log(np.pi * (nu - 2))
+        nu_grad = 0.5 * (digamma((nu + 1) / 2) - digamma(nu / 2)) - 0.5 / (nu - 2)
+        return _scores_numba(yT, theta, bc, student, nu_const, nu_grad)
+    ll, scores = _loglik_and_scores(y, theta, bc, dist, use_numba)
+    s_t = scores.transpose(1, 2, 0)
+    return ll, scores.sum(axis=0), s_t @ s_t.transpose(0, 2, 1)
+
+
+def _max_feasible_step(theta, direction, dist):
+    """
+    Plus grand pas (<= 1) qui garde omega > 0, alpha, beta >= 0, alpha + beta < 1 (et nu > 2).
+    """
+    step = np.ones(theta.shape[0])
+
+    def limit(value, slope, bound):
+        # pas maximal avant que value + s * slope atteigne bound (quand on s'en approche)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            s = np.where(slope < 0, (bound - value) / slope, np.inf)
+        return np.clip(0.99 * s, 0.0, None)
+
+    step = np.minimum(step, limit(theta[:, 1], direction[:, 1], 0.0))
+    step = np.minimum(step, limit(theta[:, 2], direction[:, 2], 0.0))
+    step = np.minimum(step, limit(theta[:, 3], direction[:, 3], 0.0))
+    persistence = theta[:, 2] + theta[:, 3]
+    slope = direction[:, 2] + direction[:, 3]
+    step = np.minimum(step, limit(-persistence, -slope, -_MAX_PERSISTENCE))
+    if dist == "t":
+        step = np.minimum(step, limit(theta[:, 4], direction[:, 4], _MIN_NU))
+    return step
+
+
+def fit_garch_vectorized(returns, dist="normal", starting_values=None, max_iter=200, tol=1e-9,
+                         use_numba=None):
+    """
+    Ajuste un GARCH(1,1) par maximum de vraisemblance sur tous les actifs à la fois.
+
+    L'optimisation est un algorithme BHHH vectorisé : chaque actif a son propre pas de
+    Newton (matrice d'information = produit extérieur des scores), mais toutes les
+    récursions et vraisemblances sont évaluées en une seule passe sur la matrice (T, N).
+    Les rendements sont normalisés par leur écart-type pendant l'optimisation (les
+    paramètres sont ensuite remis à l'échelle), ce qui évite les problèmes de
+    conditionnement rencontrés par arch sur des rendements journaliers.
+
+    Inputs:
+        returns : DataFrame ou array (T, N) des rendements (sans NaN)
+        dist : "normal" ou "t" (Student)
+        starting_values : DataFrame/array (N, 4 ou 5) de paramètres de départ (ex. ceux de la veille)
+        max_iter : nombre maximal d'itérations
+        tol : tolérance sur l'amélioration de la log-vraisemblance moyenne
+        use_numba : utilise la boucle compilée numba (défaut : si disponible)
+
+    Outputs:
+        residuals : array (T, N) des résidus
+        sigmas : array (T, N) des volatilités conditionnelles
+        params : DataFrame (N, 4 ou 5) des paramètres estimés (+ colonne convergence_flag)
+    """
+    columns = list(returns.columns) if isinstance(returns, pd.DataFrame) else None
+    r = np.asarray(returns, dtype=float)
+    T, N = r.shape
+    n_par = 5 if dist == "t" else 4
+
+    scale = r.std(axis=0)
+    scale[scale == 0] = 1.0
+    y = r / scale
+    bc = backcast(y - y.mean(axis=0))
+
+    if starting_values is not None:
+        theta = np.asarray(starting_values, dtype=float)[:, :n_par].copy()
+        theta[:, 0] /= scale
+        theta[:, 1] /= scale ** 2
+        if theta.shape[1] < n_par:
+            theta = np.column_stack([theta, np.full(N, 8.0)])
+        bad = ~np.all(np.isfinite(theta), axis=1)
+    else:
+        bad = np.ones(N, dtype=bool)
+
+    if bad.any():
+        # Départ à froid : meilleur point de la grille (alpha, beta) pour chaque actif
+        mean = y.mean(axis=0)
+        var = y.var(axis=0)
+        best_ll = np.full(N, -np.inf)
+        best = np.zeros((N, n_par))
+        for a, b in _STARTING_GRID:
+            cand = np.column_stack([mean, var * (1 - a - b), np.full(N, a), np.full(N, b)])
+            if dist == "t":
+                cand = np.column_stack([cand, np.full(N, 8.0)])
+            ll = _loglik(y, cand, bc, dist, use_numba)
+            better = ll > best_ll
+            best[better] = cand[better]
+            best_ll[better] = ll[better]
+        if starting_values is None:
+            theta = best
+        else:
+            theta[bad] = best[bad]
+
+    # numba : une ligne contiguë par actif ; NumPy : matrice (T, N)
+    yT = np.ascontiguousarray(y.T) if use_numba is not False and _scores_numba is not None else None
+    ll, grad, info = _evaluate(y, yT, theta, bc, dist, use_numba)
+    flags = np.ones(N, dtype=int)
+    idx = np.arange(N)  # actifs encore en cours d'optimisation
+
+    for _ in range(max_iter):
+        if idx.size == 0:
+            break
+        theta_a, ll_a = theta[idx], ll[idx]
+        info_a = info[idx] + 1e-10 * np.eye(n_par) * np.trace(info[idx], axis1=1, axis2=2)[:, None, None]
+        direction = np.linalg.solve(info_a, grad[idx][:, :, None])[:, :, 0]
+
+        # recherche linéaire par actif (pas divisé par 2 tant que la vraisemblance ne monte pas) ;
+        # seuls les actifs sans pas accepté sont évalués à nouveau, et les scores du point
+        # accepté servent directement à l'itération suivante
+        step = _max_feasible_step(theta_a, direction, dist)
+        improved = np.zeros(idx.size, dtype=bool)
+        todo = np.arange(idx.size)
+        for _ in range(30):
+            if todo.size == 0:
+                break
+            assets = idx[todo]
+            cand = theta_a[todo] + step[todo, None] * direction[todo]
+            cand_ll, cand_grad, cand_info = _evaluate(None if yT is not None else y[:, assets],
+                                                      None if yT is None else yT[assets], cand,
+                                                      bc[assets], dist, use_numba)
+            ok = np.isfinite(cand_ll) & (cand_ll >= ll_a[todo])
+            theta[assets[ok]], ll[assets[ok]] = cand[ok], cand_ll[ok]
+            grad[assets[ok]], info[assets[ok]] = cand_grad[ok], cand_info[ok]
+            improved[todo[ok]] = True
+            step[todo[~ok]] *= 0.5
+            todo = todo[~ok]
+
+        converged = ~improved | ((ll[idx] - ll_a) / T < tol)
+        flags[idx[converged]] = 0
+        idx = idx[~converged]
+
+    params = theta.copy()
+    params[:, 0] *= scale
+    params[:, 1] *= scale ** 2
+
+    eps = r - params[:, 0]
+    sigmas = np.sqrt(_recursion(eps / scale, theta[:, 1], theta[:, 2], theta[:, 3], bc,
+                                use_numba=use_numba)[0]) * scale
+
+    names = ["mu", "omega", "alpha[1]", "beta[1]"] + (["nu"] if dist == "t" else [])
+    params = pd.DataFrame(params, index=columns, columns=names)
+    params["convergence_flag"] = flags
+    return eps, sigmas, params
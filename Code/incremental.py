@@ -0,0 +1,187 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+from Code.garch_models import fit_garch_batch, garch_next_variance, GARCH_PARAM_NAMES
+from Code.ranks import pseudo_observations
+from Code.copula_models import fit_vine_copula, refit_vine_parameters, save_vine, load_vine
+# seuil de dérive des tau de Kendall et fenêtre récente : mêmes règles que VineService
+from Code.vine_service import STRUCTURE_MAX_AGE, DRIFT_TAU_THRESHOLD, DRIFT_WINDOW
+from Code.vecm_views import fit_vecm_coefficients, forecast_from_coefficients
+
+# Fréquence (en jours de bourse) des ré-estimations complètes. Entre deux échéances,
+# le filtre GARCH est prolongé d'un pas, la structure de la Vine est conservée
+# (seuls ses paramètres sont ré-estimés) et le VECM prévoit avec ses coefficients stockés.
+DEFAULT_SCHEDULE = {
+    "garch": 21,            # ré-estimation des paramètres GARCH (démarrage à chaud)
+    "vine_structure": STRUCTURE_MAX_AGE,  # nouvelle sélection de la structure et des familles de la Vine
+    "vecm_coefficients": 21,  # ré-estimation des coefficients VECM (rang conservé)
+    "vecm_rank": 63,        # nouveau test de Johansen pour le rang de co-intégration
+}
+
+STATE_FILE = "state.json"
+VINE_FILE = "vine.json"
+STANDARDIZED_FILE = "standardized.npy"
+
+
+def _kendall_tau_matrix(u):
+    return pd.DataFrame(u).corr(method="kendall").to_numpy()
+
+
+def _fit_garch_state(prices, garch_params=None):
+    log_returns = np.log(prices / prices.shift(1)).dropna()
+    residuals, sigmas, params = fit_garch_batch(log_returns, starting_values=garch_params)
+    return residuals / sigmas, params, garch_next_variance(params, residuals, sigmas)
+
+
+def initialize_state(prices, state_dir, lags=1):
+    """
+    Ajustement complet (GARCH, Vine, VECM) et sauvegarde de l'état dans state_dir.
+
+    Inputs:
+        prices : DataFrame des prix alignés (colonnes = actifs, index = dates)
+        state_dir : dossier de sauvegarde de l'état
+        lags : nombre de retards du VECM
+
+    Output:
+        state : dict de l'état persisté
+    """
+    os.makedirs(state_dir, exist_ok=True)
+    prices = prices.dropna()
+
+    standardized, garch_params, sigma2_next = _fit_garch_state(prices)
+    u = pseudo_observations(standardized)
+    vine = fit_vine_copula(pd.DataFrame(u, columns=prices.columns))
+    coefficients = fit_vecm_coefficients(prices, lags=lags)
+
+    state = {
+        "tickers": list(prices.columns),
+        "last_date": str(prices.index[-1].date()),
+        "garch_params": garch_params[GARCH_PARAM_NAMES].to_numpy().tolist(),
+        "sigma2_next": sigma2_next.tolist(),
+        "vecm": {k: np.asarray(v).tolist() if isinstance(v, np.ndarray) else v
+                 for k, v in coefficients.items()},
+        "tau_at_selection": _kendall_tau_matrix(u[-DRIFT_WINDOW:]).tolist(),
+        "days_since": {key: 0 for key in DEFAULT_SCHEDULE},
+    }
+
+    np.save(os.path.join(state_dir, STANDARDIZED_FILE), standardized)
+    save_vine(vine, os.path.join(state_dir, VINE_FILE))
+    _save_state(state, state_dir)
+    return state
+
+
+def _save_state(state, state_dir):
+    with open(os.path.join(state_dir, STATE_FILE), "w") as f:
+        json.dump(state, f, indent=2)
+
+
+def load_state(state_dir):
+    """
+    Charge l'état persisté (None si aucun état n'existe encore).
+    """
+    path = os.path.join(state_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def update_state(state_dir, prices, schedule=None):
+    """
+    Intègre les nouvelles lignes de prix (dates postérieures à last_date) sans tout ré-estimer.
+
+    Pour chaque nouvelle date :
+        - le filtre GARCH est prolongé d'un pas avec les paramètres stockés,
+        - le résidu standardisé est ajouté à l'historique,
+    puis, une fois toutes les lignes intégrées :
+        - les paramètres de la Vine sont ré-estimés sur la structure stockée
+          (nouvelle sélection complète à l'échéance ou si une dérive est détectée),
+        - la prévision VECM est calculée avec les coefficients stockés
+          (ré-estimation à l'échéance, rang conservé entre deux tests de Johansen).
+
+    Inputs:
+        state_dir : dossier de l'état (créé par initialize_state)
+        prices : DataFrame de l'historique complet des prix alignés (ex. PriceStore.closes())
+        schedule : fréquences de ré-estimation (défaut : DEFAULT_SCHEDULE)
+
+    Output:
+        dict avec vine, sigmas (volatilités prévues pour t+1), forecast (prix VECM à t+1),
+        prices (historique) et refits (liste des ré-estimations complètes effectuées)
+    """
+    schedule = {**DEFAULT_SCHEDULE, **(schedule or {})}
+    state = load_state(state_dir)
+    tickers = state["tickers"]
+
+    standardized = np.load(os.path.join(state_dir, STANDARDIZED_FILE))
+    vine = load_vine(os.path.join(state_dir, VINE_FILE))
+
+    prices = prices[tickers].dropna()
+    is_new = prices.index > pd.Timestamp(state["last_date"])
+    new_prices = prices[is_new]
+
+    # 1. Extension du filtre GARCH d'un pas par nouvelle date
+    params = np.asarray(state["garch_params"])
+    mu, omega, alpha, beta = params.T
+    sigma2 = np.asarray(state["sigma2_next"])
+    last = prices[~is_new].iloc[-1].to_numpy(dtype=float)
+    new_rows = []
+    for _, row in new_prices.iterrows():
+        current = row.to_numpy(dtype=float)
+        eps = np.log(current / last) - mu
+        new_rows.append(eps / np.sqrt(sigma2))
+        sigma2 = omega + alpha * eps ** 2 + beta * sigma2
+        last = current
+
+    if new_rows:
+        standardized = np.vstack([standardized, np.array(new_rows)])
+    n_new = len(new_rows)
+    for key in state["days_since"]:
+        state["days_since"][key] += n_new
+
+    refits = []
+    if state["days_since"]["garch"] >= schedule["garch"]:
+        previous = pd.DataFrame(params, index=tickers, columns=GARCH_PARAM_NAMES)
+        standardized, garch_params, sigma2 = _fit_garch_state(prices, previous)
+        state["garch_params"] = garch_params[GARCH_PARAM_NAMES].to_numpy().tolist()
+        state["days_since"]["garch"] = 0
+        refits.append("garch")
+    state["sigma2_next"] = np.asarray(sigma2).tolist()
+
+    # 2. Vine : paramètres seuls, sauf échéance ou dérive des dépendances
+    u = pseudo_observations(standardized)
+    recent_tau = _kendall_tau_matrix(u[-DRIFT_WINDOW:])
+    drift = np.max(np.abs(recent_tau - np.asarray(state["tau_at_selection"])))
+    if state["days_since"]["vine_structure"] >= schedule["vine_structure"] or drift > DRIFT_TAU_THRESHOLD:
+        vine = fit_vine_copula(pd.DataFrame(u, columns=tickers))
+        state["tau_at_selection"] = recent_tau.tolist()
+        state["days_since"]["vine_structure"] = 0
+        refits.append("vine_structure")
+    elif n_new:
+        vine = refit_vine_parameters(vine, u)
+
+    # 3. VECM : coefficients stockés, ré-estimés à l'échéance
+    coefficients = state["vecm"]
+    if state["days_since"]["vecm_rank"] >= schedule["vecm_rank"]:
+        coefficients = fit_vecm_coefficients(prices, lags=coefficients["lags"])
+        state["days_since"]["vecm_rank"] = 0
+        state["days_since"]["vecm_coefficients"] = 0
+        refits.append("vecm_rank")
+    elif state["days_since"]["vecm_coefficients"] >= schedule["vecm_coefficients"]:
+        coefficients = fit_vecm_coefficients(prices, lags=coefficients["lags"],
+                                             coint_rank=coefficients["coint_rank"])
+        state["days_since"]["vecm_coefficients"] = 0
+        refits.append("vecm_coefficients")
+    state["vecm"] = {k: np.asarray(v).tolist() if isinstance(v, np.ndarray) else v
+                     for k, v in coefficients.items()}
+    forecast = forecast_from_coefficients(coefficients, prices.iloc[-(coefficients["lags"] + 1):])
+
+    # 4. Sauvegarde
+    state["last_date"] = str(prices.index[-1].date())
+    np.save(os.path.join(state_dir, STANDARDIZED_FILE), standardized)
+    save_vine(vine, os.path.join(state_dir, VINE_FILE))
+    _save_state(state, state_dir)
+
+    sigmas = pd.DataFrame([np.sqrt(sigma2)], columns=tickers)
+    return {"vine": vine, "sigmas": sigmas, "forecast": forecast, "prices": prices, "refits": refits}
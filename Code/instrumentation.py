@@ -0,0 +1,196 @@
+import cProfile
+import json
+import os
+import platform
+import pstats
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+PROFILERS = ("cprofile", "pyinstrument")
+PROFILE_TOP = 15
+
+# Enregistrements des étapes en cours (pile : une étape peut en appeler une autre).
+# Vide hors d'un RunRecorder : record_event ne fait alors rien.
+_active = []
+
+
+def record_event(kind, **info):
+    """
+    Ajoute un diagnostic (statut de solveur, convergence GARCH, vraisemblance de la Vine...)
+    à l'étape en cours d'enregistrement. Sans enregistreur actif, ne fait rien.
+    """
+    if _active:
+        _active[-1]["events"].append({"kind": kind, **info})
+
+
+def solver_stats(prob, problem=None):
+    """
+    Statistiques d'un problème cvxpy résolu : statut, solveur, itérations et temps.
+    """
+    stats = prob.solver_stats
+    return {
+        "problem": problem,
+        "status": prob.status,
+        "solver": stats.solver_name if stats else None,
+        "iterations": stats.num_iters if stats else None,
+        "solve_time": stats.solve_time if stats else None,
+        "setup_time": stats.setup_time if stats else None,
+        "compile_time": prob.compilation_time,
+        "value": prob.value,
+    }
+
+
+def _rss_mb():
+    """
+    Mémoire résidente du processus (Mo) : psutil s'il est installé, sinon /proc (Linux).
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2 ** 20
+    except ImportError:
+        pass
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def describe(obj, depth=2):
+    """
+    Tailles des tableaux d'une sortie d'étape : forme et octets des arrays / DataFrames,
+    parcours des dicts, listes et tuples sur depth niveaux.
+    """
+    if isinstance(obj, (np.ndarray, pd.DataFrame, pd.Series)):
+        nbytes = obj.nbytes if isinstance(obj, np.ndarray) else int(np.sum(obj.memory_usage(deep=False)))
+        return {"type": type(obj).__name__, "shape": list(obj.shape), "mb": nbytes / 2 ** 20}
+    if depth > 0 and isinstance(obj, dict):
+        return {str(k): describe(v, depth - 1) for k, v in obj.items()}
+    if depth > 0 and isinstance(obj, (list, tuple)):
+        return [describe(v, depth - 1) for v in obj]
+    return {"type": type(obj).__name__}
+
+
+def _to_json(obj):
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    return str(obj)
+
+
+class RunRecorder:
+    """
+    Instrumentation d'une exécution : chaque étape appelée via call() est chronométrée,
+    avec la variation de mémoire résidente, la taille de ses sorties et les diagnostics
+    émis pendant l'étape par record_event (solveurs, GARCH, Vine). report() / write()
+    produisent un rapport JSON de l'exécution.
+
+    profile="cprofile" (ou "pyinstrument" s'il est installé) profile chaque étape
+    calculée : fichier par étape dans profile_dir et fonctions les plus coûteuses
+    dans le rapport.
+    """
+
+    def __init__(self, profile=None, profile_dir="Output/reports/profiles"):
+        if profile is not None and profile not in PROFILERS:
+            raise ValueError(f"Profileur non supporté : {profile}")
+        self.profile = profile
+        self.profile_dir = profile_dir
+        self.started = datetime.now()
+        self.params = None
+        self.stages = []
+
+    def call(self, name, func, *args, **kwargs):
+        """
+        Exécute func(*args, **kwargs) comme étape name et enregistre ses mesures.
+        """
+        record = {"stage": name, "status": "miss", "events": []}
+        profiler = self._start_profiler()
+        _active.append(record)
+        rss_before = _rss_mb()
+        start = time.perf_counter()
+        try:
+            output = func(*args, **kwargs)
+        except Exception as exc:
+            record["status"] = f"error: {exc!r}"
+            raise
+        finally:
+            record["seconds"] = time.perf_counter() - start
+            rss_after = _rss_mb()
+            record["rss_mb"] = rss_after
+            record["rss_delta_mb"] = None if rss_before is None else rss_after - rss_before
+            _active.pop()
+            self._stop_profiler(profiler, name, record)
+            self.stages.append(record)
+        record["output"] = describe(output)
+        return output
+
+    def record_cached(self, name, seconds, output):
+        """
+        Enregistre une étape relue depuis le cache (pas de diagnostics : rien n'est recalculé).
+        """
+        self.stages.append({"stage": name, "status": "hit", "seconds": seconds, "events": [],
+                            "output": describe(output)})
+
+    def _start_profiler(self):
+        if self.profile == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+        elif self.profile == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+            except ImportError as exc:
+                raise ImportError("profile='pyinstrument' nécessite le paquet pyinstrument") from exc
+            profiler = Profiler()
+            profiler.start()
+        else:
+            return None
+        return profiler
+
+    def _stop_profiler(self, profiler, name, record):
+        if profiler is None:
+            return
+        os.makedirs(self.profile_dir, exist_ok=True)
+        if self.profile == "cprofile":
+            profiler.disable()
+            path = os.path.join(self.profile_dir, f"{name}.prof")
+            profiler.dump_stats(path)
+            # fonctions triées par temps cumulé décroissant
+            entries = sorted(pstats.Stats(profiler).stats.items(), key=lambda item: -item[1][3])
+            record["profile"] = {"path": path, "top": [
+                {"function": f"{file}:{line}({func})", "calls": nc, "tottime": tt, "cumtime": ct}
+                for (file, line, func), (_, nc, tt, ct, _) in entries[:PROFILE_TOP]
+            ]}
+        else:
+            profiler.stop()
+            path = os.path.join(self.profile_dir, f"{name}.html")
+            with open(path, "w") as f:
+                f.write(profiler.output_html())
+            record["profile"] = {"path": path}
+
+    def report(self):
+        """
+        Rapport de l'exécution : contexte, paramètres et une entrée par étape
+        (statut hit / miss, durée, mémoire, tailles des sorties, diagnostics, profil).
+        """
+        return {
+            "started": self.started.isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": self.params,
+            "total_seconds": sum(stage["seconds"] for stage in self.stages),
+            "stages": self.stages,
+        }
+
+    def write(self, path=None, report_dir="Output/reports"):
+        """
+        Écrit le rapport JSON (défaut : report_dir/run-<date>.json) et renvoie son chemin.
+        """
+        path = path or os.path.join(report_dir, f"run-{self.started:%Y%m%d-%H%M%S}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2, default=_to_json)
+        return path
@@ -0,0 +1,158 @@
+import numpy as np
+import pandas as pd
+from scipy.special import expit
+from scipy.stats import genpareto, jf_skew_t, norm
+
+from Code.garch_models import GARCH_PARAM_NAMES
+
+# Grille des niveaux u des tables de quantiles : équidistante en logit(u), donc dense
+# dans les queues (de 1e-8 à 1 - 1e-8)
+DEFAULT_GRID_SIZE = 4097
+LOGIT_MAX = 18.42
+
+MARGINAL_METHODS = ("empirical_gpd", "skewt", "normal")
+
+
+class MarginalTables:
+    """
+    Fonctions quantiles des marges (résidus standardisés), tabulées une fois par ajustement
+    sur une grille équidistante en logit(u). L'inversion d'un bloc d'uniformes est une
+    interpolation linéaire dont l'indice se calcule directement (pas de recherche dichotomique),
+    sans appel à une fonction quantile paramétrique.
+    """
+
+    def __init__(self, grid, quantiles, columns=None, method=None):
+        """
+        Inputs:
+            grid : niveaux u = expit(x), x équidistant sur [-LOGIT_MAX, LOGIT_MAX] (n_grid,)
+            quantiles : quantiles correspondants (n_grid, n_assets), croissants par colonne
+            columns : noms des actifs
+            method : méthode d'ajustement des marges
+        """
+        self.grid = grid
+        self.quantiles = quantiles
+        self.columns = columns
+        self.method = method
+
+    def ppf(self, u):
+        """
+        Quantiles des résidus standardisés pour une matrice d'uniformes (n, n_assets).
+        """
+        u = np.asarray(u, dtype=float)
+        n_grid, n_assets = self.quantiles.shape
+        step = 2 * LOGIT_MAX / (n_grid - 1)
+
+        # position dans la grille : (logit(u) + LOGIT_MAX) / pas, bornée aux extrémités
+        position = (np.log(u) - np.log1p(-u) + LOGIT_MAX) / step
+        np.clip(position, 0, n_grid - 1 - 1e-9, out=position)
+        index = position.astype(np.intp)
+        position -= index
+
+        # table aplatie (n_grid * n_assets) : colonne j à l'indice i * n_assets + j
+        flat_index = index * n_assets + np.arange(n_assets)
+        table = self.quantiles.ravel()
+        low = table[flat_index]
+        return low + position * (table[flat_index + n_assets] - low)
+
+
+def _quantile_grid(n_grid):
+    return expit(np.linspace(-LOGIT_MAX, LOGIT_MAX, n_grid))
+
+
+def _empirical_gpd_quantiles(x, grid, tail_fraction):
+    """
+    Quantiles d'une marge : fonction de répartition empirique (positions i / (n + 1))
+    au centre, loi de Pareto généralisée ajustée sur les dépassements au-delà des
+    quantiles tail_fraction et 1 - tail_fraction.
+    """
+    x = np.sort(x)
+    n = x.shape[0]
+    positions = np.arange(1, n + 1) / (n + 1)
+    q = np.interp(grid, positions, x)
+
+    lower = np.interp(tail_fraction, positions, x)
+    upper = np.interp(1 - tail_fraction, positions, x)
+    c_low, _, scale_low = genpareto.fit(lower - x[x < lower], floc=0)
+    c_up, _, scale_up = genpareto.fit(x[x > upper] - upper, floc=0)
+
+    in_lower = grid < tail_fraction
+    in_upper = grid > 1 - tail_fraction
+    q[in_lower] = lower - genpareto.ppf(1 - grid[in_lower] / tail_fraction, c_low, 0, scale_low)
+    q[in_upper] = upper + genpareto.ppf(1 - (1 - grid[in_upper]) / tail_fraction, c_up, 0, scale_up)
+    return np.maximum.accumulate(q)
+
+
+def fit_marginals(standardized, method="empirical_gpd", tail_fraction=0.1, n_grid=DEFAULT_GRID_SIZE):
+    """
+    Ajuste la loi de chaque résidu standardisé et précalcule sa table de quantiles.
+
+    Inputs:
+        standardized : DataFrame ou array (T, n_assets) des résidus standardisés
+        method : "empirical_gpd" (empirique + queues GPD), "skewt" (t asymétrique de
+                 Jones–Faddy, scipy.stats.jf_skew_t) ou "normal" (N(0,1), comportement historique)
+        tail_fraction : proportion d'observations dans chaque queue GPD
+        n_grid : nombre de points de la table
+
+    Output:
+        MarginalTables
+    """
+    if method not in MARGINAL_METHODS:
+        raise ValueError(f"Méthode de marge non supportée : {method}")
+
+    columns = list(standardized.columns) if isinstance(standardized, pd.DataFrame) else None
+    values = np.asarray(standardized, dtype=float)
+    grid = _quantile_grid(n_grid)
+
+    quantiles = np.empty((n_grid, values.shape[1]))
+    for j in range(values.shape[1]):
+        x = values[:, j]
+        x = x[np.isfinite(x)]
+        if method == "empirical_gpd":
+            quantiles[:, j] = _empirical_gpd_quantiles(x, grid, tail_fraction)
+        elif method == "skewt":
+            quantiles[:, j] = np.maximum.accumulate(jf_skew_t.ppf(grid, *jf_skew_t.fit(x)))
+        else:
+            quantiles[:, j] = norm.ppf(grid)
+
+    return MarginalTables(grid, quantiles, columns, method)
+
+
+def simulate_horizon_returns(vine, marginals, garch_params, sigma2_next, horizon=10, n_sim=1000,
+                             seed=None, num_threads=1, return_paths=False):
+    """
+    Simule des rendements log cumulés sur horizon jours en propageant la récursion GARCH :
+    chaque jour, les résidus standardisés sont tirés de la Vine (dépendance) et inversés
+    par les tables de marges, puis ε = σ_h z et σ²_{h+1} = ω + α ε² + β σ²_h, trajectoire
+    par trajectoire (la volatilité n'est plus figée à sa dernière valeur).
+
+    Inputs:
+        vine : Vinecop ajustée sur les pseudo-observations
+        marginals : MarginalTables des résidus standardisés
+        garch_params : DataFrame des paramètres GARCH (colonnes GARCH_PARAM_NAMES)
+        sigma2_next : variances conditionnelles prévues pour le premier jour (n_assets,)
+        horizon : nombre de jours simulés
+        n_sim : nombre de trajectoires
+        seed : graine du générateur
+        return_paths : renvoie aussi les rendements journaliers (n_sim, horizon, n_assets)
+
+    Output:
+        DataFrame (n_sim, n_assets) des rendements log cumulés
+        (et array des trajectoires si return_paths)
+    """
+    p = garch_params[GARCH_PARAM_NAMES].to_numpy(dtype=float)
+    mu, omega, alpha, beta = p.T
+    rng = np.random.default_rng(seed)
+
+    sigma2 = np.tile(np.asarray(sigma2_next, dtype=float), (n_sim, 1))
+    paths = np.empty((n_sim, horizon, p.shape[0]))
+    for h in range(horizon):
+        w = np.clip(rng.random((n_sim, p.shape[0])), 1e-12, 1 - 1e-12)
+        z = marginals.ppf(vine.inverse_rosenblatt(np.asfortranarray(w), num_threads=num_threads))
+        eps = np.sqrt(sigma2) * z
+        paths[:, h] = mu + eps
+        sigma2 = omega + alpha * eps ** 2 + beta * sigma2
+
+    cumulative = pd.DataFrame(paths.sum(axis=1), columns=list(garch_params.index))
+    if return_paths:
+        return cumulative, paths
+    return cumulative
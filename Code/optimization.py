@@ -1,13 +1,33 @@
 import cvxpy as cp
 import numpy as np
 
-def max_sharpe_portfolio(returns, risk_aversion=10):
+from Code.covariance import estimate_covariance
+from Code.cvar_solver import solve_min_cvar, solve_max_starr
+from Code.instrumentation import record_event, solver_stats
+
+def _cvar_expression(VaR, z, alpha, probs=None):
+    """
+    CVaR de Rockafellar–Uryasev : VaR + E[z] / alpha, avec scénarios équipondérés
+    ou pondérés par probs.
+    """
+    if probs is None:
+        return VaR + (1 / (alpha * z.shape[0])) * cp.sum(z)
+    return VaR + (1 / alpha) * (probs @ z)
+
+def max_sharpe_portfolio(returns, risk_aversion=10, probs=None, cov_model="sample", n_factors=None):
     """
     Maximisation approchée du Sharpe Ratio (μᵗw - λ·wᵗΣw), DCP-compliant.
+    probs : probabilités des scénarios (ex. entropy pooling), équipondérés par défaut.
+    cov_model : "sample" (Σ dense des scénarios) ou "pca" / "ledoit_wolf" : Σ facteurs +
+                diagonale (cf. covariance.estimate_covariance) et SOCP sur les expositions
+                aux facteurs (factor_mean_variance), sans matrice n × n
     """
     n_assets = returns.shape[1]
-    mu = np.mean(returns, axis=0)
-    cov = np.cov(returns.T)
+    mu = np.average(returns, axis=0, weights=probs)
+    if cov_model != "sample":
+        cov = estimate_covariance(returns, method=cov_model, n_factors=n_factors, probs=probs)
+        return factor_mean_variance(mu, cov, risk_aversion)
+    cov = np.cov(returns.T, aweights=probs)
 
     w = cp.Variable(n_assets)
     ret = mu @ w
@@ -19,17 +39,47 @@ def max_sharpe_portfolio(returns, risk_aversion=10):
 
     prob = cp.Problem(objective, constraints)
     prob.solve()
+    record_event("solver", **solver_stats(prob, "max_sharpe"))
 
     return w.value, ret.value, cp.sqrt(risk).value
 
 
-def min_cvar_portfolio(returns, alpha=0.01):
+def factor_mean_variance(mu, cov, risk_aversion=10):
+    """
+    Maximise μᵗw - λ·wᵗΣw pour Σ = B Bᵗ + diag(d) (FactorCovariance), écrit sur les
+    expositions aux facteurs y = Bᵗw : λ (‖y‖² + ‖√d ∘ w‖²). Le problème (SOCP) a
+    n + k variables et O(n·k) coefficients, au lieu des n² de quad_form(w, Σ).
+
+    Outputs:
+        w : poids optimaux
+        ret : rendement espéré
+        risk : volatilité du portefeuille
+    """
+    mu = np.asarray(mu, dtype=float)
+    w = cp.Variable(mu.size)
+    y = cp.Variable(cov.n_factors)
+    risk = cp.sum_squares(y) + cp.sum_squares(cp.multiply(np.sqrt(cov.specific), w))
+    constraints = [y == cov.loadings.T @ w, cp.sum(w) == 1, w >= 0]
+
+    prob = cp.Problem(cp.Maximize(mu @ w - risk_aversion * risk), constraints)
+    prob.solve()
+    record_event("solver", **solver_stats(prob, "factor_mean_variance"))
+
+    return w.value, mu @ w.value, np.sqrt(cov.quad(w.value))
+
+
+def min_cvar_portfolio(returns, alpha=0.01, probs=None, solver="cvxpy"):
     """
-    Minimise la CVaR empirique à partir de rendements simulés.
+    Minimise la CVaR empirique à partir de rendements simulés
+    (probs : probabilités des scénarios, équipondérés par défaut).
+    solver="lp" utilise le solveur dédié (cvar_solver), adapté à 100k+ scénarios.
     Contraintes :
         - Long-only
         - Somme des poids = 1
     """
+    if solver == "lp":
+        return solve_min_cvar(returns, alpha=alpha, probs=probs)
+
     n, d = returns.shape
     w = cp.Variable(d)
     VaR = cp.Variable()
@@ -44,29 +94,38 @@ def min_cvar_portfolio(returns, alpha=0.01):
         z >= -portfolio_returns - VaR
     ]
 
-    cvar = VaR + (1 / (alpha * n)) * cp.sum(z)
+    cvar = _cvar_expression(VaR, z, alpha, probs)
     prob = cp.Problem(cp.Minimize(cvar), constraints)
     prob.solve()
+    record_event("solver", **solver_stats(prob, "min_cvar"))
 
     return w.value, cvar.value
 
 
-def max_starr_portfolio(returns, alpha=0.01, lambda_cvar=10):
+def max_starr_portfolio(returns, alpha=0.01, lambda_cvar=10, probs=None, solver="cvxpy"):
     """
     Approximation du STARR ratio via une fonction DCP-compatible :
     maximise (mean - λ · CVaR)
+    (probs : probabilités des scénarios, équipondérés par défaut ;
+    solver="lp" : solveur dédié cvar_solver pour les grands nombres de scénarios)
 
     Contraintes :
         - Long-only
         - Somme des poids = 1
     """
+    if solver == "lp":
+        return solve_max_starr(returns, alpha=alpha, lambda_cvar=lambda_cvar, probs=probs)
+
     n, d = returns.shape
     w = cp.Variable(d)
     VaR = cp.Variable()
     z = cp.Variable(n)
 
     # Espérance de rendement
-    mean_return = cp.sum(returns @ w) / n
+    if probs is None:
+        mean_return = cp.sum(returns @ w) / n
+    else:
+        mean_return = (probs @ returns) @ w
 
     # Contraintes CVaR classiques
     constraints = [
@@ -76,11 +135,187 @@ def max_starr_portfolio(returns, alpha=0.01, lambda_cvar=10):
         z >= -returns @ w - VaR
     ]
 
-    cvar = VaR + (1 / (alpha * n)) * cp.sum(z)
+    cvar = _cvar_expression(VaR, z, alpha, probs)
 
     # Objectif DCP-compatible : rendement - λ × CVaR
     starr_proxy = mean_return - lambda_cvar * cvar
     prob = cp.Problem(cp.Maximize(starr_proxy), constraints)
     prob.solve()
+    record_event("solver", **solver_stats(prob, "max_starr"))
 
     return w.value, mean_return.value, cvar.value
+
+
+def _covariance_factor(cov):
+    """
+    Facteur F tel que Σ = F Fᵗ (Cholesky, ou décomposition propre si Σ est singulière).
+    """
+    try:
+        return np.linalg.cholesky(cov)
+    except np.linalg.LinAlgError:
+        eigval, eigvec = np.linalg.eigh(cov)
+        return eigvec * np.sqrt(np.clip(eigval, 0, None))
+
+
+class PortfolioOptimizer:
+    """
+    Problèmes d'optimisation construits une seule fois avec des cp.Parameter
+    (μ, facteur de Σ, matrice de scénarios, poids de queue α, λ), puis ré-résolus.
+
+    Chaque problème est mis en cache par (type, dimensions) : le premier appel le
+    compile (canonicalisation DPP), les suivants ne font que mettre à jour les
+    paramètres et repartent de la solution précédente (warm start). Les temps de
+    compilation et de résolution sont conservés pour report().
+    """
+
+    def __init__(self, solver=None):
+        self.solver = solver
+        self._problems = {}
+        self.timings = []
+
+    def _solve(self, kind, key, build, values):
+        """
+        Récupère (ou construit) le problème, affecte les paramètres et résout.
+        """
+        cache_key = (kind,) + key
+        compiled = cache_key in self._problems
+        if not compiled:
+            self._problems[cache_key] = build(*key)
+        problem = self._problems[cache_key]
+
+        for name, value in values.items():
+            problem["params"][name].value = value
+
+        prob = problem["problem"]
+        prob.solve(solver=self.solver, warm_start=True)
+        record_event("solver", **solver_stats(prob, kind))
+        if prob.status not in (cp.OPTIMAL, cp.OPTIMAL_INACCURATE):
+            raise RuntimeError(f"Échec de l'optimisation {kind} : {prob.status}")
+
+        self.timings.append({
+            "problem": kind,
+            "first_call": not compiled,
+            "compile_time": prob.compilation_time,
+            "solve_time": prob.solver_stats.solve_time,
+        })
+        return problem
+
+    # --- Moyenne-variance -------------------------------------------------------
+
+    @staticmethod
+    def _build_mean_variance(n_assets, rank):
+        w = cp.Variable(n_assets)
+        mu = cp.Parameter(n_assets)
+        # G = sqrt(λ) Fᵗ : λ · wᵗΣw = ||G w||², forme DPP
+        G = cp.Parameter((rank, n_assets))
+        objective = cp.Maximize(mu @ w - cp.sum_squares(G @ w))
+        prob = cp.Problem(objective, [cp.sum(w) == 1, w >= 0])
+        return {"problem": prob, "w": w, "params": {"mu": mu, "G": G}}
+
+    def mean_variance(self, mu, factor, risk_aversion=10):
+        """
+        Maximise μᵗw - λ·wᵗΣw avec Σ = F Fᵗ (F : n_assets × k, ex. Cholesky ou facteurs).
+
+        Outputs:
+            w : poids optimaux
+            ret : rendement espéré
+            risk : volatilité du portefeuille
+        """
+        mu = np.asarray(mu, dtype=float)
+        factor = np.asarray(factor, dtype=float)
+        problem = self._solve("mean_variance", factor.shape, self._build_mean_variance,
+                              {"mu": mu, "G": np.sqrt(risk_aversion) * factor.T})
+        w = problem["w"].value
+        return w, mu @ w, np.linalg.norm(factor.T @ w)
+
+    def max_sharpe(self, returns, risk_aversion=10, probs=None):
+        """
+        Même problème que max_sharpe_portfolio, sur un problème compilé une fois.
+        """
+        mu = np.average(returns, axis=0, weights=probs)
+        cov = np.cov(returns.T, aweights=probs)
+        return self.mean_variance(mu, _covariance_factor(cov), risk_aversion)
+
+    # --- CVaR / STARR -----------------------------------------------------------
+
+    @staticmethod
+    def _build_cvar(n_scenarios, n_assets, with_mean):
+        w = cp.Variable(n_assets)
+        VaR = cp.Variable()
+        z = cp.Variable(n_scenarios)
+        R = cp.Parameter((n_scenarios, n_assets))
+        # tail = λ · p / α (λ = 1 pour la CVaR seule) : CVaR = VaR + tailᵗz / λ, forme DPP
+        tail = cp.Parameter(n_scenarios, nonneg=True)
+        lam = cp.Parameter(nonneg=True)
+        params = {"R": R, "tail": tail, "lam": lam}
+
+        constraints = [cp.sum(w) == 1, w >= 0, z >= 0, z >= -R @ w - VaR]
+        penalty = lam * VaR + tail @ z
+        if with_mean:
+            mu = cp.Parameter(n_assets)
+            params["mu"] = mu
+            objective = cp.Maximize(mu @ w - penalty)
+        else:
+            objective = cp.Minimize(penalty)
+        prob = cp.Problem(objective, constraints)
+        return {"problem": prob, "w": w, "params": params}
+
+    @staticmethod
+    def _tail_weights(n, alpha, probs):
+        p = np.full(n, 1.0 / n) if probs is None else np.asarray(probs, dtype=float)
+        return p, p / alpha
+
+    def min_cvar(self, returns, alpha=0.01, probs=None):
+        """
+        Même problème que min_cvar_portfolio (nombre de scénarios fixe entre deux appels
+        pour réutiliser la compilation).
+
+        Outputs:
+            w : poids optimaux
+            cvar : CVaR du portefeuille
+        """
+        returns = np.asarray(returns, dtype=float)
+        _, tail = self._tail_weights(returns.shape[0], alpha, probs)
+        problem = self._solve("min_cvar", returns.shape + (False,), self._build_cvar,
+                              {"R": returns, "tail": tail, "lam": 1.0})
+        return problem["w"].value, problem["problem"].value
+
+    def max_starr(self, returns, alpha=0.01, lambda_cvar=10, probs=None):
+        """
+        Même problème que max_starr_portfolio : maximise (mean - λ · CVaR).
+
+        Outputs:
+            w : poids optimaux
+            mean_return : rendement espéré
+            cvar : CVaR du portefeuille
+        """
+        returns = np.asarray(returns, dtype=float)
+        p, tail = self._tail_weights(returns.shape[0], alpha, probs)
+        mu = p @ returns
+        problem = self._solve("max_starr", returns.shape + (True,), self._build_cvar,
+                              {"R": returns, "tail": lambda_cvar * tail, "lam": lambda_cvar, "mu": mu})
+        w = problem["w"].value
+        mean_return = mu @ w
+        return w, mean_return, (mean_return - problem["problem"].value) / lambda_cvar
+
+    def report(self):
+        """
+        Temps moyen de compilation (premier appel) et de résolution par problème.
+
+        Output:
+            DataFrame : par problème, nombre d'appels, temps de compilation initial,
+            temps moyens de mise à jour des paramètres et de résolution (secondes)
+        """
+        import pandas as pd
+
+        timings = pd.DataFrame(self.timings)
+        if timings.empty:
+            return timings
+        first = timings[timings["first_call"]].groupby("problem")["compile_time"].sum()
+        repeat = timings[~timings["first_call"]].groupby("problem")
+        return pd.DataFrame({
+            "calls": timings.groupby("problem").size(),
+            "first_compile_time": first,
+            "repeat_compile_time": repeat["compile_time"].mean(),
+            "solve_time": timings.groupby("problem")["solve_time"].mean(),
+        })
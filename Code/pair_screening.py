@@ -0,0 +1,286 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.special import gammaln
+from scipy.stats import norm, t as student_t
+
+# Familles candidates par défaut (celles de la Vine, cf. copula_models.VINE_FAMILIES)
+DEFAULT_FAMILIES = ("gaussian", "student", "clayton", "gumbel", "frank")
+FIT_METHODS = ("itau", "mle")
+CRITERIA = ("aic", "bic")
+
+# Degrés de liberté essayés pour la Student en méthode "itau" (ρ est fixé par le tau)
+STUDENT_DF_GRID = (2.5, 3.0, 4.0, 6.0, 10.0, 20.0, 40.0)
+
+# Taille visée (octets) de la matrice des signes d'un bloc d'observations pour le tau de Kendall
+TAU_BLOCK_BYTES = 2 ** 28
+# Au-delà, la somme float32 d'un bloc ne serait plus exacte
+_FLOAT32_EXACT = 2 ** 24
+
+
+def pairwise_kendall_tau(u_data, block_bytes=TAU_BLOCK_BYTES):
+    """
+    Tau de Kendall de toutes les paires de colonnes en une passe vectorisée :
+    τ = Σ_{s<t} sign(u_s - u_t)ᵢ sign(u_s - u_t)ⱼ / (T(T-1)/2), soit un produit de
+    matrices (signes des écarts d'observations)ᵀ (signes) par blocs de lignes s.
+    Les signes (-1, 0, 1) sont exacts en float32 ; chaque bloc est sommé en float64.
+
+    Inputs:
+        u_data : DataFrame ou array (T, n_assets) des pseudo-observations
+        block_bytes : taille visée de la matrice des signes d'un bloc
+
+    Output:
+        array (n_assets, n_assets) des tau (diagonale = 1)
+    """
+    u = np.asarray(u_data, dtype=np.float32)
+    T, n = u.shape
+    block = int(max(1, min(block_bytes // (4 * T * n), _FLOAT32_EXACT // T, T)))
+
+    concordance = np.zeros((n, n))
+    for start in range(0, T, block):
+        stop = min(start + block, T)
+        rows = u[start:stop, None, :]
+        # paires (s, t) avec s dans le bloc et t après le bloc
+        signs = np.sign(rows - u[None, stop:, :]).reshape(-1, n)
+        concordance += signs.T @ signs
+        # paires internes au bloc : chacune est comptée deux fois
+        signs = np.sign(rows - u[None, start:stop, :]).reshape(-1, n)
+        concordance += 0.5 * (signs.T @ signs)
+
+    tau = concordance / (T * (T - 1) / 2)
+    np.fill_diagonal(tau, 1.0)
+    return tau
+
+
+def empirical_tail_dependence(u_data, q=0.05):
+    """
+    Coefficients de dépendance de queue empiriques de toutes les paires au seuil q :
+    λ_L = P(Uᵢ ≤ q, Uⱼ ≤ q) / q et λ_U = P(Uᵢ > 1 - q, Uⱼ > 1 - q) / q
+    (produits de matrices d'indicatrices).
+
+    Output:
+        (lower, upper) : arrays (n_assets, n_assets)
+    """
+    u = np.asarray(u_data, dtype=float)
+    T = u.shape[0]
+    lower = (u <= q).astype(np.float32)
+    upper = (u > 1 - q).astype(np.float32)
+    return (lower.T @ lower) / (T * q), (upper.T @ upper) / (T * q)
+
+
+def independence_pvalues(tau, n_obs):
+    """
+    p-valeurs du test d'indépendance fondé sur le tau de Kendall (loi asymptotique
+    N(0, 2(2T + 5) / (9T(T - 1))) sous l'hypothèse d'indépendance).
+    """
+    std = np.sqrt(2 * (2 * n_obs + 5) / (9 * n_obs * (n_obs - 1)))
+    return 2 * norm.sf(np.abs(tau) / std)
+
+
+# État propre à chaque processus du pool : pseudo-observations et options d'ajustement
+_worker = {}
+
+
+def _init_worker(u, families, method, t_scores=None):
+    _worker["u"] = np.asarray(u, dtype=float)
+    _worker["families"] = families
+    _worker["method"] = method
+    _worker["t_scores"] = t_scores
+
+
+def _student_scores(u):
+    """
+    Quantiles de Student des pseudo-observations pour chaque ν de STUDENT_DF_GRID, calculés
+    une fois pour toutes les colonnes : l'ajustement d'une paire n'évalue plus de quantiles.
+    Stockés actif par ligne (n_assets, T) pour des accès contigus.
+    """
+    return {df: np.ascontiguousarray(student_t.ppf(u, df).T) for df in STUDENT_DF_GRID}
+
+
+def _student_loglik(x, y, rho, df):
+    """
+    Log-vraisemblance de la copule de Student (ρ, ν) en fonction des quantiles x, y.
+    """
+    r2 = 1 - rho ** 2
+    const = gammaln((df + 2) / 2) + gammaln(df / 2) - 2 * gammaln((df + 1) / 2) - 0.5 * np.log(r2)
+    quad = (x * x + y * y - 2 * rho * x * y) / (df * r2)
+    return x.size * const + np.sum((df + 1) / 2 * (np.log1p(x * x / df) + np.log1p(y * y / df))
+                                   - (df + 2) / 2 * np.log1p(quad))
+
+
+def _candidates(family, tau):
+    """
+    Copules candidates d'une famille pour un tau donné : les rotations compatibles avec
+    son signe (0° / 180° si τ ≥ 0, 90° / 270° sinon, pour les familles asymétriques).
+    """
+    import pyvinecopulib as pv
+
+    fam = getattr(pv.BicopFamily, family)
+    if family in ("gaussian", "student", "frank"):
+        rotations = (0,)
+    else:
+        rotations = (0, 180) if tau >= 0 else (90, 270)
+
+    for rotation in rotations:
+        bicop = pv.Bicop(family=fam, rotation=rotation)
+        parameters = np.clip(bicop.tau_to_parameters(tau), bicop.parameters_lower_bounds,
+                             bicop.parameters_upper_bounds)
+        yield pv.Bicop(family=fam, rotation=rotation, parameters=parameters)
+
+
+def _fit_student(i, j, tau):
+    """
+    Student par inversion du tau : ρ = sin(πτ/2), ν retenu sur STUDENT_DF_GRID par la
+    vraisemblance (quantiles précalculés, cf. _student_scores).
+    """
+    rho = np.clip(np.sin(np.pi * tau / 2), -0.9999, 0.9999)
+    loglik, df = max((_student_loglik(scores[i], scores[j], rho, df), df)
+                     for df, scores in _worker["t_scores"].items())
+    return {"loglik": float(loglik), "npars": 2, "rotation": 0, "parameters": (float(rho), df)}
+
+
+def _fit_family(data, family, tau):
+    """
+    Ajuste une famille (autre que "indep" et la Student en "itau") sur une paire.
+
+    "itau" : paramètre obtenu par inversion du tau déjà calculé, rotation retenue par la
+    vraisemblance ; quelques évaluations de densité, sans optimisation.
+    "mle" : maximum de vraisemblance de pyvinecopulib.
+    """
+    import pyvinecopulib as pv
+
+    if _worker["method"] == "mle":
+        bicop = pv.Bicop()
+        bicop.select(data, controls=pv.FitControlsBicop(
+            family_set=[getattr(pv.BicopFamily, family)], parametric_method="mle",
+            preselect_families=False))
+        loglik = bicop.loglik()
+    else:
+        loglik, bicop = max(((candidate.loglik(data), candidate) for candidate in _candidates(family, tau)),
+                            key=lambda item: item[0])
+    return {"loglik": float(loglik), "npars": int(bicop.parameters.size), "rotation": int(bicop.rotation),
+            "parameters": tuple(np.ravel(bicop.parameters).tolist())}
+
+
+def _fit_batch(batch):
+    """
+    Ajustements d'un lot de paires.
+
+    Inputs:
+        batch : liste de (i, j, tau, significative)
+
+    Output:
+        liste de dicts (une ligne par paire et par famille)
+    """
+    u = _worker["u"]
+    rows = []
+    for i, j, tau, significant in batch:
+        data = np.asfortranarray(u[:, [i, j]])
+        families = _worker["families"] if significant else ("indep",)
+        for family in families:
+            if family == "indep":
+                fit = {"loglik": 0.0, "npars": 0, "rotation": 0, "parameters": ()}
+            elif family == "student" and _worker["method"] == "itau":
+                fit = _fit_student(i, j, tau)
+            else:
+                fit = _fit_family(data, family, tau)
+            rows.append({"i": i, "j": j, "family": family, **fit})
+    return rows
+
+
+def screen_pairs(u_data, families=DEFAULT_FAMILIES, method="itau", criterion="bic", tail_quantile=0.05,
+                 significance=0.05, n_jobs=None):
+    """
+    Criblage de toutes les paires d'actifs : statistiques de rang (tau de Kendall,
+    dépendance de queue empirique) calculées en une passe vectorisée, puis ajustement
+    de chaque famille candidate sur chaque paire, réparti sur un pool de processus.
+    Remplace la double boucle sur fit_bivariate_copula et la comparaison de familles
+    par ajustement de Vines complètes (fit_copula_clayton, fit_copula_student).
+
+    Inputs:
+        u_data : DataFrame ou array (T, n_assets) des pseudo-observations
+        families : familles candidates (noms de pyvinecopulib.BicopFamily) ; "indep"
+                   (log-vraisemblance nulle, aucun paramètre) est toujours ajoutée
+        method : "itau" (inversion du tau, rapide) ou "mle" (maximum de vraisemblance)
+        criterion : critère du choix de la famille, "aic" ou "bic"
+        tail_quantile : seuil q des coefficients de dépendance de queue
+        significance : seuil du test d'indépendance ; les paires non significatives ne
+                       sont ajustées qu'à "indep" (None : toutes les familles pour toutes
+                       les paires)
+        n_jobs : nombre de processus (défaut : nombre de coeurs, 1 = exécution séquentielle)
+
+    Output:
+        dict :
+            pairs : DataFrame (une ligne par paire) : asset_i, asset_j, tau, lower_tail,
+                    upper_tail, p_value, best_family, best_rotation
+            fits : DataFrame (une ligne par paire et par famille) : asset_i, asset_j, family,
+                   rotation, parameters, loglik, npars, aic, bic
+            aic, bic : tables paire × famille des critères (NaN : famille non ajustée)
+    """
+    if method not in FIT_METHODS:
+        raise ValueError(f"Méthode d'ajustement non supportée : {method}")
+    if criterion not in CRITERIA:
+        raise ValueError(f"Critère non supporté : {criterion}")
+    families = tuple(dict.fromkeys(("indep", *families)))
+
+    names = list(u_data.columns) if isinstance(u_data, pd.DataFrame) else list(range(np.shape(u_data)[1]))
+    u = np.asarray(u_data, dtype=float)
+    T, n = u.shape
+
+    tau = pairwise_kendall_tau(u)
+    lower, upper = empirical_tail_dependence(u, tail_quantile)
+    p_values = independence_pvalues(tau, T)
+
+    i_idx, j_idx = np.triu_indices(n, k=1)
+    significant = np.ones(i_idx.size, dtype=bool) if significance is None \
+        else p_values[i_idx, j_idx] < significance
+    tasks = list(zip(i_idx.tolist(), j_idx.tolist(), tau[i_idx, j_idx].tolist(), significant.tolist()))
+
+    t_scores = _student_scores(u) if method == "itau" and "student" in families else None
+    n_jobs = max(1, min(n_jobs or os.cpu_count() or 1, len(tasks)))
+    if n_jobs <= 1:
+        _init_worker(u, families, method, t_scores)
+        rows = _fit_batch(tasks)
+    else:
+        n_batches = min(4 * n_jobs, len(tasks))
+        batches = [tasks[k::n_batches] for k in range(n_batches)]
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                 initargs=(u, families, method, t_scores)) as pool:
+            rows = [row for batch in pool.map(_fit_batch, batches) for row in batch]
+
+    fits = pd.DataFrame(rows)
+    fits["aic"] = -2 * fits["loglik"] + 2 * fits["npars"]
+    fits["bic"] = -2 * fits["loglik"] + np.log(T) * fits["npars"]
+    fits = fits.sort_values(["i", "j", criterion], kind="stable").reset_index(drop=True)
+    fits.insert(0, "asset_i", [names[i] for i in fits["i"]])
+    fits.insert(1, "asset_j", [names[j] for j in fits["j"]])
+
+    best = fits.groupby(["i", "j"], sort=True).first()
+    pairs = pd.DataFrame({
+        "asset_i": [names[i] for i in i_idx],
+        "asset_j": [names[j] for j in j_idx],
+        "tau": tau[i_idx, j_idx],
+        "lower_tail": lower[i_idx, j_idx],
+        "upper_tail": upper[i_idx, j_idx],
+        "p_value": p_values[i_idx, j_idx],
+        "best_family": best["family"].values,
+        "best_rotation": best["rotation"].values,
+    })
+
+    tables = {name: fits.pivot(index=["asset_i", "asset_j"], columns="family", values=name)
+              .reindex(columns=list(families)) for name in CRITERIA}
+    fits = fits.drop(columns=["i", "j"])
+    return {"pairs": pairs, "fits": fits, **tables}
+
+
+def screened_family_set(screening, min_share=0.0):
+    """
+    Familles retenues par le criblage pour au moins une part min_share des paires,
+    sous la forme attendue par FitControlsVinecop(family_set=...) (cf. fit_vine_copula).
+    """
+    import pyvinecopulib as pv
+
+    shares = screening["pairs"]["best_family"].value_counts(normalize=True)
+    return [getattr(pv.BicopFamily, family) for family, share in shares.items() if share > min_share]
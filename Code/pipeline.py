@@ -0,0 +1,427 @@
+import ast
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import time
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from Code.price_store import PriceStore
+
+CACHE_DIR = "Output/cache"
+
+DEFAULT_PARAMS = {
+    "store_dir": "Data/store",
+    "data_folder": "Data/",
+    "files": ["BNP.csv", "Airbus.csv", "Deutsche.csv", "Enel.csv", "LVMH.csv", "Sanofi.csv"],
+    "tickers": None,
+    "start": None,
+    "end": None,
+    "garch_engine": "arch",
+    "garch_params_path": None,
+    "trunc_lvl": "auto",
+    "vine_mode": "full",
+    "vine_cache_dir": "Output/vine",
+    "marginal_method": "empirical_gpd",
+    "n_sim": 1000,
+    "seed": 0,
+    "scenario_cache_dir": "Output/scenarios",
+    "vecm_lags": 1,
+    "cov_model": "sample",
+    "n_factors": None,
+    "delta": 2.5,
+    "tau": 0.05,
+    "bl_mode": "scenarios",
+    "alpha": 0.01,
+    "risk_aversion": 10,
+    "lambda_cvar": 10,
+    "solver": "cvxpy",
+}
+
+
+def _digest(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(json.dumps(part, sort_keys=True, default=str).encode())
+    return h.hexdigest()[:20]
+
+
+PACKAGE = "Code"
+
+
+def _package_imports(source):
+    """
+    Modules du paquet Code importés par source (imports en tête de fichier ou dans les fonctions).
+    """
+    modules = set()
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.ImportFrom) and node.module:
+            names = [node.module]
+        elif isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        else:
+            continue
+        modules.update(name for name in names if name.startswith(PACKAGE + "."))
+    return modules
+
+
+def _module_path(module):
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), module.split(".")[-1] + ".py")
+
+
+def _modules_digest(modules):
+    """
+    Empreinte du code source des modules et de tout ce qu'ils importent du paquet Code
+    (fermeture transitive) : corriger compute_posterior change la clé des étapes qui
+    appellent black_litterman, directement ou non.
+    """
+    seen, todo = set(), set(modules)
+    while todo:
+        module = todo.pop()
+        seen.add(module)
+        with open(_module_path(module)) as f:
+            todo |= _package_imports(f.read()) - seen
+    sources = {}
+    for module in sorted(seen):
+        with open(_module_path(module)) as f:
+            sources[module] = f.read()
+    return _digest(sources)
+
+
+def _function_dependencies(func):
+    """
+    Modules du paquet Code dont dépend func : imports dans son corps, et objets globaux
+    qu'elle utilise définis dans un autre module du paquet (ex. PriceStore).
+    """
+    modules = _package_imports(inspect.getsource(func))
+    for name in func.__code__.co_names:
+        module = getattr(func.__globals__.get(name), "__module__", None)
+        if module and module.startswith(PACKAGE + ".") and module != func.__module__:
+            modules.add(module)
+    return modules
+
+
+class Stage:
+    """
+    Étape du pipeline : fonction des sorties des étapes inputs et des paramètres params.
+    fingerprint(params) (optionnel) ajoute à la clé une empreinte de données externes
+    (ex. contenu des fichiers de prix). Le code de l'étape entre dans la clé avec celui des
+    modules du paquet Code qu'elle utilise (cf. _function_dependencies) et de leurs
+    propres imports ; deps ajoute des modules que l'analyse ne voit pas.
+    """
+
+    def __init__(self, name, func, inputs=(), params=(), fingerprint=None, deps=()):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.params = list(params)
+        self.fingerprint = fingerprint
+        self.deps = sorted(_function_dependencies(func) | set(deps))
+        self.source_hash = _digest(inspect.getsource(func), _modules_digest(self.deps))
+
+
+class Pipeline:
+    """
+    Graphe d'étapes déclaré une fois, exécuté avec un cache disque par étape.
+
+    La clé d'une étape hache son code (et celui des modules qu'elle appelle), ses
+    paramètres et les clés de ses entrées (donc tout l'amont) : les clés se calculent
+    sans rien exécuter, un changement de paramètre ou de code ne change que les clés
+    des étapes en aval, et seules celles-ci sont recalculées. Les sorties en cache ne sont relues que si une étape recalculée
+    (ou demandée) en a besoin.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.stages = {}
+        self.stats = []
+
+    def stage(self, name, inputs=(), params=(), fingerprint=None, deps=()):
+        """
+        Décorateur : déclare une étape (les entrées doivent être déclarées avant).
+        """
+        def register(func):
+            missing = [i for i in inputs if i not in self.stages]
+            if missing:
+                raise ValueError(f"Étape {name} : entrées inconnues {missing}")
+            self.stages[name] = Stage(name, func, inputs, params, fingerprint, deps)
+            return func
+        return register
+
+    def keys(self, params):
+        """
+        Clé de cache de chaque étape (dans l'ordre de déclaration, qui est topologique).
+        """
+        keys = {}
+        for name, stage in self.stages.items():
+            extra = stage.fingerprint(params) if stage.fingerprint else None
+            keys[name] = _digest(name, stage.source_hash, {p: params[p] for p in stage.params},
+                                 [keys[i] for i in stage.inputs], extra)
+        return keys
+
+    def _path(self, name, key):
+        return os.path.join(self.cache_dir, f"{name}-{key}.pkl")
+
+    def run(self, params=None, targets=None, recorder=None):
+        """
+        Exécute le pipeline (ou seulement l'amont des étapes targets).
+
+        Inputs:
+            params : paramètres (complétés par DEFAULT_PARAMS)
+            targets : étapes dont la sortie est demandée (défaut : toutes)
+            recorder : RunRecorder (cf. instrumentation) qui mesure chaque étape
+                       et collecte ses diagnostics pour le rapport d'exécution
+
+        Output:
+            dict {étape: sortie} pour les étapes demandées
+        """
+        params = {**DEFAULT_PARAMS, **(params or {})}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        keys = self.keys(params)
+        targets = list(targets or self.stages)
+        outputs = {}
+        self.stats = []
+        if recorder is not None:
+            recorder.params = params
+
+        def get(name):
+            if name in outputs:
+                return outputs[name]
+            stage = self.stages[name]
+            path = self._path(name, keys[name])
+            start = time.perf_counter()
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    outputs[name] = pickle.load(f)
+                status = "hit"
+                if recorder is not None:
+                    recorder.record_cached(name, time.perf_counter() - start, outputs[name])
+            else:
+                args = [get(i) for i in stage.inputs]
+                kwargs = {p: params[p] for p in stage.params}
+                start = time.perf_counter()
+                if recorder is not None:
+                    outputs[name] = recorder.call(name, stage.func, *args, **kwargs)
+                else:
+                    outputs[name] = stage.func(*args, **kwargs)
+                tmp_path = path + ".tmp"
+                with open(tmp_path, "wb") as f:
+                    pickle.dump(outputs[name], f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(tmp_path, path)
+                status = "miss"
+            self.stats.append({"stage": name, "status": status, "key": keys[name],
+                               "seconds": time.perf_counter() - start})
+            return outputs[name]
+
+        return {name: get(name) for name in targets}
+
+    def report(self):
+        """
+        Statistiques de la dernière exécution : statut (hit / miss) et durée par étape.
+        """
+        return pd.DataFrame(self.stats).set_index("stage")
+
+
+# --- Pipeline par défaut : étapes de main.py -------------------------------------
+# Les dépendances lourdes (arch, statsmodels, pyvinecopulib, cvxpy) sont importées dans
+# les étapes qui les utilisent : une exécution servie par le cache ne les charge pas.
+
+def _files_digest(paths):
+    """
+    Empreinte du contenu des fichiers existants parmi paths (chemin et octets).
+    """
+    h = hashlib.sha256()
+    for path in paths:
+        if os.path.exists(path):
+            h.update(os.path.basename(path).encode())
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    h.update(block)
+    return h.hexdigest()
+
+
+def _store_fingerprint(params):
+    """
+    Empreinte du contenu de la base de prix (actifs, dates, prix), ouverte (ou ingérée
+    depuis les CSV, nouvelles dates ajoutées) comme le fera l'étape load : la même source
+    est hachée à la première exécution et aux suivantes.
+    """
+    store = PriceStore.open_or_ingest(params["store_dir"], params["data_folder"], params["files"])
+    h = hashlib.sha256(json.dumps(store.tickers).encode())
+    h.update(store.dates().values.tobytes())
+    h.update(np.ascontiguousarray(store.closes().to_numpy()).tobytes())
+    return h.hexdigest()
+
+
+def _garch_state_fingerprint(params):
+    """
+    Démarrage à chaud (garch_params_path renseigné) : la sortie dépend des paramètres
+    du dernier ajustement, dont le contenu entre donc dans la clé.
+    """
+    path = params["garch_params_path"]
+    return None if path is None else _files_digest([path])
+
+
+def _vine_state_fingerprint(params):
+    """
+    Modes "auto", "refit" et "load" : la sortie dépend de la Vine en cache de VineService,
+    dont le contenu entre donc dans la clé.
+    """
+    if params["vine_mode"] == "full" or params["vine_cache_dir"] is None:
+        return None
+    from Code.vine_service import VINE_FILE, META_FILE as VINE_META_FILE
+
+    return _files_digest([os.path.join(params["vine_cache_dir"], f) for f in (VINE_FILE, VINE_META_FILE)])
+
+
+pipeline = Pipeline()
+
+
+@pipeline.stage("load", params=["store_dir", "data_folder", "files", "tickers", "start", "end"],
+                fingerprint=_store_fingerprint)
+def load_prices(store_dir, data_folder, files, tickers, start, end):
+    # tickers : sous-univers de la base (défaut : tous), start / end : bornes des dates (incluses)
+    store = PriceStore.open_or_ingest(store_dir, data_folder, files)
+    missing = sorted(set(tickers or []) - set(store.tickers))
+    if missing:
+        raise ValueError(f"Actifs absents de la base de prix : {missing}")
+    return store.closes(tickers).loc[start:end].copy()
+
+
+@pipeline.stage("returns", inputs=["load"])
+def log_returns(prices):
+    return np.log(prices / prices.shift(1)).dropna()
+
+
+@pipeline.stage("garch", inputs=["returns"], params=["garch_engine", "garch_params_path"],
+                fingerprint=_garch_state_fingerprint)
+def garch(returns, garch_engine, garch_params_path):
+    from Code.garch_models import fit_garch_batch, load_garch_params, save_garch_params, standardize_residuals
+
+    # garch_params_path None : départ à froid, la sortie ne dépend que des rendements ;
+    # sinon démarrage à chaud depuis le dernier ajustement (fichier haché dans la clé)
+    previous_params = load_garch_params(garch_params_path) if garch_params_path else None
+    residuals, sigmas, params = fit_garch_batch(returns, starting_values=previous_params, engine=garch_engine)
+    if garch_params_path:
+        # les actifs hors du sous-univers courant gardent leurs paramètres
+        if previous_params is not None:
+            params = pd.concat([params, previous_params.drop(params.index, errors="ignore")])
+        save_garch_params(params, garch_params_path)
+        params = params.loc[returns.columns]
+    return {
+        "standardized": pd.DataFrame(standardize_residuals(residuals, sigmas),
+                                     index=returns.index, columns=returns.columns),
+        "sigmas": pd.DataFrame(sigmas, index=returns.index, columns=returns.columns),
+        "params": params,
+    }
+
+
+@pipeline.stage("pseudo_obs", inputs=["garch"])
+def pseudo_obs(garch):
+    from Code.ranks import pseudo_observations
+
+    return pseudo_observations(garch["standardized"])
+
+
+@pipeline.stage("vine", inputs=["pseudo_obs"], params=["trunc_lvl", "vine_mode", "vine_cache_dir"],
+                fingerprint=_vine_state_fingerprint)
+def vine(pseudo_obs, trunc_lvl, vine_mode, vine_cache_dir):
+    from Code.vine_service import VineService
+
+    # vine_mode "full" (défaut) : sélection complète, sans dépendance à l'historique ;
+    # "auto" / "refit" / "load" : Vine en cache de VineService (contenu haché dans la clé)
+    return VineService(vine_cache_dir, trunc_lvl=trunc_lvl).fit(pseudo_obs, mode=vine_mode)
+
+
+@pipeline.stage("marginals", inputs=["garch"], params=["marginal_method"])
+def marginals(garch, marginal_method):
+    from Code.marginals import fit_marginals
+
+    return fit_marginals(garch["standardized"], method=marginal_method)
+
+
+@pipeline.stage("simulate", inputs=["vine", "garch", "returns", "marginals"],
+                params=["n_sim", "seed", "scenario_cache_dir"])
+def simulate(vine, garch, returns, marginals, n_sim, seed, scenario_cache_dir):
+    from Code.scenario_service import ScenarioService
+
+    # scénarios en cache par empreinte du modèle (Vine, volatilités, marges) et de la graine
+    scenarios = ScenarioService(scenario_cache_dir, dtype=np.float64).vine_scenarios(
+        vine, garch["sigmas"], n_sim, seed=seed, marginals=marginals)
+    return pd.DataFrame(np.asarray(scenarios), columns=returns.columns)
+
+
+@pipeline.stage("vecm", inputs=["load"], params=["vecm_lags"])
+def vecm(prices, vecm_lags):
+    from statsmodels.tools.sm_exceptions import ValueWarning
+    from Code.vecm_views import fit_vecm
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", ValueWarning)  # index de dates sans fréquence
+        return fit_vecm(prices, lags=vecm_lags)
+
+
+@pipeline.stage("views", inputs=["load", "vecm"])
+def views(prices, forecast):
+    from Code.vecm_views import generate_views
+
+    P, q = generate_views(prices.iloc[-1], forecast)
+    return {"P": P, "q": q}
+
+
+@pipeline.stage("black_litterman", inputs=["returns", "views", "simulate"],
+                params=["delta", "tau", "bl_mode", "n_sim", "cov_model", "n_factors", "seed",
+                        "scenario_cache_dir"])
+def black_litterman(returns, views, sim_returns, delta, tau, bl_mode, n_sim, cov_model, n_factors, seed,
+                    scenario_cache_dir):
+    from Code.covariance import estimate_covariance
+    from Code.black_litterman import compute_equilibrium_return, compute_posterior, scenario_posterior
+    from Code.scenario_service import ScenarioService
+
+    # "sample" : returns.cov() dense ; "pca" / "ledoit_wolf" : facteurs + diagonale
+    cov_matrix = estimate_covariance(returns, method=cov_model, n_factors=n_factors)
+    market_weights = np.ones(len(returns.columns)) / len(returns.columns)
+    pi = compute_equilibrium_return(cov_matrix, market_weights, delta=delta)
+    mu_post, cov_post = compute_posterior(pi, cov_matrix, views["P"], views["q"], tau=tau)
+
+    probs = None
+    if bl_mode == "scenarios":
+        scenarios, probs = scenario_posterior(sim_returns.to_numpy(dtype=float), pi, cov_matrix,
+                                              views["P"], views["q"], tau=tau)
+    else:
+        scenarios = np.asarray(ScenarioService(scenario_cache_dir, dtype=np.float64).posterior_scenarios(
+            mu_post, cov_post, n_sim, seed=seed))
+    return {
+        "mu_post": mu_post,
+        "cov_post": cov_post,
+        "scenarios": pd.DataFrame(scenarios, columns=returns.columns),
+        "probs": probs,
+    }
+
+
+@pipeline.stage("optimize", inputs=["black_litterman"],
+                params=["alpha", "risk_aversion", "lambda_cvar", "solver", "cov_model", "n_factors"])
+def optimize(bl, alpha, risk_aversion, lambda_cvar, solver, cov_model, n_factors):
+    from Code.optimization import max_sharpe_portfolio, min_cvar_portfolio, max_starr_portfolio
+
+    scenarios, probs = bl["scenarios"].to_numpy(), bl["probs"]
+    w_sharpe, ret_sharpe, risk_sharpe = max_sharpe_portfolio(scenarios, risk_aversion=risk_aversion, probs=probs,
+                                                             cov_model=cov_model, n_factors=n_factors)
+    w_cvar, cvar_value = min_cvar_portfolio(scenarios, alpha=alpha, probs=probs, solver=solver)
+    w_starr, ret_starr, cvar_starr = max_starr_portfolio(scenarios, alpha=alpha, lambda_cvar=lambda_cvar,
+                                                         probs=probs, solver=solver)
+    weights = pd.DataFrame({
+        "Max Sharpe": w_sharpe,
+        "Min CVaR": w_cvar,
+        "Max STARR": w_starr
+    }, index=bl["scenarios"].columns)
+    metrics = {
+        "Max Sharpe": {"return": ret_sharpe, "risk": risk_sharpe},
+        "Min CVaR": {"cvar": cvar_value},
+        "Max STARR": {"return": ret_starr, "cvar": cvar_starr},
+    }
+    return {"weights": weights, "metrics": metrics}
@@ -0,0 +1,183 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+from Code.data_loader import load_data
+
+# Stockage colonne-par-date : chaque matrice (dates × actifs) est un fichier binaire brut
+# en float64, ligne par date. Ajouter un jour revient à écrire une ligne en fin de fichier,
+# et la lecture se fait par np.memmap (aucune copie, aucun parsing). meta.json (nombre de
+# lignes) est écrit en dernier, par renommage atomique : c'est lui qui valide une écriture.
+META_FILE = "meta.json"
+DATES_FILE = "dates.i8"
+CLOSES_FILE = "closes.f8"
+RETURNS_FILE = "log_returns.f8"
+
+
+class PriceStore:
+    """
+    Base de prix alignés (dates × actifs) mappée en mémoire.
+
+    Contient les prix de clôture et les rendements log (la première ligne de rendements
+    vaut NaN), ainsi que l'index des dates. Toutes les étapes du pipeline lisent ces
+    mêmes fichiers.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, META_FILE)) as f:
+            meta = json.load(f)
+        self.tickers = meta["tickers"]
+        self.n_rows = meta["n_rows"]
+        self.sources = meta.get("sources")
+
+    @classmethod
+    def ingest_csvs(cls, folder, files, path):
+        """
+        Lit une fois les CSV par actif (format investing.com), aligne les dates communes
+        et crée la base dans path.
+        """
+        return cls.from_frame(_read_csvs(folder, files), path, sources=_source_stamps(folder, files))
+
+    @classmethod
+    def from_frame(cls, prices_df, path, sources=None):
+        """
+        Crée (ou écrase) la base à partir d'un DataFrame de prix alignés.
+        sources : empreintes (taille, date de modification) des CSV lus, cf. open_or_ingest
+        """
+        os.makedirs(path, exist_ok=True)
+        closes = prices_df.to_numpy(dtype=np.float64)
+        log_returns = np.full_like(closes, np.nan)
+        log_returns[1:] = np.log(closes[1:] / closes[:-1])
+
+        dates = prices_df.index.values.astype("datetime64[D]").astype(np.int64)
+        for filename, block in [(DATES_FILE, dates), (CLOSES_FILE, closes), (RETURNS_FILE, log_returns)]:
+            tmp_path = os.path.join(path, filename + ".tmp")
+            np.ascontiguousarray(block).tofile(tmp_path)
+            os.replace(tmp_path, os.path.join(path, filename))
+
+        _write_meta(path, list(prices_df.columns), len(prices_df), sources)
+        return cls(path)
+
+    @classmethod
+    def open_or_ingest(cls, path, folder, files):
+        """
+        Ouvre la base si elle existe, sinon l'ingère depuis les CSV.
+
+        Si un CSV a changé depuis sa dernière lecture (taille ou date de modification),
+        les CSV sont relus : les nouvelles dates sont ajoutées en fin de base (append),
+        sans réécrire l'historique. La base est réingérée en entier si la liste des actifs
+        a changé ou si des prix déjà stockés ont été révisés.
+        """
+        if not os.path.exists(os.path.join(path, META_FILE)):
+            return cls.ingest_csvs(folder, files, path)
+        store = cls(path)
+        sources = _source_stamps(folder, files)
+        if store.sources == sources:
+            return store
+
+        prices_df = _read_csvs(folder, files)
+        if list(prices_df.columns) != store.tickers:
+            return cls.from_frame(prices_df, path, sources=sources)
+        stored = store.closes()
+        overlap = prices_df.loc[prices_df.index <= stored.index[-1]] if store.n_rows else prices_df.iloc[:0]
+        if not overlap.index.equals(stored.index) or not np.array_equal(overlap.to_numpy(), stored.to_numpy()):
+            return cls.from_frame(prices_df, path, sources=sources)
+        store.append(prices_df, sources=sources)
+        return store
+
+    def _matrix(self, filename):
+        return np.memmap(os.path.join(self.path, filename), dtype=np.float64, mode="r",
+                         shape=(self.n_rows, len(self.tickers)))
+
+    def dates(self):
+        raw = np.fromfile(os.path.join(self.path, DATES_FILE), dtype=np.int64, count=self.n_rows)
+        return pd.DatetimeIndex(raw.astype("datetime64[D]"), name="Date")
+
+    def closes(self, tickers=None):
+        """
+        Vue (sans copie) des prix de clôture, en DataFrame indexé par date.
+        Une liste tickers différente de l'ordre de la base renvoie une copie.
+        """
+        return self._frame(self._matrix(CLOSES_FILE), tickers)
+
+    def log_returns(self, tickers=None):
+        """
+        Vue (sans copie) des rendements log ; la première date (NaN) est exclue.
+        """
+        return self._frame(self._matrix(RETURNS_FILE), tickers).iloc[1:]
+
+    def _frame(self, matrix, tickers):
+        df = pd.DataFrame(matrix, index=self.dates(), columns=self.tickers, copy=False)
+        if tickers is not None and list(tickers) != self.tickers:
+            df = df[list(tickers)]  # sous-ensemble d'actifs : copie
+        return df
+
+    def append(self, new_prices, sources=None):
+        """
+        Ajoute de nouvelles dates (DataFrame de prix, mêmes colonnes) en fin de base.
+        Les dates déjà présentes sont ignorées.
+
+        Les fichiers sont d'abord ramenés à n_rows lignes (ce qu'aurait laissé un ajout
+        interrompu est écarté), les lignes ajoutées, puis meta.json remplacé de façon
+        atomique : une interruption laisse la base dans son état précédent.
+        sources : nouvelles empreintes des CSV (cf. open_or_ingest)
+        """
+        new_prices = new_prices[self.tickers].dropna().sort_index()
+        last_date = self.dates()[-1] if self.n_rows else None
+        if last_date is not None:
+            new_prices = new_prices[new_prices.index > last_date]
+        if sources is not None:
+            self.sources = sources
+        if new_prices.empty:
+            if sources is not None:
+                _write_meta(self.path, self.tickers, self.n_rows, self.sources)
+            return 0
+
+        closes = new_prices.to_numpy(dtype=np.float64)
+        previous = self._matrix(CLOSES_FILE)[-1:] if self.n_rows else closes[:1] * np.nan
+        log_returns = np.log(closes / np.vstack([previous, closes[:-1]]))
+        dates = new_prices.index.values.astype("datetime64[D]").astype(np.int64)
+
+        for filename, block in [(DATES_FILE, dates), (CLOSES_FILE, closes), (RETURNS_FILE, log_returns)]:
+            row_bytes = 8 if filename == DATES_FILE else 8 * len(self.tickers)
+            with open(os.path.join(self.path, filename), "r+b") as f:
+                f.truncate(self.n_rows * row_bytes)
+                f.seek(0, os.SEEK_END)
+                np.ascontiguousarray(block).tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+
+        self.n_rows += len(new_prices)
+        _write_meta(self.path, self.tickers, self.n_rows, self.sources)
+        return len(new_prices)
+
+
+def _read_csvs(folder, files):
+    """
+    Prix de clôture des CSV par actif (format investing.com), alignés sur les dates communes.
+    """
+    all_prices = {}
+    for file in files:
+        ticker = file.replace(".csv", "")
+        all_prices[ticker] = load_data(os.path.join(folder, file))["Close"]
+    return pd.DataFrame(all_prices).dropna()
+
+
+def _source_stamps(folder, files):
+    """
+    Taille et date de modification de chaque CSV : un CSV inchangé n'est pas relu.
+    """
+    stamps = {}
+    for file in files:
+        stat = os.stat(os.path.join(folder, file))
+        stamps[file] = [stat.st_size, stat.st_mtime_ns]
+    return stamps
+
+
+def _write_meta(path, tickers, n_rows, sources=None):
+    tmp_path = os.path.join(path, META_FILE + ".tmp")
+    with open(tmp_path, "w") as f:
+        json.dump({"tickers": tickers, "n_rows": n_rows, "sources": sources}, f)
+    os.replace(tmp_path, os.path.join(path, META_FILE))
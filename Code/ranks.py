@@ -0,0 +1,280 @@
+import numpy as np
+import pandas as pd
+
+try:
+    import numba
+except ImportError:  # numba est optionnel : les mêmes fonctions tournent en Python
+    numba = None
+
+
+def rank_matrix(values):
+    """
+    Rangs empiriques (1..T, moyenne des rangs en cas d'égalité, comme
+    scipy.stats.rankdata(method="average")) de toutes les colonnes d'une matrice
+    en un seul tri vectorisé.
+
+    Inputs:
+        values : array ou DataFrame (T, n_assets), sans NaN
+
+    Output:
+        array (T, n_assets) des rangs
+    """
+    x = np.asarray(values, dtype=float)
+    T = x.shape[0]
+    order = np.argsort(x, axis=0, kind="stable")
+    sorted_x = np.take_along_axis(x, order, axis=0)
+
+    # groupes d'égalité : première et dernière position de chaque valeur dans le tri
+    positions = np.broadcast_to(np.arange(T)[:, None], x.shape)
+    is_first = np.ones(x.shape, dtype=bool)
+    is_first[1:] = sorted_x[1:] != sorted_x[:-1]
+    is_last = np.ones(x.shape, dtype=bool)
+    is_last[:-1] = is_first[1:]
+    first = np.maximum.accumulate(np.where(is_first, positions, 0), axis=0)
+    last = np.minimum.accumulate(np.where(is_last, positions, T)[::-1], axis=0)[::-1]
+
+    ranks = np.empty(x.shape)
+    np.put_along_axis(ranks, order, (first + last) / 2 + 1, axis=0)
+    return ranks
+
+
+def pseudo_observations(standardized):
+    """
+    Pseudo-observations uniformes rang / (T + 1) de toutes les colonnes d'une matrice de
+    résidus standardisés (équivalent matriciel de garch_models.to_pseudo_observations).
+
+    Output:
+        même type que l'entrée (DataFrame avec index et colonnes conservés, ou array)
+    """
+    u = rank_matrix(standardized) / (np.shape(standardized)[0] + 1)
+    if isinstance(standardized, pd.DataFrame):
+        return pd.DataFrame(u, index=standardized.index, columns=standardized.columns)
+    return u
+
+
+def _jit(func):
+    return numba.njit(cache=True)(func) if numba is not None else func
+
+
+# Arbre de rang (treap) de chaque actif, en tableaux : le nœud i est l'observation
+# rangée en position i du tampon circulaire de RollingRanks, le nœud window est le nœud
+# vide (taille 0). Les nœuds sont ordonnés par (valeur, position) : clés distinctes même
+# en cas d'égalité des valeurs ; size[i] est le nombre de nœuds du sous-arbre de i.
+
+@_jit
+def _node_less(key, a, b):
+    return key[a] < key[b] or (key[a] == key[b] and a < b)
+
+
+@_jit
+def _rotate_right(left, right, size, t):
+    child = left[t]
+    left[t] = right[child]
+    right[child] = t
+    size[t] = size[left[t]] + size[right[t]] + 1
+    size[child] = size[left[child]] + size[right[child]] + 1
+    return child
+
+
+@_jit
+def _rotate_left(left, right, size, t):
+    child = right[t]
+    right[t] = left[child]
+    left[child] = t
+    size[t] = size[left[t]] + size[right[t]] + 1
+    size[child] = size[left[child]] + size[right[child]] + 1
+    return child
+
+
+@_jit
+def _insert(key, prio, left, right, size, t, node):
+    if t == prio.shape[0] - 1:
+        return node
+    size[t] += 1
+    if _node_less(key, node, t):
+        left[t] = _insert(key, prio, left, right, size, left[t], node)
+        if prio[left[t]] > prio[t]:
+            return _rotate_right(left, right, size, t)
+    else:
+        right[t] = _insert(key, prio, left, right, size, right[t], node)
+        if prio[right[t]] > prio[t]:
+            return _rotate_left(left, right, size, t)
+    return t
+
+
+@_jit
+def _merge(prio, left, right, size, a, b):
+    nil = prio.shape[0] - 1
+    if a == nil:
+        return b
+    if b == nil:
+        return a
+    if prio[a] > prio[b]:
+        right[a] = _merge(prio, left, right, size, right[a], b)
+        size[a] = size[left[a]] + size[right[a]] + 1
+        return a
+    left[b] = _merge(prio, left, right, size, a, left[b])
+    size[b] = size[left[b]] + size[right[b]] + 1
+    return b
+
+
+@_jit
+def _erase(key, prio, left, right, size, t, node):
+    if t == node:
+        return _merge(prio, left, right, size, left[node], right[node])
+    size[t] -= 1
+    if _node_less(key, node, t):
+        left[t] = _erase(key, prio, left, right, size, left[t], node)
+    else:
+        right[t] = _erase(key, prio, left, right, size, right[t], node)
+    return t
+
+
+@_jit
+def _count(key, left, right, size, t, x, inclusive):
+    """
+    Nombre de valeurs < x (≤ x si inclusive) : une descente de la racine à une feuille.
+    """
+    nil = key.shape[0] - 1
+    count = 0
+    while t != nil:
+        if key[t] < x or (inclusive and key[t] == x):
+            count += size[left[t]] + 1
+            t = right[t]
+        else:
+            t = left[t]
+    return count
+
+
+@_jit
+def _push_rows(key, prio, left, right, size, root, slot, x, full, ranks):
+    """
+    Pour chaque actif : retire le nœud slot (si la fenêtre est pleine), l'insère avec sa
+    nouvelle valeur x[i] et renvoie dans ranks le rang moyen de x[i] dans la fenêtre.
+    """
+    nil = prio.shape[0] - 1
+    for i in range(x.shape[0]):
+        if full:
+            root[i] = _erase(key[i], prio, left[i], right[i], size[i], root[i], slot)
+        key[i, slot] = x[i]
+        left[i, slot] = nil
+        right[i, slot] = nil
+        size[i, slot] = 1
+        root[i] = _insert(key[i], prio, left[i], right[i], size[i], root[i], slot)
+        below = _count(key[i], left[i], right[i], size[i], root[i], x[i], False)
+        upto = _count(key[i], left[i], right[i], size[i], root[i], x[i], True)
+        # rang moyen en cas d'égalité : (nb < x) + (nb ≤ x + 1) / 2
+        ranks[i] = (below + upto + 1) / 2
+
+
+class RollingRanks:
+    """
+    Pseudo-observations sur une fenêtre glissante de window observations, mises à jour
+    à chaque nouvelle observation sans retrier la fenêtre.
+
+    Chaque actif garde les valeurs de sa fenêtre dans un arbre de rang (treap aux
+    priorités aléatoires, tailles des sous-arbres dans les nœuds) : retirer la valeur
+    qui sort, insérer la nouvelle et compter les valeurs inférieures coûtent O(log W)
+    par actif (en espérance), boucle compilée avec numba s'il est installé. Seules les
+    valeurs de la fenêtre sont connues de la structure : push accepte n'importe quelle
+    nouvelle observation (mise à jour en direct, mode incrémental).
+    """
+
+    def __init__(self, window, columns=None, seed=0):
+        """
+        Inputs:
+            window : taille de la fenêtre glissante
+            columns : noms des actifs (pseudo_observations renvoie alors un DataFrame)
+            seed : graine des priorités de l'arbre (sans effet sur les rangs)
+        """
+        self.window = int(window)
+        self.columns = columns
+        self.n_assets = None
+        self._count = 0    # nombre d'observations dans la fenêtre
+        self._head = 0     # position, dans le tampon circulaire, de la plus ancienne
+        self._labels = [None] * self.window
+        self._rng = np.random.default_rng(seed)
+
+    def _allocate(self, n_assets):
+        self.n_assets = n_assets
+        self._values = np.empty((self.window, n_assets))  # tampon circulaire chronologique
+        # arbres de rang : une ligne par actif, colonne window = nœud vide
+        nil = self.window
+        self._key = np.zeros((n_assets, nil + 1))
+        self._left = np.full((n_assets, nil + 1), nil, dtype=np.int64)
+        self._right = np.full((n_assets, nil + 1), nil, dtype=np.int64)
+        self._size = np.zeros((n_assets, nil + 1), dtype=np.int64)
+        self._root = np.full(n_assets, nil, dtype=np.int64)
+        self._prio = np.full(nil + 1, -1.0)  # priorités communes à tous les actifs
+
+    def __len__(self):
+        return self._count
+
+    def push(self, row, label=None):
+        """
+        Ajoute une observation (et retire la plus ancienne si la fenêtre est pleine).
+
+        Inputs:
+            row : vecteur (n_assets,) (array ou Series) des résidus standardisés de la date
+            label : date de l'observation (index de pseudo_observations)
+
+        Output:
+            array (n_assets,) des pseudo-observations de la nouvelle date dans la fenêtre
+        """
+        x = np.asarray(row, dtype=float).ravel()
+        if self.n_assets is None:
+            self._allocate(x.size)
+        elif x.size != self.n_assets:
+            raise ValueError(f"{x.size} valeurs reçues pour {self.n_assets} actifs")
+
+        full = self._count == self.window
+        if full:
+            slot = self._head  # la plus ancienne observation sort
+            self._head = (self._head + 1) % self.window
+        else:
+            slot = (self._head + self._count) % self.window
+            self._count += 1
+        self._values[slot] = x
+        self._labels[slot] = label
+
+        self._prio[slot] = self._rng.random()
+        ranks = np.empty(self.n_assets)
+        _push_rows(self._key, self._prio, self._left, self._right, self._size, self._root,
+                   slot, x, full, ranks)
+        return ranks / (self._count + 1)
+
+    def extend(self, values):
+        """
+        Ajoute plusieurs observations (array ou DataFrame (n, n_assets), dans l'ordre
+        chronologique) et renvoie les pseudo-observations de la dernière.
+        """
+        labels = values.index if isinstance(values, pd.DataFrame) else [None] * len(values)
+        if isinstance(values, pd.DataFrame) and self.columns is None:
+            self.columns = values.columns
+        last = None
+        for label, row in zip(labels, np.asarray(values, dtype=float)):
+            last = self.push(row, label)
+        return last
+
+    def window_values(self):
+        """
+        Observations de la fenêtre, dans l'ordre chronologique (array (len(self), n_assets)).
+        """
+        order = (self._head + np.arange(self._count)) % self.window
+        return self._values[order]
+
+    def pseudo_observations(self):
+        """
+        Pseudo-observations de toute la fenêtre courante (pour une réestimation de la Vine) :
+        un tri vectorisé de la fenêtre est alors plus rapide que W requêtes.
+
+        Output:
+            DataFrame (si les noms des actifs sont connus) ou array (len(self), n_assets)
+        """
+        u = pseudo_observations(self.window_values())
+        if self.columns is None:
+            return u
+        order = (self._head + np.arange(self._count)) % self.window
+        labels = [self._labels[i] for i in order]
+        index = None if any(label is None for label in labels) else pd.Index(labels)
+        return pd.DataFrame(u, index=index, columns=self.columns)
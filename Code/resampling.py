@@ -0,0 +1,157 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from Code.black_litterman import PosteriorCovariance, generate_posterior_returns
+
+RESAMPLE_STRATEGIES = ("max_sharpe", "min_cvar", "max_starr")
+
+# Paramètres de DEFAULT_CONFIG qui ont le même nom dans les paramètres du pipeline
+RESAMPLE_PARAMS = ("n_sim", "alpha", "risk_aversion", "lambda_cvar", "solver")
+
+DEFAULT_CONFIG = {
+    "strategy": "max_sharpe",
+    "n_sim": 1000,           # scénarios par rééchantillonnage
+    "alpha": 0.01,           # niveau de la CVaR
+    "risk_aversion": 10,
+    "lambda_cvar": 10,
+    "solver": "cvxpy",       # "lp" : solveur dédié cvar_solver (CVaR / STARR)
+}
+
+# État propre à chaque processus du pool : loi a posteriori, paramètres et optimiseur
+# dont les problèmes compilés servent à tous les rééchantillonnages du processus.
+_worker = {}
+
+
+def _init_worker(mu_post, cov_post, config):
+    from Code.optimization import PortfolioOptimizer
+
+    _worker["mu_post"] = mu_post
+    _worker["cov_post"] = cov_post
+    _worker["config"] = config
+    _worker["optimizer"] = PortfolioOptimizer()
+
+
+def _optimize(scenarios):
+    """
+    Poids de la stratégie choisie sur un jeu de scénarios.
+    """
+    config = _worker["config"]
+    optimizer = _worker["optimizer"]
+    strategy = config["strategy"]
+
+    if strategy == "max_sharpe":
+        w, _, _ = optimizer.max_sharpe(scenarios, risk_aversion=config["risk_aversion"])
+    elif config["solver"] == "lp":
+        from Code.cvar_solver import solve_min_cvar, solve_max_starr
+
+        if strategy == "min_cvar":
+            w, _ = solve_min_cvar(scenarios, alpha=config["alpha"])
+        else:
+            w, _, _ = solve_max_starr(scenarios, alpha=config["alpha"], lambda_cvar=config["lambda_cvar"])
+    elif strategy == "min_cvar":
+        w, _ = optimizer.min_cvar(scenarios, alpha=config["alpha"])
+    else:
+        w, _, _ = optimizer.max_starr(scenarios, alpha=config["alpha"], lambda_cvar=config["lambda_cvar"])
+    return np.asarray(w, dtype=float)
+
+
+def _run_batch(batch):
+    """
+    Rééchantillonnages d'un lot : chacun tire ses scénarios avec son propre flux
+    aléatoire (enfant de la SeedSequence), puis optimise.
+
+    Output:
+        liste de (indice du rééchantillonnage, poids)
+    """
+    results = []
+    for index, seed_sequence in batch:
+        scenarios = generate_posterior_returns(_worker["mu_post"], _worker["cov_post"],
+                                               n_sim=_worker["config"]["n_sim"],
+                                               rng=np.random.default_rng(seed_sequence))
+        results.append((index, _optimize(scenarios)))
+    return results
+
+
+def summarize_weights(samples, columns=None, confidence=0.90):
+    """
+    Poids rééchantillonnés (moyenne des rééchantillonnages, cf. Michaud) et bandes de confiance.
+
+    Inputs:
+        samples : array (n_resamples, n_assets) des poids de chaque rééchantillonnage
+        columns : noms des actifs
+        confidence : niveau des bandes (quantiles (1 - confidence) / 2 et (1 + confidence) / 2)
+
+    Output:
+        DataFrame (index = actifs) : mean, std, median, lower, upper, prob_zero
+        (fréquence à laquelle l'actif est absent du portefeuille)
+    """
+    lower, upper = np.quantile(samples, [(1 - confidence) / 2, (1 + confidence) / 2], axis=0)
+    return pd.DataFrame({
+        "mean": samples.mean(axis=0),
+        "std": samples.std(axis=0, ddof=1) if len(samples) > 1 else np.zeros(samples.shape[1]),
+        "median": np.median(samples, axis=0),
+        "lower": lower,
+        "upper": upper,
+        "prob_zero": (samples < 1e-6).mean(axis=0),
+    }, index=columns)
+
+
+def resample_weights(mu_post, cov_post, n_resamples=200, seed=0, n_jobs=None, config=None,
+                     confidence=0.90, columns=None):
+    """
+    Portefeuille rééchantillonné : la simulation Black–Litterman (generate_posterior_returns)
+    et l'optimisation sont répétées n_resamples fois, réparties sur un pool de processus.
+
+    Les scénarios sont tirés de la loi a posteriori gaussienne N(mu_post, cov_post), le modèle
+    de bl_mode="gaussian" : avec bl_mode="scenarios" (scénarios de la copule repondérés par
+    entropy pooling), les bandes décrivent la sensibilité des poids sous l'hypothèse
+    gaussienne, pas l'incertitude des poids ponctuels du pipeline.
+
+    Chaque rééchantillonnage i a son propre flux aléatoire, SeedSequence(seed).spawn(...)[i] :
+    les scénarios ne dépendent ni du nombre de processus ni de l'ordre d'exécution, et une
+    même graine redonne les mêmes poids (à la tolérance du solveur près : l'optimiseur de
+    chaque processus repart de sa solution précédente). Les rééchantillonnages sont envoyés
+    par lots (quelques lots par processus) pour limiter les échanges entre processus.
+
+    Inputs:
+        mu_post, cov_post : loi a posteriori Black–Litterman (cf. compute_posterior)
+        n_resamples : nombre de rééchantillonnages
+        seed : graine racine
+        n_jobs : nombre de processus (défaut : nombre de coeurs, 1 = exécution séquentielle)
+        config : stratégie et paramètres (défaut : DEFAULT_CONFIG ; strategy parmi
+                 "max_sharpe", "min_cvar", "max_starr" ; cf. RESAMPLE_PARAMS pour reprendre
+                 ceux du pipeline)
+        confidence : niveau des bandes de confiance
+        columns : noms des actifs
+
+    Output:
+        dict : summary (cf. summarize_weights) et samples (array (n_resamples, n_assets))
+    """
+    config = {**DEFAULT_CONFIG, **(config or {})}
+    if config["strategy"] not in RESAMPLE_STRATEGIES:
+        raise ValueError(f"Stratégie non supportée : {config['strategy']}")
+    mu_post = np.asarray(mu_post, dtype=float)
+    if not isinstance(cov_post, PosteriorCovariance):  # a priori à facteurs : forme implicite conservée
+        cov_post = np.asarray(cov_post, dtype=float)
+
+    children = np.random.SeedSequence(seed).spawn(n_resamples)
+    tasks = list(enumerate(children))
+    n_jobs = min(n_jobs or os.cpu_count() or 1, n_resamples)
+
+    if n_jobs <= 1:
+        _init_worker(mu_post, cov_post, config)
+        results = _run_batch(tasks)
+    else:
+        n_batches = min(4 * n_jobs, n_resamples)
+        batches = [tasks[i::n_batches] for i in range(n_batches)]
+        with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                 initargs=(mu_post, cov_post, config)) as pool:
+            results = [item for batch in pool.map(_run_batch, batches) for item in batch]
+
+    samples = np.empty((n_resamples, mu_post.size))
+    for index, w in results:
+        samples[index] = w
+    return {"summary": summarize_weights(samples, columns, confidence), "samples": samples}
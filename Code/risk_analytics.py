@@ -0,0 +1,269 @@
+import numpy as np
+import pandas as pd
+
+from Code.cvar_solver import VAR_TOLERANCE, var_rank
+
+# Nombre de portefeuilles évalués ensemble (colonnes d'un produit matriciel)
+PORTFOLIO_BLOCK = 256
+
+# Taille visée (octets) d'un bloc de rendements de portefeuilles (scénarios × portefeuilles)
+RETURN_BLOCK_BYTES = 2 ** 25
+
+RISK_COLUMNS = ["mean", "volatility", "VaR", "CVaR", "STARR", "Sharpe"]
+WEALTH_COLUMNS = ["terminal_wealth", "wealth_at_risk", "max_drawdown", "drawdown_at_risk"]
+
+
+def _as_weights(weights):
+    """
+    Matrice des poids (n_assets, n_portefeuilles) et noms des portefeuilles.
+    """
+    if isinstance(weights, pd.DataFrame):
+        return weights.to_numpy(dtype=float), list(weights.columns)
+    if isinstance(weights, pd.Series):
+        return weights.to_numpy(dtype=float)[:, None], [weights.name]
+    W = np.asarray(weights, dtype=float)
+    if W.ndim == 1:
+        W = W[:, None]
+    return W, list(range(W.shape[1]))
+
+
+def _scenario_blocks(scenarios, probs, rows):
+    """
+    Blocs d'au plus rows scénarios (et leurs probabilités) : tranches d'une matrice ou d'un
+    np.memmap, ou découpage des blocs d'un itérateur (cf. scenario_generator.iter_scenarios).
+    """
+    if hasattr(scenarios, "shape"):
+        chunks = (scenarios[start:start + rows] for start in range(0, scenarios.shape[0], rows))
+    else:
+        chunks = iter(scenarios)
+    position = 0
+    for chunk in chunks:
+        for start in range(0, len(chunk), rows):
+            block = np.asarray(chunk[start:start + rows], dtype=float)
+            p = None if probs is None else probs[position:position + len(block)]
+            position += len(block)
+            yield block, p
+
+
+def _compact(buf, buf_probs, filled, n_tail):
+    """
+    Garde en tête du tampon les n_tail plus grandes pertes de chaque ligne parmi les
+    filled premières colonnes (sélection sur place, avec les probabilités si pondérées).
+    """
+    if filled <= n_tail:
+        return filled
+    losses = buf[:, :filled]
+    if buf_probs is None:
+        losses.partition(filled - n_tail, axis=1)
+        buf[:, :n_tail] = losses[:, filled - n_tail:]
+    else:
+        idx = np.argpartition(losses, filled - n_tail, axis=1)[:, -n_tail:]
+        buf_probs[:, :n_tail] = np.take_along_axis(buf_probs[:, :filled], idx, axis=1)
+        buf[:, :n_tail] = np.take_along_axis(losses, idx, axis=1)
+    return n_tail
+
+
+def _scan(scenarios, W, probs, n_tail, rows):
+    """
+    Une passe sur les scénarios pour un bloc de portefeuilles : un produit matriciel par
+    bloc de scénarios, sommes des rendements et de leurs carrés, et les n_tail plus grandes
+    pertes de chaque portefeuille (avec leurs probabilités), gardées par np.partition.
+    Les rendements sont rangés par portefeuille (n_portefeuilles, scénarios) : chaque
+    sélection porte alors sur une ligne contiguë. Les pertes s'accumulent dans un tampon
+    de n_tail + max(n_tail, rows) colonnes, sélectionné sur place quand il est plein :
+    avec de petits blocs (nombreux portefeuilles), la queue n'est pas re-sélectionnée
+    à chaque bloc.
+    """
+    k = W.shape[1]
+    Wt = np.ascontiguousarray(W.T)
+    total, total_sq, count = np.zeros(k), np.zeros(k), 0
+    width = n_tail + max(n_tail, rows)
+    buf = np.empty((k, width))
+    buf_probs = None if probs is None else np.empty((k, width))
+    filled = 0
+
+    for block, p in _scenario_blocks(scenarios, probs, rows):
+        r = Wt @ block.T
+        m = r.shape[1]
+        count += m
+        if p is None:
+            total += r.sum(axis=1)
+            total_sq += np.einsum("ij,ij->i", r, r)
+        else:
+            total += r @ p
+            total_sq += (r * r) @ p
+
+        if filled + m > width:
+            filled = _compact(buf, buf_probs, filled, n_tail)
+        np.negative(r, out=buf[:, filled:filled + m])
+        if p is not None:
+            buf_probs[:, filled:filled + m] = p
+        filled += m
+
+    filled = _compact(buf, buf_probs, filled, n_tail)
+    tail_probs = None if probs is None else buf_probs[:, :filled]
+    return total, total_sq, count, buf[:, :filled], tail_probs
+
+
+def _tail_measures(tail, tail_probs, alpha, n):
+    """
+    VaR et CVaR de chaque portefeuille (ligne) à partir de ses plus grandes pertes, avec
+    les mêmes conventions que cvar_solver._tail_stats. None si (scénarios pondérés) les
+    pertes gardées ne couvrent pas la probabilité alpha.
+    """
+    order = np.argsort(-tail, axis=1)
+    tail = np.take_along_axis(tail, order, axis=1)
+    if tail_probs is None:
+        k = alpha * n
+        m = var_rank(k, n)
+        var = tail[:, m]
+        return var, (tail[:, :m].sum(axis=1) + (k - m) * var) / k
+
+    p = np.take_along_axis(tail_probs, order, axis=1)
+    cum = np.cumsum(p, axis=1)
+    covered = cum >= alpha * (1 - VAR_TOLERANCE)
+    if not covered[:, -1].all():
+        return None
+    m = np.argmax(covered, axis=1)
+    rows = np.arange(tail.shape[0])
+    var = tail[rows, m]
+    before = np.where(np.arange(tail.shape[1]) < m[:, None], p * tail, 0.0).sum(axis=1)
+    cum_before = np.where(m > 0, cum[rows, np.maximum(m - 1, 0)], 0.0)
+    return var, (before + (alpha - cum_before) * var) / alpha
+
+
+def evaluate_portfolios(scenarios, weights, alpha=0.01, probs=None, n_scenarios=None, risk_free=0.0,
+                        horizon=None, n_paths=1000, seed=0, portfolio_block=PORTFOLIO_BLOCK,
+                        block_bytes=RETURN_BLOCK_BYTES):
+    """
+    Mesures de risque de nombreux portefeuilles sur des scénarios, sans construire la
+    matrice (scénarios × portefeuilles) : les portefeuilles sont traités par blocs de
+    portfolio_block colonnes et les scénarios par blocs de lignes (un produit matriciel
+    par bloc). Seules les ⌊alpha·n⌋ + 1 plus grandes pertes de chaque portefeuille sont
+    conservées (np.partition), d'où la VaR et la CVaR exactes.
+
+    Inputs:
+        scenarios : array ou np.memmap (n_scenarios, n_assets) (cf. write_scenarios), ou
+                    itérateur de blocs (cf. iter_scenarios : une seule passe, tous les
+                    portefeuilles ensemble, n_scenarios requis)
+        weights : DataFrame des poids (index = actifs, colonnes = portefeuilles), Series,
+                  vecteur ou array (n_assets, n_portefeuilles)
+        alpha : niveau de la VaR / CVaR
+        probs : probabilités des scénarios (équipondérés par défaut ; matrices seulement)
+        n_scenarios : nombre de scénarios d'un itérateur
+        risk_free : rendement sans risque par période (ratio de Sharpe)
+        horizon : si renseigné, ajoute les statistiques de richesse et de drawdown sur
+                  horizon périodes (cf. wealth_statistics ; matrices seulement)
+        n_paths, seed : nombre de trajectoires et graine du tirage des trajectoires
+        portfolio_block : nombre de portefeuilles par bloc
+        block_bytes : taille visée d'un bloc de rendements de portefeuilles
+
+    Output:
+        DataFrame (index = portefeuilles) : mean, volatility, VaR, CVaR, STARR, Sharpe
+        (+ terminal_wealth, wealth_at_risk, max_drawdown, drawdown_at_risk si horizon)
+    """
+    W, names = _as_weights(weights)
+    streamed = not hasattr(scenarios, "shape")
+    if streamed:
+        if n_scenarios is None:
+            raise ValueError("n_scenarios est requis pour un itérateur de scénarios")
+        if probs is not None or horizon is not None:
+            raise ValueError("probs et horizon nécessitent une matrice de scénarios (ex. np.memmap)")
+        portfolio_block = W.shape[1]
+    n = scenarios.shape[0] if not streamed else n_scenarios
+    if probs is not None:
+        probs = np.asarray(probs, dtype=float)
+
+    # équipondéré : la queue compte au plus ⌊alpha·n⌋ + 1 scénarios ; pondéré : on part du
+    # double et on élargit si les pertes gardées ne couvrent pas la probabilité alpha
+    n_tail = min(int(np.floor(alpha * n)) + 1, n) if probs is None else min(2 * int(np.ceil(alpha * n)) + 1, n)
+
+    table = np.empty((W.shape[1], len(RISK_COLUMNS)))
+    for start in range(0, W.shape[1], portfolio_block):
+        Wb = W[:, start:start + portfolio_block]
+        rows = max(1, block_bytes // (8 * Wb.shape[1]))
+        while True:
+            total, total_sq, count, tail, tail_probs = _scan(scenarios, Wb, probs, n_tail, rows)
+            measures = _tail_measures(tail, tail_probs, alpha, count)
+            if measures is not None:
+                break
+            n_tail = min(2 * n_tail, n)
+        var, cvar = measures
+        mean = total / count if probs is None else total
+        second = total_sq / count if probs is None else total_sq
+        volatility = np.sqrt(np.maximum(second - mean ** 2, 0.0))
+        table[start:start + Wb.shape[1]] = np.column_stack([
+            mean, volatility, var, cvar, mean / cvar, (mean - risk_free) / volatility])
+
+    report = pd.DataFrame(table, index=names, columns=RISK_COLUMNS)
+    if horizon is not None:
+        report = report.join(wealth_statistics(scenarios, weights, horizon, n_paths, probs, seed,
+                                               portfolio_block=portfolio_block))
+    return report
+
+
+def _path_indices(n, horizon, n_paths, probs, seed):
+    """
+    Scénarios tirés (avec remise, selon probs) pour chaque période de chaque trajectoire.
+    """
+    rng = np.random.default_rng(seed)
+    if probs is None:
+        return rng.integers(0, n, size=(horizon, n_paths))
+    return rng.choice(n, size=(horizon, n_paths), p=np.asarray(probs, dtype=float) / np.sum(probs))
+
+
+def wealth_statistics(scenarios, weights, horizon=250, n_paths=1000, probs=None, seed=0, quantile=0.05,
+                      portfolio_block=PORTFOLIO_BLOCK):
+    """
+    Richesse et drawdown sur horizon périodes : chaque trajectoire enchaîne des scénarios
+    tirés avec remise (les mêmes pour tous les portefeuilles), la richesse partant de 1
+    (rendements simples, comme dans l'optimisation). Le pic et le drawdown maximal sont
+    suivis pendant la simulation : seules les trajectoires en cours sont en mémoire.
+
+    Inputs:
+        scenarios : array ou np.memmap (n_scenarios, n_assets)
+        weights : poids (cf. evaluate_portfolios)
+        horizon : nombre de périodes
+        n_paths : nombre de trajectoires
+        probs : probabilités des scénarios (équipondérés par défaut)
+        seed : graine du tirage des trajectoires
+        quantile : niveau des quantiles de richesse (bas) et de drawdown (haut)
+
+    Output:
+        DataFrame (index = portefeuilles) : terminal_wealth (moyenne), wealth_at_risk
+        (quantile bas de la richesse finale), max_drawdown (moyenne des drawdowns maximaux),
+        drawdown_at_risk (quantile haut du drawdown maximal)
+    """
+    W, names = _as_weights(weights)
+    indices = _path_indices(scenarios.shape[0], horizon, n_paths, probs, seed)
+
+    table = np.empty((W.shape[1], len(WEALTH_COLUMNS)))
+    for start in range(0, W.shape[1], portfolio_block):
+        Wb = W[:, start:start + portfolio_block]
+        wealth = np.ones((n_paths, Wb.shape[1]))
+        peak = np.ones_like(wealth)
+        drawdown = np.zeros_like(wealth)
+        for step in indices:
+            wealth *= 1 + np.asarray(scenarios[step], dtype=float) @ Wb
+            np.maximum(peak, wealth, out=peak)
+            np.maximum(drawdown, 1 - wealth / peak, out=drawdown)
+        table[start:start + Wb.shape[1]] = np.column_stack([
+            wealth.mean(axis=0), np.quantile(wealth, quantile, axis=0),
+            drawdown.mean(axis=0), np.quantile(drawdown, 1 - quantile, axis=0)])
+    return pd.DataFrame(table, index=names, columns=WEALTH_COLUMNS)
+
+
+def wealth_paths(scenarios, weights, horizon=250, n_paths=1000, probs=None, seed=0):
+    """
+    Trajectoires de richesse complètes (pour les graphiques) des trajectoires de
+    wealth_statistics (même tirage pour une même graine).
+
+    Output:
+        array (horizon + 1, n_paths, n_portefeuilles), richesse initiale 1
+    """
+    W, _ = _as_weights(weights)
+    indices = _path_indices(scenarios.shape[0], horizon, n_paths, probs, seed)
+    paths = np.ones((horizon + 1, n_paths, W.shape[1]))
+    for t, step in enumerate(indices, start=1):
+        paths[t] = paths[t - 1] * (1 + np.asarray(scenarios[step], dtype=float) @ W)
+    return paths
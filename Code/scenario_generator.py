@@ -0,0 +1,98 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+from scipy.stats import norm, qmc
+
+# Taille des blocs de scénarios (puissance de 2 : les points de Sobol d'un bloc
+# gardent leurs propriétés d'équirépartition)
+DEFAULT_CHUNK_SIZE = 65_536
+
+
+def _last_sigmas(sigmas):
+    """
+    Volatilités utilisées pour la mise à l'échelle : dernière ligne d'un DataFrame
+    de volatilités conditionnelles, ou vecteur (n_assets,) déjà prêt.
+    """
+    if isinstance(sigmas, pd.DataFrame):
+        sigmas = sigmas.iloc[-1]
+    return np.asarray(sigmas, dtype=float)
+
+
+def iter_uniforms(vine, n_sim, chunk_size=DEFAULT_CHUNK_SIZE, qrng=True, seed=0, num_threads=1):
+    """
+    Génère les uniformes de la Vine par blocs : tirages indépendants (Sobol brouillé si
+    qrng, sinon pseudo-aléatoires) transformés par la transformée de Rosenblatt inverse.
+    La suite de Sobol continue d'un bloc à l'autre, donc les blocs concaténés forment
+    une seule suite quasi-aléatoire de n_sim points.
+    """
+    d = vine.dim
+    if qrng:
+        sampler = qmc.Sobol(d, scramble=True, seed=seed)
+    else:
+        rng = np.random.default_rng(seed)
+
+    for start in range(0, n_sim, chunk_size):
+        m = min(chunk_size, n_sim - start)
+        if qrng:
+            with warnings.catch_warnings():
+                # avertissement d'équilibre si m n'est pas une puissance de 2 (dernier bloc)
+                warnings.simplefilter("ignore", UserWarning)
+                w = sampler.random(m)
+        else:
+            w = rng.random((m, d))
+        w = np.clip(w, 1e-12, 1 - 1e-12)
+        yield vine.inverse_rosenblatt(np.asfortranarray(w), num_threads=num_threads)
+
+
+def iter_scenarios(vine, sigmas, n_sim, chunk_size=DEFAULT_CHUNK_SIZE, qrng=True, seed=0,
+                   dtype=np.float32, num_threads=1, marginals=None):
+    """
+    Générateur de rendements simulés par blocs (chunk_size, n_assets), sans jamais
+    construire la matrice complète : même modèle que simulate_joint_returns
+    (quantile des uniformes de la Vine, multiplié par la dernière volatilité).
+
+    Inputs:
+        vine : Vinecop ajustée
+        sigmas : DataFrame des volatilités conditionnelles (dernière ligne utilisée) ou vecteur
+        n_sim : nombre total de scénarios
+        chunk_size : nombre de scénarios par bloc
+        qrng : True pour une suite de Sobol brouillée, False pour des tirages pseudo-aléatoires
+        seed : graine du brouillage / du générateur
+        dtype : type des blocs produits (float32 : moitié moins de mémoire)
+        num_threads : threads du backend pyvinecopulib
+        marginals : tables de quantiles des résidus (cf. marginals.fit_marginals), N(0,1) par défaut
+
+    Output:
+        itérateur de blocs (array (m, n_assets))
+    """
+    last_sigmas = _last_sigmas(sigmas)
+    for u in iter_uniforms(vine, n_sim, chunk_size, qrng, seed, num_threads):
+        z = norm.ppf(u) if marginals is None else marginals.ppf(u)
+        yield (z * last_sigmas).astype(dtype, copy=False)
+
+
+def write_scenarios(path, vine, sigmas, n_sim, chunk_size=DEFAULT_CHUNK_SIZE, qrng=True, seed=0,
+                    dtype=np.float32, num_threads=1, marginals=None):
+    """
+    Écrit les scénarios bloc par bloc dans un fichier .npy mappé en mémoire.
+
+    Output:
+        np.memmap (lecture seule) de taille (n_sim, n_assets), utilisable directement par
+        cvar_solver (solve_min_cvar, solve_max_starr, portfolio_cvar, risk_report)
+    """
+    out = np.lib.format.open_memmap(path, mode="w+", dtype=dtype, shape=(n_sim, vine.dim))
+    position = 0
+    for chunk in iter_scenarios(vine, sigmas, n_sim, chunk_size, qrng, seed, dtype, num_threads, marginals):
+        out[position:position + len(chunk)] = chunk
+        position += len(chunk)
+    out.flush()
+    del out
+    return open_scenarios(path)
+
+
+def open_scenarios(path):
+    """
+    Ouvre un fichier de scénarios écrit par write_scenarios, sans le charger en mémoire.
+    """
+    return np.load(path, mmap_mode="r")
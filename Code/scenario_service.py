@@ -0,0 +1,242 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from Code.instrumentation import record_event
+from Code.scenario_generator import DEFAULT_CHUNK_SIZE, iter_scenarios, open_scenarios
+
+SCENARIO_CACHE_DIR = "Output/scenarios"
+
+
+def as_seed_sequence(seed):
+    """
+    SeedSequence racine d'un tirage : entier (ou None : entropie du système), SeedSequence
+    telle quelle, ou Generator (graine tirée de son flux, dont l'état avance).
+    """
+    if isinstance(seed, np.random.SeedSequence):
+        return seed
+    if isinstance(seed, np.random.Generator):
+        return np.random.SeedSequence(seed.integers(2 ** 63, size=4).tolist())
+    return np.random.SeedSequence(seed)
+
+
+def child_streams(seed, n_streams):
+    """
+    Flux indépendants numérotés 0..n_streams-1 issus de la graine racine : ce sont les
+    enfants de SeedSequence.spawn, mais recalculés à chaque appel (spawn avance un compteur
+    interne et ne redonnerait pas les mêmes flux à une seconde exécution).
+    """
+    root = as_seed_sequence(seed)
+    return [np.random.SeedSequence(root.entropy, spawn_key=root.spawn_key + (i,), pool_size=root.pool_size)
+            for i in range(n_streams)]
+
+
+def _update(h, obj):
+    """
+    Empreinte du contenu d'un modèle ajusté : Vine (JSON), arrays, DataFrames, dicts et
+    attributs publics des objets (MarginalTables, FactorCovariance, PosteriorCovariance).
+    """
+    if isinstance(obj, pd.DataFrame):
+        _update(h, obj.to_numpy(dtype=float))
+        _update(h, obj.columns)
+    elif isinstance(obj, pd.Series):
+        _update(h, obj.to_numpy(dtype=float))
+        _update(h, obj.index)
+    elif isinstance(obj, pd.Index):
+        h.update(json.dumps([str(c) for c in obj]).encode())
+    elif hasattr(obj, "to_json"):
+        h.update(obj.to_json().encode())
+    elif isinstance(obj, np.ndarray):
+        h.update(f"{obj.dtype}{obj.shape}".encode())
+        h.update(np.ascontiguousarray(obj).tobytes())
+    elif isinstance(obj, np.random.SeedSequence):
+        h.update(json.dumps([str(obj.entropy), list(obj.spawn_key), obj.pool_size]).encode())
+    elif isinstance(obj, dict):
+        for key in sorted(obj):
+            h.update(str(key).encode())
+            _update(h, obj[key])
+    elif isinstance(obj, (list, tuple)):
+        for item in obj:
+            _update(h, item)
+    elif hasattr(obj, "__dict__"):
+        h.update(type(obj).__name__.encode())
+        _update(h, {k: v for k, v in vars(obj).items() if not k.startswith("_") and not callable(v)})
+    else:
+        h.update(repr(obj).encode())
+
+
+def model_key(*parts):
+    h = hashlib.sha256()
+    for part in parts:
+        _update(h, part)
+    return h.hexdigest()[:20]
+
+
+# État propre à chaque processus du pool : fichier de sortie et modèle de simulation
+_worker = {}
+
+
+def _init_worker(path, kind, model, dtype):
+    # path None : tirage sans cache, les blocs sont renvoyés au processus principal
+    _worker["out"] = None if path is None else np.load(path, mmap_mode="r+")
+    _worker["kind"] = kind
+    _worker["dtype"] = dtype
+    if kind == "vine":
+        from pyvinecopulib import Vinecop
+
+        model = {**model, "vine": Vinecop.from_json(model["vine"])}
+    _worker["model"] = model
+
+
+def _draw_block(task):
+    """
+    Tire un bloc de scénarios avec son propre flux.
+    """
+    start, stop, seed_sequence = task
+    model = _worker["model"]
+    if _worker["kind"] == "vine":
+        return next(iter_scenarios(model["vine"], model["sigmas"], stop - start, chunk_size=stop - start,
+                                   qrng=False, seed=seed_sequence, dtype=_worker["dtype"],
+                                   marginals=model["marginals"]))
+    from Code.black_litterman import generate_posterior_returns
+
+    block = generate_posterior_returns(model["mu_post"], model["cov_post"], n_sim=stop - start,
+                                       rng=np.random.default_rng(seed_sequence))
+    return np.asarray(block, dtype=_worker["dtype"])
+
+
+def _write_block(task):
+    """
+    Tire un bloc et l'écrit à sa place dans le fichier (les blocs sont disjoints : les
+    processus écrivent sans se coordonner).
+    """
+    start, stop, _ = task
+    _worker["out"][start:stop] = _draw_block(task)
+    _worker["out"].flush()
+    return stop - start
+
+
+class ScenarioService:
+    """
+    Scénarios reproductibles et mis en cache sur disque.
+
+    Les scénarios sont tirés par blocs de block_size lignes, le bloc i avec le flux
+    child_streams(seed, n_blocks)[i] : le résultat ne dépend ni du nombre de processus
+    ni de l'ordre d'exécution. Ils sont écrits dans cache_dir/<clé>.npy, la clé étant une
+    empreinte du modèle ajusté (Vine, volatilités, marges ou loi a posteriori Black–Litterman),
+    du nombre de scénarios et de la graine : une nouvelle demande pour le même modèle ouvre
+    le fichier existant en np.memmap (utilisable directement par cvar_solver et
+    risk_analytics) au lieu de tirer à nouveau.
+
+    Seule une graine explicite (entier ou SeedSequence) est mise en cache : avec seed=None
+    (entropie du système) ou un Generator, chaque appel est un tirage nouveau qui ne
+    serait jamais relu, et les scénarios sont renvoyés en mémoire sans fichier.
+    """
+
+    def __init__(self, cache_dir=SCENARIO_CACHE_DIR, block_size=DEFAULT_CHUNK_SIZE, dtype=np.float64, n_jobs=1):
+        """
+        Inputs:
+            cache_dir : dossier des fichiers de scénarios
+            block_size : nombre de scénarios par bloc (un flux aléatoire par bloc)
+            dtype : type des scénarios stockés (float32 : moitié moins de disque et de mémoire,
+                    mais des scénarios différents de ceux du pipeline, en float64)
+            n_jobs : nombre de processus pour tirer les blocs (None : nombre de coeurs)
+        """
+        self.cache_dir = cache_dir
+        self.block_size = int(block_size)
+        self.dtype = np.dtype(dtype)
+        self.n_jobs = n_jobs
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.npy")
+
+    def vine_scenarios(self, vine, sigmas, n_sim, seed=0, marginals=None):
+        """
+        Rendements simulés par la Vine (même modèle que simulate_joint_returns : quantiles
+        des marges multipliés par la dernière volatilité conditionnelle).
+
+        Inputs:
+            vine : Vinecop ajustée
+            sigmas : DataFrame des volatilités conditionnelles (dernière ligne utilisée) ou vecteur
+            n_sim : nombre de scénarios
+            seed : entier ou SeedSequence (mis en cache), np.random.Generator ou None (sans cache)
+            marginals : tables de quantiles des résidus (cf. marginals.fit_marginals), N(0,1) par défaut
+
+        Output:
+            np.memmap (lecture seule) (n_sim, n_assets), ou array sans cache
+        """
+        if isinstance(sigmas, pd.DataFrame):
+            sigmas = sigmas.iloc[-1]
+        model = {"vine": vine.to_json(), "sigmas": np.asarray(sigmas, dtype=float), "marginals": marginals}
+        return self._scenarios("vine", model, vine.dim, n_sim, seed)
+
+    def posterior_scenarios(self, mu_post, cov_post, n_sim, seed=0):
+        """
+        Rendements tirés selon la loi a posteriori Black–Litterman (cf. generate_posterior_returns).
+
+        Output:
+            np.memmap (lecture seule) (n_sim, n_assets), ou array sans cache (cf. vine_scenarios)
+        """
+        model = {"mu_post": np.asarray(mu_post, dtype=float).ravel(), "cov_post": cov_post}
+        return self._scenarios("posterior", model, model["mu_post"].size, n_sim, seed)
+
+    def _tasks(self, n_sim, seed):
+        starts = range(0, n_sim, self.block_size)
+        return [(start, min(start + self.block_size, n_sim), stream)
+                for start, stream in zip(starts, child_streams(seed, len(starts)))]
+
+    def _n_jobs(self, tasks):
+        return min(self.n_jobs or os.cpu_count() or 1, max(len(tasks), 1))
+
+    def _draw(self, kind, model, n_assets, n_sim, seed):
+        """
+        Tirage sans cache (graine non reproductible) : blocs assemblés en mémoire.
+        """
+        tasks = self._tasks(n_sim, seed)
+        n_jobs = self._n_jobs(tasks)
+        if n_jobs <= 1:
+            _init_worker(None, kind, model, self.dtype)
+            blocks = [_draw_block(task) for task in tasks]
+            _worker.clear()
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                     initargs=(None, kind, model, self.dtype)) as pool:
+                blocks = list(pool.map(_draw_block, tasks))
+        record_event("scenario_cache", key=None, status="uncached", n_sim=n_sim)
+        return np.concatenate(blocks) if blocks else np.empty((0, n_assets), dtype=self.dtype)
+
+    def _scenarios(self, kind, model, n_assets, n_sim, seed):
+        if seed is None or isinstance(seed, np.random.Generator):
+            return self._draw(kind, model, n_assets, n_sim, as_seed_sequence(seed))
+        seed = as_seed_sequence(seed)
+        key = model_key(kind, model, n_sim, seed, self.block_size, str(self.dtype))
+        path = self.path(key)
+        if os.path.exists(path):
+            record_event("scenario_cache", key=key, status="hit", n_sim=n_sim)
+            return open_scenarios(path)
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = os.path.join(self.cache_dir, f"{key}.tmp.npy")
+        out = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=self.dtype, shape=(n_sim, n_assets))
+        del out
+
+        tasks = self._tasks(n_sim, seed)
+        n_jobs = self._n_jobs(tasks)
+        if n_jobs <= 1:
+            _init_worker(tmp_path, kind, model, self.dtype)
+            for task in tasks:
+                _write_block(task)
+            _worker.clear()  # libère le memmap avant le renommage
+        else:
+            with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                                     initargs=(tmp_path, kind, model, self.dtype)) as pool:
+                list(pool.map(_write_block, tasks))
+
+        # renommage atomique : un fichier présent dans le cache est toujours complet
+        os.replace(tmp_path, path)
+        record_event("scenario_cache", key=key, status="miss", n_sim=n_sim)
+        return open_scenarios(path)
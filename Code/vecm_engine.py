@@ -0,0 +1,225 @@
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import eigh
+from statsmodels.tsa.coint_tables import c_sjt
+
+# Spécification sans terme déterministe, comme VECM(..., deterministic="n") :
+# le test de trace et les coefficients viennent de la même décomposition propre
+DET_ORDER = -1
+CRIT_COLUMNS = {0.10: 0, 0.05: 1, 0.01: 2}
+
+
+def _observations(y, lags):
+    """
+    Lignes x_t = [Δy_t, y_{t-1}, Δy_{t-1}, ..., Δy_{t-lags}] des régressions de Johansen,
+    pour t = lags + 1, ..., T - 1 (même échantillon que VECM(k_ar_diff=lags)).
+    """
+    dy = np.diff(y, axis=0)
+    blocks = [dy[lags:], y[lags:-1]]
+    blocks += [dy[lags - i:len(dy) - i] for i in range(1, lags + 1)]
+    return np.hstack(blocks)
+
+
+class VECMEngine:
+    """
+    VECM estimé par maximum de vraisemblance de Johansen à partir des matrices de
+    moments des régressions (Δy_t, y_{t-1}, retards de Δy) : une seule décomposition
+    propre donne le test de trace, le rang et les coefficients α, β, Γ.
+
+    Les moments sont mis à jour incrémentalement quand la fenêtre avance (ajout de la
+    nouvelle observation, retrait de la plus ancienne), et le rang est conservé entre
+    deux re-sélections (toutes les rank_every nouvelles dates).
+    """
+
+    def __init__(self, lags=1, window=None, rank_every=63, refresh_every=250, significance=0.05):
+        """
+        Inputs:
+            lags : nombre de retards de Δy (k_ar_diff)
+            window : nombre de dates de prix de la fenêtre glissante (None = fenêtre croissante)
+            rank_every : nombre de nouvelles dates entre deux sélections du rang
+            refresh_every : recalcul exact des moments toutes les refresh_every mises à jour
+                            (limite l'accumulation d'erreurs d'arrondi des ajouts/retraits)
+            significance : seuil du test de trace (0.10, 0.05 ou 0.01)
+        """
+        self.lags = lags
+        self.window = window
+        self.rank_every = rank_every
+        self.refresh_every = refresh_every
+        self.crit_column = CRIT_COLUMNS[significance]
+        self.rank = None
+
+    def fit(self, prices, coint_rank=None):
+        """
+        Construit les moments sur les prix (les window dernières dates si window est fixé)
+        et estime le modèle. coint_rank impose le rang (sinon test de trace).
+        """
+        prices = prices.dropna()
+        if self.window is not None:
+            prices = prices.iloc[-self.window:]
+        self.columns = list(prices.columns)
+        y = prices.to_numpy(dtype=float)
+        K = len(self.columns)
+        self.crit_values = np.array([c_sjt(K - r, DET_ORDER)[self.crit_column] for r in range(K)])
+
+        self._rows = deque(_observations(y, self.lags))
+        self._recent = y[-(self.lags + 1):].copy()
+        self._refresh()
+        self.rank = coint_rank
+        self._updates_since_rank = 0
+        self._estimate(select_rank=coint_rank is None)
+        return self
+
+    def _refresh(self):
+        rows = np.array(self._rows)
+        self._moments = rows.T @ rows
+        self._updates_since_refresh = 0
+
+    def update(self, new_prices):
+        """
+        Intègre de nouvelles dates de prix (DataFrame, mêmes colonnes) : chaque date ajoute
+        une observation aux moments (et retire la plus ancienne si la fenêtre est fixe),
+        puis les coefficients sont ré-estimés, avec le rang en cache sauf à l'échéance.
+        """
+        values = new_prices[self.columns].to_numpy(dtype=float)
+        for row in values[np.isfinite(values).all(axis=1)]:
+            y = np.vstack([self._recent, row])
+            x = _observations(y, self.lags)[-1]
+            self._rows.append(x)
+            self._moments += np.outer(x, x)
+            if self.window is not None and len(self._rows) > self.window - self.lags - 1:
+                old = self._rows.popleft()
+                self._moments -= np.outer(old, old)
+            self._recent = y[1:]
+            self._updates_since_refresh += 1
+            self._updates_since_rank += 1
+
+        if self._updates_since_refresh >= self.refresh_every:
+            self._refresh()
+        select_rank = self._updates_since_rank >= self.rank_every
+        if select_rank:
+            self._updates_since_rank = 0
+        self._estimate(select_rank=select_rank)
+        return self
+
+    def _estimate(self, select_rank):
+        K = len(self.columns)
+        n = len(self._rows)
+        M = self._moments / n
+        i0, i1, i2 = slice(0, K), slice(K, 2 * K), slice(2 * K, None)
+
+        # Moments résiduels après régression sur les retards de Δy : S_ij = M_ij - M_i2 M22⁻¹ M_2j
+        if self.lags:
+            M22_inv_M2 = np.linalg.solve(M[i2, i2], M[i2, :2 * K])
+            S = M[:2 * K, :2 * K] - M[:2 * K, i2] @ M22_inv_M2
+        else:
+            S = M[:2 * K, :2 * K]
+        S00, S01, S11 = S[i0, i0], S[i0, i1], S[i1, i1]
+
+        # |λ S11 - S10 S00⁻¹ S01| = 0, vecteurs propres normalisés (vᵗ S11 v = 1)
+        eigvals, eigvecs = eigh(S01.T @ np.linalg.solve(S00, S01), S11)
+        order = np.argsort(eigvals)[::-1]
+        eigvals, eigvecs = np.clip(eigvals[order], 0, 1 - 1e-12), eigvecs[:, order]
+
+        log_terms = np.log(1 - eigvals)
+        self.trace_stats = -n * np.cumsum(log_terms[::-1])[::-1]
+        if select_rank or self.rank is None:
+            self.rank = int(np.sum(self.trace_stats > self.crit_values))
+        r = self.rank
+
+        beta = eigvecs[:, :r]
+        if r:
+            beta = beta @ np.linalg.inv(beta[:r, :r])  # normalisation de statsmodels
+        alpha = S01 @ beta @ np.linalg.pinv(beta.T @ S11 @ beta)
+        if self.lags:
+            gamma = np.linalg.solve(M[i2, i2], (M[i0, i2] - alpha @ beta.T @ M[i1, i2]).T).T
+        else:
+            gamma = np.zeros((K, 0))
+
+        self.eigenvalues = eigvals
+        self.loglik = -0.5 * n * (K * np.log(2 * np.pi) + np.linalg.slogdet(S00)[1] + log_terms[:r].sum() + K)
+        self.n_params = 2 * K * r - r * r + K * K * self.lags
+        self.coefficients = {
+            "alpha": alpha,
+            "beta": beta,
+            "gamma": gamma,
+            "coint_rank": r,
+            "lags": self.lags,
+        }
+
+    def forecast_path(self, steps=1):
+        """
+        Trajectoire de prévision sur steps dates :
+            y(t+1) = y(t) + α βᵗ y(t) + Σ_i Γ_i Δy(t+1-i), itérée.
+
+        Output:
+            DataFrame (steps, n_actifs), index 1..steps
+        """
+        K = len(self.columns)
+        alpha, beta, gamma = self.coefficients["alpha"], self.coefficients["beta"], self.coefficients["gamma"]
+        y = list(self._recent)
+        path = []
+        for _ in range(steps):
+            forecast = y[-1] + alpha @ (beta.T @ y[-1])
+            for i in range(self.lags):
+                forecast = forecast + gamma[:, i * K:(i + 1) * K] @ (y[-1 - i] - y[-2 - i])
+            y.append(forecast)
+            path.append(forecast)
+        return pd.DataFrame(path, index=pd.RangeIndex(1, steps + 1, name="step"), columns=self.columns)
+
+    def predict(self, steps=1):
+        """
+        Prévision des prix à t+steps (série pandas, même format que fit_vecm).
+        """
+        return self.forecast_path(steps).iloc[-1].rename("Forecast")
+
+
+def _evaluate_spec(args):
+    """
+    Ajuste un VECM pour une spécification (retards, sous-univers), dans un processus du pool.
+    """
+    values, columns, lags, steps = args
+    prices = pd.DataFrame(values, columns=columns)
+    engine = VECMEngine(lags=lags).fit(prices)
+    return {
+        "lags": lags,
+        "tickers": columns,
+        "coint_rank": engine.rank,
+        "loglik": engine.loglik,
+        "aic": -2 * engine.loglik + 2 * engine.n_params,
+        "forecast": engine.forecast_path(steps),
+    }
+
+
+def evaluate_vecm_specs(prices, lags_list=(1, 2, 3), universes=None, steps=1, n_jobs=None):
+    """
+    Évalue plusieurs ordres de retard et/ou sous-univers d'actifs en parallèle.
+
+    Inputs:
+        prices : DataFrame des prix alignés
+        lags_list : ordres de retard à tester
+        universes : listes de tickers (défaut : toutes les colonnes)
+        steps : horizon de la trajectoire de prévision
+        n_jobs : nombre de processus (défaut : nombre de coeurs, 1 = exécution séquentielle)
+
+    Output:
+        liste de dicts (lags, tickers, coint_rank, loglik, aic, forecast), triée par AIC
+        (comparable uniquement entre spécifications du même sous-univers)
+    """
+    prices = prices.dropna()
+    universes = universes or [list(prices.columns)]
+    # même échantillon pour tous les retards : les AIC sont comparables
+    offset = max(lags_list) - np.array(lags_list)
+    tasks = [(prices[list(u)].to_numpy(dtype=float)[o:], list(u), lags, steps)
+             for u in universes for lags, o in zip(lags_list, offset)]
+
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(tasks))
+    if n_jobs <= 1:
+        results = [_evaluate_spec(task) for task in tasks]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            results = list(pool.map(_evaluate_spec, tasks))
+    return sorted(results, key=lambda res: res["aic"])
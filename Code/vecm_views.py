@@ -2,6 +2,16 @@ from statsmodels.tsa.vector_ar.vecm import coint_johansen, VECM
 import pandas as pd
 import numpy as np
 
+def select_coint_rank(price_data, lags=1):
+    """
+    Choisit le rang de co-intégration avec la statistique de trace de Johansen (seuil 5%).
+    """
+    johansen_result = coint_johansen(price_data, det_order=0, k_ar_diff=lags)
+    trace_stats = johansen_result.lr1
+    crit_vals = johansen_result.cvt[:, 1]  # 5% critical value
+    return int(np.sum(trace_stats > crit_vals))
+
+
 def fit_vecm(price_data, lags=1, coint_rank=None):
     """
     Estime un modèle VECM (Johansen) sur les prix.
@@ -17,14 +27,8 @@ def fit_vecm(price_data, lags=1, coint_rank=None):
     # Supprimer les lignes NaN
     price_data = price_data.dropna()
 
-    # Test de co-intégration de Johansen
-    johansen_result = coint_johansen(price_data, det_order=0, k_ar_diff=lags)
-
     if coint_rank is None:
-        # Choisir le rang de co-intégration selon la statistique de trace
-        trace_stats = johansen_result.lr1
-        crit_vals = johansen_result.cvt[:, 1]  # 5% critical value
-        coint_rank = np.sum(trace_stats > crit_vals)
+        coint_rank = select_coint_rank(price_data, lags=lags)
 
     # VECM fit
     model = VECM(price_data, k_ar_diff=lags, coint_rank=coint_rank, deterministic="n")
@@ -37,6 +41,54 @@ def fit_vecm(price_data, lags=1, coint_rank=None):
     return forecast_df
 
 
+def fit_vecm_coefficients(price_data, lags=1, coint_rank=None):
+    """
+    Estime un VECM et retourne ses coefficients, pour pouvoir prévoir sans ré-estimer.
+
+    Output:
+        dict avec alpha (K, r), beta (K, r), gamma (K, K * lags), coint_rank, lags
+    """
+    price_data = price_data.dropna()
+
+    if coint_rank is None:
+        coint_rank = select_coint_rank(price_data, lags=lags)
+
+    vecm_res = VECM(price_data, k_ar_diff=lags, coint_rank=coint_rank, deterministic="n").fit()
+
+    return {
+        "alpha": vecm_res.alpha,
+        "beta": vecm_res.beta,
+        "gamma": vecm_res.gamma,
+        "coint_rank": int(coint_rank),
+        "lags": int(lags),
+    }
+
+
+def forecast_from_coefficients(coefficients, recent_prices):
+    """
+    Prévision à t+1 à partir de coefficients VECM déjà estimés :
+        y(t+1) = y(t) + alpha beta' y(t) + somme_i Gamma_i Δy(t+1-i)
+
+    Inputs:
+        coefficients : dict retourné par fit_vecm_coefficients
+        recent_prices : DataFrame des (lags + 1) derniers prix au moins
+
+    Output:
+        forecast : prédiction des prix à t+1 (série pandas)
+    """
+    y = recent_prices.to_numpy(dtype=float)
+    K = y.shape[1]
+    alpha = np.asarray(coefficients["alpha"])
+    beta = np.asarray(coefficients["beta"])
+    gamma = np.asarray(coefficients["gamma"])
+
+    forecast = y[-1] + alpha @ (beta.T @ y[-1])
+    for i in range(coefficients["lags"]):
+        forecast += gamma[:, i * K:(i + 1) * K] @ (y[-1 - i] - y[-2 - i])
+
+    return pd.Series(forecast, index=recent_prices.columns, name="Forecast")
+
+
 def generate_views(current_prices: pd.Series, forecast_prices: pd.Series) -> tuple:
     """
     Génére la matrice P (identité) et le vecteur q (vues directionnelles) à partir :
@@ -0,0 +1,161 @@
+import json
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from Code.copula_models import fit_vine_copula, refit_vine_parameters, save_vine, load_vine
+from Code.instrumentation import record_event
+
+VINE_FILE = "vine.json"
+META_FILE = "vine_meta.json"
+
+# Mode "auto" : nouvelle sélection de la structure quand elle a plus de STRUCTURE_MAX_AGE
+# observations, ou quand le tau de Kendall des DRIFT_WINDOW dernières observations s'écarte
+# de plus de DRIFT_TAU_THRESHOLD de celui de la sélection (mêmes règles que incremental.py)
+STRUCTURE_MAX_AGE = 63
+DRIFT_TAU_THRESHOLD = 0.15
+DRIFT_WINDOW = 250
+
+
+class VineService:
+    """
+    Ajustement de la Vine avec structure mise en cache sur disque.
+
+    La sélection complète (structure R-vine, familles, troncature) coûte environ
+    O(d²) ajustements de copules de paires ; elle n'est faite qu'en mode "full", en
+    l'absence de cache, ou en mode "auto" quand la structure en cache est périmée (âge
+    ou dérive des tau de Kendall). En mode "refit", la structure et les familles en cache
+    sont conservées et seuls les paramètres sont ré-estimés. La Vine ajustée est
+    sauvegardée en JSON dans cache_dir après chaque ajustement.
+    """
+
+    def __init__(self, cache_dir="Output/vine", trunc_lvl="auto", num_threads=None,
+                 max_age=STRUCTURE_MAX_AGE, drift_threshold=DRIFT_TAU_THRESHOLD):
+        """
+        Inputs:
+            cache_dir : dossier du cache (vine.json + vine_meta.json), None = pas de persistance
+            trunc_lvl : niveau de troncature ("auto", entier ou None), cf. fit_vine_copula
+            num_threads : threads du backend pyvinecopulib (défaut : nombre de coeurs)
+            max_age : âge maximal de la structure en mode "auto" (observations datées
+                      postérieures à la sélection, ou à défaut ré-estimations depuis celle-ci)
+            drift_threshold : écart maximal des tau de Kendall récents en mode "auto"
+        """
+        self.cache_dir = cache_dir
+        self.trunc_lvl = trunc_lvl
+        self.num_threads = num_threads or os.cpu_count() or 1
+        self.max_age = max_age
+        self.drift_threshold = drift_threshold
+        self.vine = None
+        self.tickers = None
+        self.selection = None
+        self.last_fit = None
+
+    def _paths(self):
+        return os.path.join(self.cache_dir, VINE_FILE), os.path.join(self.cache_dir, META_FILE)
+
+    def load(self):
+        """
+        Charge la Vine en cache (None si aucun cache n'existe).
+        """
+        if self.cache_dir is None:
+            return self.vine
+        vine_path, meta_path = self._paths()
+        if not os.path.exists(vine_path):
+            return None
+        self.vine = load_vine(vine_path)
+        with open(meta_path) as f:
+            meta = json.load(f)
+        self.tickers = meta["tickers"]
+        self.selection = meta.get("selection")
+        return self.vine
+
+    def save(self):
+        if self.cache_dir is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        vine_path, meta_path = self._paths()
+        save_vine(self.vine, vine_path)
+        with open(meta_path, "w") as f:
+            json.dump({"tickers": self.tickers, "trunc_lvl": int(self.vine.trunc_lvl),
+                       "selection": self.selection}, f)
+
+    @staticmethod
+    def _recent_tau(u_data):
+        from Code.pair_screening import pairwise_kendall_tau
+
+        return pairwise_kendall_tau(np.asarray(u_data, dtype=float)[-DRIFT_WINDOW:])
+
+    def _select(self, u_data):
+        """
+        Repères de la sélection : dernière date, tau de Kendall récents.
+        """
+        index = getattr(u_data, "index", None)
+        last_date = str(index[-1]) if isinstance(index, pd.DatetimeIndex) else None
+        return {"last_date": last_date, "refits": 0, "tau": self._recent_tau(u_data).tolist()}
+
+    def staleness(self, u_data):
+        """
+        Raison d'une nouvelle sélection en mode "auto" ("age", "drift" ou "unknown" si la
+        sélection en cache n'a pas de repères), None si la structure en cache reste valable.
+        """
+        if not self.selection:
+            return "unknown"
+        index = getattr(u_data, "index", None)
+        if self.selection["last_date"] is not None and isinstance(index, pd.DatetimeIndex):
+            age = int((index > pd.Timestamp(self.selection["last_date"])).sum())
+        else:
+            age = self.selection["refits"] + 1
+        if age > self.max_age:
+            return "age"
+        drift = np.max(np.abs(self._recent_tau(u_data) - np.asarray(self.selection["tau"])))
+        if drift > self.drift_threshold:
+            return "drift"
+        return None
+
+    def fit(self, u_data, mode="auto"):
+        """
+        Ajuste la Vine sur les pseudo-observations.
+
+        Inputs:
+            u_data : DataFrame des pseudo-observations (colonnes = actifs)
+            mode : "full" (sélection complète), "refit" (paramètres seuls sur la structure
+                   en cache), "load" (Vine en cache telle quelle, sans ajustement) ou
+                   "auto" ("refit" si un cache existe pour les mêmes actifs et n'est pas
+                   périmé, cf. staleness, sinon "full")
+
+        Output:
+            vine : Vinecop ajustée
+        """
+        tickers = [str(c) for c in getattr(u_data, "columns", range(np.shape(u_data)[1]))]
+        if self.vine is None or self.tickers != tickers:
+            self.load()
+        cached = self.vine is not None and self.tickers == tickers
+
+        reason = None
+        if mode == "auto":
+            reason = self.staleness(u_data) if cached else "no_cache"
+            mode = "full" if reason else "refit"
+        if mode in ("refit", "load") and not cached:
+            raise ValueError(f"Aucune Vine en cache pour ces actifs (mode {mode}).")
+
+        start = time.perf_counter()
+        if mode == "full":
+            self.vine = fit_vine_copula(u_data, trunc_lvl=self.trunc_lvl, num_threads=self.num_threads)
+            self.selection = self._select(u_data)
+        elif mode == "refit":
+            self.vine = refit_vine_parameters(self.vine, u_data, num_threads=self.num_threads)
+            if self.selection:
+                self.selection["refits"] += 1
+        elif mode != "load":
+            raise ValueError(f"Mode d'ajustement de la Vine non supporté : {mode}")
+
+        self.tickers = tickers
+        self.last_fit = {"mode": mode, "reason": reason, "seconds": time.perf_counter() - start,
+                         "trunc_lvl": int(self.vine.trunc_lvl)}
+        record_event("vine", **self.last_fit, loglik=self.vine.loglik(), n_params=self.vine.npars,
+                     nobs=self.vine.nobs)
+        if mode != "load":
+            self.save()
+        return self.vine
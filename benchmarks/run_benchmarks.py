@@ -0,0 +1,259 @@
+"""
+Benchmark des étapes du pipeline sur des panels de prix synthétiques.
+
+Chaque étape est chronométrée (temps réel, minimum et médiane de --repeat exécutions),
+puis son pic mémoire est mesuré avec tracemalloc lors d'une exécution séparée (le suivi
+des allocations ralentirait les chronométrages ; il couvre les allocations Python et
+NumPy, pas la mémoire interne des bibliothèques C++ comme pyvinecopulib). Les résultats
+sont écrits en JSON pour comparer deux versions :
+
+    python benchmarks/run_benchmarks.py --assets 6 50 --days 1000 --output benchmarks/results/avant.json
+    python benchmarks/run_benchmarks.py --assets 6 50 --days 1000 --output benchmarks/results/apres.json
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/avant.json benchmarks/results/apres.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import warnings
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from Code.garch_models import fit_garch, fit_garch_batch, standardize_residuals, to_pseudo_observations
+from Code.ranks import pseudo_observations
+from Code.copula_models import fit_vine_copula, simulate_joint_returns
+from Code.vecm_views import fit_vecm, generate_views
+from Code.black_litterman import compute_equilibrium_return, compute_posterior
+from Code.optimization import max_sharpe_portfolio, min_cvar_portfolio, max_starr_portfolio
+
+DEFAULT_ASSETS = [6, 50, 200, 500]
+DEFAULT_DAYS = [1000, 10000]
+DEFAULT_SCENARIOS = 1000
+DEFAULT_REPEAT = 3
+
+# Nombre d'actifs maximal par étape dans la grille par défaut (au-delà, une seule
+# mesure dure des heures sur une machine standard) ; --no-caps lève ces limites
+STAGE_ASSET_CAPS = {
+    "fit_garch": 200,
+    "fit_vine_copula": 50,
+    "simulate_joint_returns": 50,
+    "max_sharpe_portfolio": 500,
+    "min_cvar_portfolio": 200,
+    "max_starr_portfolio": 200,
+}
+
+STAGES = [
+    "fit_garch", "fit_garch_batch", "to_pseudo_observations", "pseudo_observations", "fit_vine_copula",
+    "simulate_joint_returns", "fit_vecm", "compute_posterior",
+    "max_sharpe_portfolio", "min_cvar_portfolio", "max_starr_portfolio",
+]
+
+
+def synthetic_panel(n_assets, n_days, seed=0):
+    """
+    Panel de prix synthétique : rendements à facteurs communs, volatilité GARCH(1,1)
+    et innovations de Student (queues épaisses), prix = 100 · exp(rendements cumulés).
+    """
+    rng = np.random.default_rng(seed)
+    n_factors = min(3, n_assets)
+    loadings = rng.normal(0.5, 0.3, (n_assets, n_factors))
+    factors = rng.standard_t(5, (n_days, n_factors)) * 0.01
+    noise = rng.standard_t(5, (n_days, n_assets)) * 0.01
+
+    shocks = factors @ loadings.T + noise
+    shocks /= shocks.std(axis=0)
+    omega, alpha, beta = 1e-6, 0.08, 0.9
+    sigma2 = np.full(n_assets, omega / (1 - alpha - beta))
+    returns = np.empty((n_days, n_assets))
+    for t in range(n_days):
+        returns[t] = np.sqrt(sigma2) * shocks[t]
+        sigma2 = omega + alpha * returns[t] ** 2 + beta * sigma2
+
+    dates = pd.bdate_range("2000-01-03", periods=n_days + 1)
+    log_prices = np.vstack([np.zeros(n_assets), np.cumsum(returns, axis=0)])
+    return pd.DataFrame(100 * np.exp(log_prices), index=dates, columns=[f"A{i:03d}" for i in range(n_assets)])
+
+
+def measure(func, *args, repeat=DEFAULT_REPEAT, **kwargs):
+    """
+    Exécute func repeat fois sans tracemalloc (temps réel), puis une fois de plus sous
+    tracemalloc (pic mémoire).
+
+    Output:
+        dict : seconds (minimum des exécutions, le moins bruité), seconds_median,
+        repeat et peak_mb (pic mémoire tracemalloc, Mo)
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(*args, **kwargs)
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        func(*args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {"seconds": min(times), "seconds_median": float(np.median(times)), "repeat": repeat,
+            "peak_mb": peak / 2 ** 20}
+
+
+def _stage_inputs(prices, n_scenarios):
+    """
+    Entrées de chaque étape, préparées hors chronométrage à partir du panel.
+    """
+    returns = np.log(prices / prices.shift(1)).dropna()
+    residuals, sigmas, _ = fit_garch_batch(returns, engine="numpy")
+    standardized = pd.DataFrame(standardize_residuals(residuals, sigmas), index=returns.index,
+                                columns=returns.columns)
+    pseudo_obs = pseudo_observations(standardized)
+    cov = returns.cov().values
+    weights = np.ones(len(returns.columns)) / len(returns.columns)
+    pi = compute_equilibrium_return(cov, weights)
+    forecast = prices.iloc[-1] * (1 + np.random.default_rng(1).normal(0, 0.01, len(prices.columns)))
+    P, q = generate_views(prices.iloc[-1], forecast)
+    rng = np.random.default_rng(2)
+    scenarios = rng.multivariate_normal(pi, cov, size=n_scenarios)
+    return {
+        "prices": prices, "returns": returns, "standardized": standardized, "pseudo_obs": pseudo_obs,
+        "sigmas": pd.DataFrame(sigmas, index=returns.index, columns=returns.columns),
+        "cov": cov, "pi": pi, "P": P, "q": q, "scenarios": scenarios,
+    }
+
+
+def run_stage(stage, data, n_scenarios):
+    """
+    Appelle l'étape du pipeline sur les entrées préparées.
+    """
+    if stage == "fit_garch":
+        return [fit_garch(data["returns"][c]) for c in data["returns"].columns]
+    if stage == "fit_garch_batch":
+        return fit_garch_batch(data["returns"], engine="numpy")
+    if stage == "to_pseudo_observations":
+        return [to_pseudo_observations(data["standardized"][c]) for c in data["standardized"].columns]
+    if stage == "pseudo_observations":
+        return pseudo_observations(data["standardized"])
+    if stage == "fit_vine_copula":
+        data["vine"] = fit_vine_copula(data["pseudo_obs"])
+        return data["vine"]
+    if stage == "simulate_joint_returns":
+        vine = data["vine"] if "vine" in data else fit_vine_copula(data["pseudo_obs"])
+        return simulate_joint_returns(vine, data["sigmas"], data["returns"], n_sim=n_scenarios)
+    if stage == "fit_vecm":
+        return fit_vecm(data["prices"])
+    if stage == "compute_posterior":
+        return compute_posterior(data["pi"], data["cov"], data["P"], data["q"])
+    if stage == "max_sharpe_portfolio":
+        return max_sharpe_portfolio(data["scenarios"])
+    if stage == "min_cvar_portfolio":
+        return min_cvar_portfolio(data["scenarios"])
+    if stage == "max_starr_portfolio":
+        return max_starr_portfolio(data["scenarios"])
+    raise ValueError(f"Étape inconnue : {stage}")
+
+
+def _metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def run_benchmarks(assets=DEFAULT_ASSETS, days=DEFAULT_DAYS, stages=STAGES, n_scenarios=DEFAULT_SCENARIOS,
+                   caps=STAGE_ASSET_CAPS, seed=0, repeat=DEFAULT_REPEAT):
+    """
+    Mesure chaque étape pour chaque taille de panel (n_assets × n_days).
+
+    Output:
+        dict : meta (version, machine) et results (une ligne par étape et taille)
+    """
+    results = []
+    for n_assets in assets:
+        for n_days in days:
+            prices = synthetic_panel(n_assets, n_days, seed)
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                data = _stage_inputs(prices, n_scenarios)
+                for stage in stages:
+                    row = {"stage": stage, "n_assets": n_assets, "n_days": n_days, "n_scenarios": n_scenarios}
+                    if caps and n_assets > caps.get(stage, np.inf):
+                        row["status"] = "skipped"
+                    else:
+                        try:
+                            row.update(measure(run_stage, stage, data, n_scenarios, repeat=repeat))
+                            row["status"] = "ok"
+                        except Exception as exc:
+                            row["status"] = f"error: {exc}"
+                    results.append(row)
+                    print(f"{stage:<24} {n_assets:>4} actifs {n_days:>6} jours : "
+                          + (f"{row['seconds']:8.3f} s  {row['peak_mb']:8.1f} Mo" if row["status"] == "ok"
+                             else row["status"]), flush=True)
+    return {"meta": _metadata(), "results": results}
+
+
+def compare(old_path, new_path):
+    """
+    Ratios de temps et de mémoire (nouveau / ancien) pour les mesures communes.
+    """
+    frames = []
+    for path in (old_path, new_path):
+        with open(path) as f:
+            df = pd.DataFrame(json.load(f)["results"])
+        frames.append(df[df["status"] == "ok"].set_index(["stage", "n_assets", "n_days", "n_scenarios"]))
+    old, new = frames
+    common = old.index.intersection(new.index)
+    table = pd.DataFrame({
+        "old_s": old.loc[common, "seconds"],
+        "new_s": new.loc[common, "seconds"],
+        "time_ratio": new.loc[common, "seconds"] / old.loc[common, "seconds"],
+        "memory_ratio": new.loc[common, "peak_mb"] / old.loc[common, "peak_mb"],
+    })
+    return table.sort_values("time_ratio", ascending=False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des étapes du pipeline")
+    parser.add_argument("--assets", type=int, nargs="+", default=DEFAULT_ASSETS)
+    parser.add_argument("--days", type=int, nargs="+", default=DEFAULT_DAYS)
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--scenarios", type=int, default=DEFAULT_SCENARIOS)
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="exécutions chronométrées par mesure (minimum retenu)")
+    parser.add_argument("--no-caps", action="store_true", help="mesure toutes les étapes à toutes les tailles")
+    parser.add_argument("--output", default=None, help="fichier JSON (défaut : benchmarks/results/<date>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("ANCIEN", "NOUVEAU"))
+    args = parser.parse_args()
+
+    if args.compare:
+        print(compare(*args.compare).round(3).to_string())
+        return
+
+    report = run_benchmarks(args.assets, args.days, args.stages, args.scenarios,
+                            caps=None if args.no_caps else STAGE_ASSET_CAPS, repeat=args.repeat)
+    output = args.output or os.path.join(os.path.dirname(os.path.abspath(__file__)), "results",
+                                         datetime.now().strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\n✅ Résultats sauvegardés : {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,165 +1,375 @@
-import os
-import numpy as np
-import pandas as pd
-import seaborn as sns
-import matplotlib.pyplot as plt
-from tqdm import tqdm
-
-from Code.data_loader import load_data, compute_log_returns
-from Code.garch_models import fit_garch, standardize_residuals, to_pseudo_observations
-from Code.copula_models import fit_vine_copula, simulate_joint_returns, fit_copula_clayton, fit_copula_student
-from Code.vecm_views import fit_vecm, generate_views
-from Code.black_litterman import compute_equilibrium_return, compute_posterior, generate_posterior_returns
-from Code.optimization import max_sharpe_portfolio, min_cvar_portfolio, max_starr_portfolio
+"""
+Point d'entrée en ligne de commande (sans interface graphique).
+
+    python main.py                                   # pipeline complet (étapes en cache)
+    python main.py --tickers BNP LVMH Sanofi --start 2015-01-01 --n-sim 5000 --tau 0.1
+    python main.py --config params.json --set solver="lp" --plots
+    python main.py --incremental                     # mise à jour quotidienne
+    python main.py --backtest                        # backtest walk-forward
 
+Les bibliothèques lourdes (arch, statsmodels, pyvinecopulib, cvxpy, matplotlib) ne sont
+importées que par les étapes qui les utilisent : une exécution servie par le cache
+ne les charge pas, et aucun graphique n'est produit sans --plots.
+"""
+import argparse
+import json
+import os
 import warnings
-from arch.__future__ import reindexing  # optionnelle selon ta version
-from arch.univariate.base import DataScaleWarning
-from statsmodels.tools.sm_exceptions import ValueWarning
-
-warnings.filterwarnings("ignore", category=DataScaleWarning)
-warnings.filterwarnings("ignore", category=ValueWarning)
-
-def main():
-    folder = "Data/"
-    files = ["BNP.csv", "Airbus.csv", "Deutsche.csv", "Enel.csv", "LVMH.csv", "Sanofi.csv"]
-
-    pseudo_obs_all = pd.DataFrame()
-    all_log_returns = {}
-    all_sigmas = {}
-
-    # 🔁 Boucle sur chaque actif pour calculer les pseudo-observations
-    for file in files:
-        ticker = file.replace(".csv", "")
-
-        # 1. Chargement des prix
-        df = load_data(os.path.join(folder, file))
-        log_returns = compute_log_returns(df["Close"])
-        all_log_returns[ticker] = log_returns
-    print("\n Étape 1 complétée : chargement des prix et calcul des rendements logarithmiques pour les 6 actions.")
-
-    for file in files:
-        ticker = file.replace(".csv", "")
-        
-        # 2. Modélisation GARCH
-        log_returns = all_log_returns[ticker]
-        residuals, sigma = fit_garch(log_returns)
-        standardized = standardize_residuals(residuals, sigma)
-        all_sigmas[ticker] = sigma
-        all_log_returns[ticker] = log_returns  # (réassigné au cas où modifié)
-    print("\n Étape 2 complétée : estimation des modèles GARCH(1,1) et extraction des résidus standardisés pour chaque série.")
-
-    for file in files:
-        ticker = file.replace(".csv", "")
-        
-        # 3. Pseudo-observations (uniformes)
-        standardized = standardize_residuals(
-            all_log_returns[ticker] - all_log_returns[ticker].mean(),  # ou utiliser les résidus directement si stockés
-            all_sigmas[ticker]
-        )
-        pseudo = to_pseudo_observations(standardized)
-        pseudo_obs_all[ticker] = pseudo
-    print("\n Étape 3 complétée : transformation des résidus standardisés en pseudo-observations uniformes (copule-ready).")
 
-    print("\n Aperçu des pseudo-observations (top 5 lignes) :")
-    print(pseudo_obs_all.head())
+GARCH_PARAMS_PATH = "Output/garch_params.csv"
+STATE_DIR = "Output/state"
+PRICE_STORE_DIR = "Data/store"
+BACKTEST_DIR = "Output/backtest"
+VINE_CACHE_DIR = "Output/vine"
+SCENARIO_CACHE_DIR = "Output/scenarios"
+OUTPUT_DIR = "Output"
+PRICE_FILES = ["BNP.csv", "Airbus.csv", "Deutsche.csv", "Enel.csv", "LVMH.csv", "Sanofi.csv"]
+SUMMARY_STAGES = ["pseudo_obs", "simulate", "vecm", "views", "black_litterman", "optimize"]
+RISK_HORIZON = 250  # jours de bourse des trajectoires de richesse simulées
 
+def _ignore_library_warnings():
+    """
+    Avertissements attendus d'arch (échelle des données) et de statsmodels (dates sans fréquence).
+    """
+    from arch.univariate.base import DataScaleWarning
+    from statsmodels.tools.sm_exceptions import ValueWarning
 
-    # 🔗 Ajustement de la Vine Copula multivariée
-    print("\n Étape 4 : ajustement d'une copule Vine multivariée sur les 6 actifs.")
-    vine_copula = fit_vine_copula(pseudo_obs_all)
-    print("Copule Vine ajustée avec succès.")
+    warnings.filterwarnings("ignore", category=DataScaleWarning)
+    warnings.filterwarnings("ignore", category=ValueWarning)
 
-    print("\n Simulation de 1000 rendements multivariés à partir de la copule et des modèles GARCH.")
-    sim_returns = simulate_joint_returns(vine_copula, all_sigmas, all_log_returns, n_sim=1000)
-    print("\n Aperçu des rendements simulés (top 5 lignes) :")
-    print(sim_returns.head())
+def save_figures(results, output_dir=OUTPUT_DIR):
+    """
+    Graphiques de l'exécution (backend Agg, sans affichage) : poids optimaux, distribution
+    des rendements de portefeuille sur les scénarios Black–Litterman et richesse simulée.
 
-    # Chargement des prix actuels 
-    price_data = pd.read_csv("Data/prices_aligned.csv", index_col=0, parse_dates=True)
-    price_data = price_data[["BNP", "Airbus", "Deutsche", "Enel", "LVMH", "Sanofi"]]  # matching tickers
+    Output:
+        liste des fichiers PNG écrits dans output_dir/figures
+    """
+    import matplotlib
+    import numpy as np
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
 
-    print("\n Étape 5 : prévision des prix futurs avec modèle VECM (Vector Error Correction Model).")
-    forecast = fit_vecm(price_data)
-    print("\n Prévision VECM (t+1) effectuée :")
-    print(forecast)
+    folder = os.path.join(output_dir, "figures")
+    os.makedirs(folder, exist_ok=True)
+    weights_df = results["optimize"]["weights"]
+    scenarios = results["black_litterman"]["scenarios"]
+    probs = results["black_litterman"]["probs"]
+    paths = []
 
-    current_prices = price_data.iloc[-1]
-    forecast_prices = forecast
+    fig, ax = plt.subplots(figsize=(8, 4))
+    weights_df.plot.bar(ax=ax)
+    ax.set_ylabel("Poids")
+    ax.set_title("Poids optimaux par stratégie")
+    fig.tight_layout()
+    paths.append(os.path.join(folder, "poids_optimaux.png"))
+    fig.savefig(paths[-1], dpi=150)
+    plt.close(fig)
 
-    P, q = generate_views(current_prices, forecast_prices)
+    fig, ax = plt.subplots(figsize=(8, 4))
+    for strategy in weights_df.columns:
+        ax.hist(scenarios.to_numpy() @ weights_df[strategy].to_numpy(), bins=60, weights=probs,
+                density=True, histtype="step", label=strategy)
+    ax.set_xlabel("Rendement du portefeuille")
+    ax.set_title("Distribution des rendements (scénarios Black–Litterman)")
+    ax.legend()
+    fig.tight_layout()
+    paths.append(os.path.join(folder, "distribution_rendements.png"))
+    fig.savefig(paths[-1], dpi=150)
+    plt.close(fig)
 
-    print("\n Génération des vues directionnelles pour Black–Litterman à partir des prévisions de prix.")
-    print("\n Matrice P (structure des vues) :")
-    print(P)
-    print("\n Vecteur q (attentes sur les actifs) :")
-    print(q)
- 
-    print("\n Étape 6 : calcul des rendements espérés et simulation avec modèle Black–Litterman.")
-    # Matrice de covariance estimée sur les rendements
-    returns_matrix = pd.DataFrame(all_log_returns).dropna()
-    cov_matrix = returns_matrix.cov().values
+    from Code.risk_analytics import wealth_paths
 
-    # Pondérations de marché (ici : équipondéré)
-    market_weights = np.ones(len(returns_matrix.columns)) / len(returns_matrix.columns)
+    wealth = wealth_paths(scenarios.to_numpy(), weights_df, horizon=RISK_HORIZON, probs=probs)
+    fig, ax = plt.subplots(figsize=(8, 4))
+    for j, strategy in enumerate(weights_df.columns):
+        low, median, high = np.quantile(wealth[:, :, j], [0.05, 0.5, 0.95], axis=1)
+        line, = ax.plot(median, label=strategy)
+        ax.fill_between(np.arange(len(median)), low, high, color=line.get_color(), alpha=0.15)
+    ax.set_xlabel("Jours")
+    ax.set_ylabel("Richesse (départ 1)")
+    ax.set_title("Richesse simulée : médiane et bande 5 %–95 %")
+    ax.legend()
+    fig.tight_layout()
+    paths.append(os.path.join(folder, "richesse_simulee.png"))
+    fig.savefig(paths[-1], dpi=150)
+    plt.close(fig)
+    return paths
 
-    # ✅ Étape 5.1 : rendements d’équilibre
-    pi = compute_equilibrium_return(cov_matrix, market_weights, delta=2.5)
+def main(bl_mode="scenarios", vine_mode="full", params=None, profile=None, plots=False,
+         output_dir=OUTPUT_DIR, report_path=None, resample=None, warm_start=False):
+    """
+    Exécute le pipeline complet (cf. Code/pipeline.py) : chaque étape est mise en cache
+    sur disque, seules les étapes dont le code, les paramètres ou l'amont ont changé
+    sont recalculées.
 
-    # ✅ Étape 5.2 : fusion avec les vues (Black–Litterman)
-    mu_post, cov_post = compute_posterior(pi, cov_matrix, P, q, tau=0.05)
- 
-    # ✅ Étape 5.3 : génération des rendements simulés
-    simulated_bl_returns = generate_posterior_returns(mu_post, cov_post, n_sim=1000)
+    bl_mode : "scenarios" (Black–Litterman appliqué aux scénarios de la copule par entropy pooling)
+              ou "gaussian" (simulation gaussienne de la loi a posteriori BL)
+    vine_mode : "full" (sélection complète, défaut), "auto" (structure de la Vine en cache
+                réutilisée si elle existe et n'est pas périmée), "refit" ou "load", cf. VineService.fit
+    warm_start : démarrage à chaud des GARCH depuis GARCH_PARAMS_PATH (mis à jour à chaque
+                 ajustement). Avec warm_start ou un vine_mode autre que "full", les sorties
+                 dépendent de l'état persisté, haché dans les clés du cache du pipeline
+    params : autres paramètres du pipeline (cf. DEFAULT_PARAMS, ex. {"tau": 0.1, "alpha": 0.05,
+             "tickers": ["BNP", "LVMH"], "start": "2015-01-01"})
+    profile : None, "cprofile" ou "pyinstrument" (profil de chaque étape recalculée)
+    plots : écrit les graphiques dans output_dir/figures (cf. save_figures)
+    output_dir : dossier des poids optimisés, des graphiques et des rapports
+    report_path : chemin du rapport d'exécution (défaut : output_dir/reports/run-<date>.json)
+    resample : None ou dict de paramètres de resample_weights (n_resamples, n_jobs, config) :
+               poids rééchantillonnés avec bandes de confiance (cf. Code/resampling.py) ;
+               alpha, solver, n_sim, risk_aversion et lambda_cvar sont repris des paramètres
+               du pipeline. Les tirages suivent la loi a posteriori gaussienne (mu_post,
+               cov_post), comme bl_mode="gaussian", et non les scénarios de la copule
+               repondérés par entropy pooling de bl_mode="scenarios"
 
-    # Résultats
-    print("\n Moyennes postérieures des rendements (BL):")
-    print(mu_post)
+    Un rapport d'exécution JSON (durées, mémoire, tailles des sorties, statuts des solveurs,
+    convergence GARCH, vraisemblance de la Vine) est écrit à chaque exécution.
+    """
+    from Code.pipeline import pipeline, DEFAULT_PARAMS
+    from Code.instrumentation import RunRecorder
+
+    unknown = sorted(set(params or {}) - set(DEFAULT_PARAMS))
+    if unknown:
+        raise ValueError(f"Paramètres du pipeline inconnus : {unknown}")
+    params = {"bl_mode": bl_mode, "vine_mode": vine_mode, "store_dir": PRICE_STORE_DIR,
+              "files": PRICE_FILES, "garch_params_path": GARCH_PARAMS_PATH if warm_start else None,
+              "vine_cache_dir": VINE_CACHE_DIR, **(params or {})}
+    recorder = RunRecorder(profile=profile, profile_dir=os.path.join(output_dir, "reports", "profiles"))
+    # seules les sorties affichées sont demandées : les étapes amont en cache (Vine, GARCH,
+    # marges) ne sont alors ni relues ni importées
+    results = pipeline.run(params, targets=SUMMARY_STAGES, recorder=recorder)
 
-    print("\n Simulation Black–Litterman – Top 5 observations :")
-    df_bl = pd.DataFrame(simulated_bl_returns, columns=returns_matrix.columns)
-    print(df_bl.head())
+    print("\n Aperçu des pseudo-observations (top 5 lignes) :")
+    print(results["pseudo_obs"].head())
+
+    print("\n Aperçu des rendements simulés (top 5 lignes) :")
+    print(results["simulate"].head())
+
+    print("\n Prévision VECM (t+1) effectuée :")
+    print(results["vecm"])
+
+    print("\n Vecteur q (attentes sur les actifs) :")
+    print(results["views"]["q"])
 
+    print("\n Moyennes postérieures des rendements (BL):")
+    print(results["black_litterman"]["mu_post"])
 
+    weights_df = results["optimize"]["weights"]
+    metrics = results["optimize"]["metrics"]
     print("\n Étape 7 : optimisation de portefeuille selon plusieurs critères de risque-rendement.")
+    print(weights_df.round(4))
+
+    sharpe = metrics["Max Sharpe"]
+    print(f"\n Max Sharpe -> Rendement attendu : {sharpe['return']:.4%}, Risque attendu : {sharpe['risk']:.4%}, "
+          f"Sharpe Ratio : {sharpe['return'] / sharpe['risk']:.2f}")
+    print(f" Min CVaR   -> CVaR ({params.get('alpha', 0.01):.0%}) estimée : {metrics['Min CVaR']['cvar']:.4%}")
+    starr = metrics["Max STARR"]
+    print(f" Max STARR  -> Rendement attendu : {starr['return']:.4%}, CVaR estimée : {starr['cvar']:.4%}, "
+          f"STARR Ratio : {starr['return'] / starr['cvar']:.2f}")
+
+    print("\n Cache du pipeline (hit = sortie relue, miss = étape recalculée) :")
+    report = pipeline.report()
+    print(report[["status", "seconds"]].round(3))
+    print(f" {int((report['status'] == 'hit').sum())} hits, {int((report['status'] == 'miss').sum())} miss")
+
+    os.makedirs(output_dir, exist_ok=True)
+    weights_path = os.path.join(output_dir, "weights_optimisés.csv")
+    weights_df.to_csv(weights_path)
+    print(f"\n Sauvegarde des poids optimisés dans '{weights_path}' terminée.")
+
+    from Code.risk_analytics import evaluate_portfolios
 
-    # Sharpe
-    w_sharpe, ret_sharpe, risk_sharpe = max_sharpe_portfolio(df_bl.values)
-    print("\n Portefeuille optimisé selon le ratio de Sharpe maximal :")
-    for asset, w in zip(df_bl.columns, w_sharpe):
-        print(f"{asset:<10}: {w:.4f}")
-    print(f"  -> Rendement attendu : {ret_sharpe:.4%}")
-    print(f"  -> Risque attendu    : {risk_sharpe:.4%}")
-    print(f"  -> Sharpe Ratio      : {ret_sharpe / risk_sharpe:.2f}")
-
-    # CVaR
-    w_cvar, cvar_value = min_cvar_portfolio(df_bl.values, alpha=0.01)
-    print("\n Portefeuille minimisant la CVaR à 1% :")
-    for asset, w in zip(df_bl.columns, w_cvar):
-        print(f"{asset:<10}: {w:.4f}")
-    print(f"  -> CVaR (1%) estimée : {cvar_value:.4%}")
-
-    # STARR
-    w_starr, ret_starr, cvar_starr = max_starr_portfolio(df_bl.values, alpha=0.01)
-    print("\n Portefeuille maximisant le ratio STARR (Sharpe/CVaR) :")
-    for asset, w in zip(df_bl.columns, w_starr):
-        print(f"{asset:<10}: {w:.4f}")
-    print(f"  -> Rendement attendu : {ret_starr:.4%}")
-    print(f"  -> CVaR estimée      : {cvar_starr:.4%}")
-    print(f"  -> STARR Ratio       : {ret_starr / cvar_starr:.2f}")
-
-    # Regrouper les poids dans un DataFrame
+    bl = results["black_litterman"]
+    risk = evaluate_portfolios(bl["scenarios"].to_numpy(), weights_df, alpha=params.get("alpha", 0.01),
+                               probs=bl["probs"], horizon=RISK_HORIZON, seed=params.get("seed", 0))
+    print(f"\n Mesures de risque sur les scénarios Black–Litterman (richesse et drawdown à {RISK_HORIZON} jours) :")
+    print(risk.round(4))
+    risk_path = os.path.join(output_dir, "risk_metrics.csv")
+    risk.to_csv(risk_path)
+    print(f" Sauvegarde dans '{risk_path}'.")
+
+    if resample is not None:
+        from Code.resampling import resample_weights, RESAMPLE_PARAMS
+
+        # mêmes paramètres que l'optimisation du pipeline (alpha, solveur, n_sim, aversions)
+        resolved = {**DEFAULT_PARAMS, **params}
+        resample = {**resample, "config": {**{key: resolved[key] for key in RESAMPLE_PARAMS},
+                                           **resample.get("config", {})}}
+        bl = results["black_litterman"]
+        resampled = resample_weights(bl["mu_post"], bl["cov_post"], seed=resolved["seed"],
+                                     columns=bl["scenarios"].columns, **resample)
+        print(f"\n Poids rééchantillonnés ({len(resampled['samples'])} tirages de la loi a posteriori "
+              f"gaussienne Black–Litterman) :")
+        print(resampled["summary"].round(4))
+        resampled_path = os.path.join(output_dir, "weights_resampled.csv")
+        resampled["summary"].to_csv(resampled_path)
+        print(f" Sauvegarde dans '{resampled_path}'.")
+
+    if plots:
+        for path in save_figures(results, output_dir):
+            print(f" Graphique : {path}")
+
+    print(f" Rapport d'exécution : {recorder.write(report_path, os.path.join(output_dir, 'reports'))}")
+    return results
+
+def main_incremental(state_dir=STATE_DIR, seed=0):
+    """
+    Mode incrémental : intègre uniquement les nouvelles lignes de prix à l'état persisté
+    (GARCH prolongé d'un pas, Vine avec structure conservée, VECM avec coefficients stockés),
+    puis recalcule l'allocation Black–Litterman. seed : graine des scénarios de la Vine.
+    """
+    import numpy as np
+    import pandas as pd
+
+    from Code.price_store import PriceStore
+    from Code.scenario_service import ScenarioService
+    from Code.vecm_views import generate_views
+    from Code.black_litterman import compute_equilibrium_return, scenario_posterior
+    from Code.optimization import max_sharpe_portfolio, min_cvar_portfolio, max_starr_portfolio
+    from Code.incremental import initialize_state, load_state, update_state
+
+    _ignore_library_warnings()
+    store = PriceStore.open_or_ingest(PRICE_STORE_DIR, "Data/", PRICE_FILES)
+    price_data = store.closes()
+
+    if load_state(state_dir) is None:
+        print("\n Aucun état trouvé : ajustement complet initial.")
+        initialize_state(price_data, state_dir)
+
+    update = update_state(state_dir, price_data)
+    print(f"\n État mis à jour jusqu'au {update['prices'].index[-1].date()} "
+          f"(ré-estimations complètes : {', '.join(update['refits']) or 'aucune'}).")
+
+    prices = update["prices"]
+    P, q = generate_views(prices.iloc[-1], update["forecast"])
+
+    returns_matrix = np.log(prices / prices.shift(1)).dropna()
+    cov_matrix = returns_matrix.cov().values
+    market_weights = np.ones(len(returns_matrix.columns)) / len(returns_matrix.columns)
+    pi = compute_equilibrium_return(cov_matrix, market_weights, delta=2.5)
+    # même état (Vine, volatilités) et même graine : scénarios relus depuis le cache
+    sim_returns = ScenarioService(SCENARIO_CACHE_DIR, dtype=np.float64).vine_scenarios(
+        update["vine"], update["sigmas"], n_sim=1000, seed=seed)
+    scenarios, probs = scenario_posterior(np.asarray(sim_returns, dtype=float), pi, cov_matrix, P, q, tau=0.05)
+    df_bl = pd.DataFrame(scenarios, columns=returns_matrix.columns)
+
+    w_sharpe, _, _ = max_sharpe_portfolio(df_bl.values, probs=probs)
+    w_cvar, _ = min_cvar_portfolio(df_bl.values, alpha=0.01, probs=probs)
+    w_starr, _, _ = max_starr_portfolio(df_bl.values, alpha=0.01, probs=probs)
     weights_df = pd.DataFrame({
         "Max Sharpe": w_sharpe,
         "Min CVaR": w_cvar,
         "Max STARR": w_starr
     }, index=df_bl.columns)
+    print(weights_df.round(4))
+    weights_df.to_csv(os.path.join(OUTPUT_DIR, "weights_optimisés.csv"))
+
+def main_backtest(checkpoint_dir=BACKTEST_DIR):
+    """
+    Backtest walk-forward (fenêtre glissante, rebalancement mensuel) sur toute la base de prix.
+    Un backtest interrompu reprend aux dates non encore calculées.
+    """
+    from Code.price_store import PriceStore
+    from Code.backtest import run_backtest
+
+    _ignore_library_warnings()
+    store = PriceStore.open_or_ingest(PRICE_STORE_DIR, "Data/", PRICE_FILES)
+    results = run_backtest(store, checkpoint_dir)
+
+    pnl = results["pnl"]
+    print("\n P&L cumulé par stratégie :")
+    print(((1 + pnl).prod() - 1).map("{:.2%}".format))
+    print("\n Turnover moyen par rebalancement :")
+    print(results["turnover"].mean().round(3))
+    print(f"\n Résultats sauvegardés dans '{checkpoint_dir}'.")
+
+def _parse_value(text):
+    """
+    Valeur d'un --set KEY=VALUE : JSON si possible (nombres, listes, null), sinon chaîne.
+    """
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return text
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Allocation Black–Litterman à copules Vine (sans interface graphique)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--incremental", action="store_true", help="mise à jour incrémentale de l'état persisté")
+    mode.add_argument("--backtest", action="store_true", help="backtest walk-forward avec reprise")
+
+    universe = parser.add_argument_group("univers et dates")
+    universe.add_argument("--tickers", nargs="+", help="sous-univers d'actifs (défaut : toute la base)")
+    universe.add_argument("--start", help="première date incluse (AAAA-MM-JJ)")
+    universe.add_argument("--end", help="dernière date incluse (AAAA-MM-JJ)")
+
+    model = parser.add_argument_group("paramètres du pipeline (cf. Code/pipeline.py, DEFAULT_PARAMS)")
+    model.add_argument("--config", help="fichier JSON de paramètres du pipeline")
+    model.add_argument("--set", action="append", default=[], metavar="CLÉ=VALEUR",
+                       help="paramètre du pipeline (valeur JSON), répétable")
+    model.add_argument("--bl-mode", choices=["scenarios", "gaussian"], default="scenarios")
+    model.add_argument("--vine-mode", choices=["auto", "full", "refit", "load"], default="full")
+    model.add_argument("--warm-start", action="store_true",
+                       help="GARCH démarrés depuis les paramètres du dernier ajustement")
+    model.add_argument("--garch-engine", choices=["arch", "numpy"])
+    model.add_argument("--n-sim", type=int)
+    model.add_argument("--seed", type=int)
+    model.add_argument("--alpha", type=float)
+    model.add_argument("--tau", type=float)
+    model.add_argument("--solver", choices=["cvxpy", "lp"])
+    model.add_argument("--risk-aversion", type=float)
+    model.add_argument("--lambda-cvar", type=float)
+    model.add_argument("--cov-model", choices=["sample", "pca", "ledoit_wolf"])
+    model.add_argument("--n-factors", type=int)
+
+    resampling = parser.add_argument_group(
+        "rééchantillonnage (cf. Code/resampling.py)",
+        "tirages de la loi a posteriori gaussienne Black–Litterman (modèle de --bl-mode gaussian, "
+        "même avec --bl-mode scenarios) ; alpha, solveur, n-sim et aversions repris du pipeline")
+    resampling.add_argument("--resample", type=int, metavar="N", help="nombre de rééchantillonnages")
+    resampling.add_argument("--resample-strategy", choices=["max_sharpe", "min_cvar", "max_starr"],
+                            default="max_sharpe")
+    resampling.add_argument("--jobs", type=int, help="processus du rééchantillonnage (défaut : nombre de coeurs)")
+
+    output = parser.add_argument_group("sorties")
+    output.add_argument("--output-dir", default=OUTPUT_DIR)
+    output.add_argument("--report", help="chemin du rapport d'exécution JSON")
+    output.add_argument("--plots", action="store_true", help="écrit les graphiques (PNG) dans OUTPUT_DIR/figures")
+    output.add_argument("--profile", nargs="?", const="cprofile", choices=["cprofile", "pyinstrument"],
+                        help="profil de chaque étape recalculée (défaut : cprofile)")
+    return parser.parse_args(argv)
 
-    weights_df.to_csv("output/weights_optimisés.csv")
-    print("\n Sauvegarde des poids optimisés dans 'output/weights_optimisés.csv' terminée.")
+def params_from_args(args):
+    """
+    Paramètres du pipeline : fichier --config, puis options explicites, puis --set.
+    """
+    params = {}
+    if args.config:
+        with open(args.config) as f:
+            params.update(json.load(f))
+    options = {"tickers": args.tickers, "start": args.start, "end": args.end, "garch_engine": args.garch_engine,
+               "n_sim": args.n_sim, "seed": args.seed, "alpha": args.alpha, "tau": args.tau, "solver": args.solver,
+               "risk_aversion": args.risk_aversion, "lambda_cvar": args.lambda_cvar,
+               "cov_model": args.cov_model, "n_factors": args.n_factors}
+    params.update({key: value for key, value in options.items() if value is not None})
+    for item in args.set:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise SystemExit(f"--set attend CLÉ=VALEUR : {item}")
+        params[key] = _parse_value(value)
+    return params
 
-    print("\n Ouverture du rapport final contenant les visualisations graphiques.")
-    pdf_path = os.path.abspath("output/Rapport_Visualisations.pdf")
-    os.startfile(pdf_path)
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    args = parse_args()
+    if args.incremental:
+        main_incremental(seed=args.seed if args.seed is not None else 0)
+    elif args.backtest:
+        main_backtest()
+    else:
+        resample = None
+        if args.resample:
+            resample = {"n_resamples": args.resample, "n_jobs": args.jobs,
+                        "config": {"strategy": args.resample_strategy}}
+        main(args.bl_mode, args.vine_mode, params_from_args(args), profile=args.profile, plots=args.plots,
+             output_dir=args.output_dir, report_path=args.report, resample=resample, warm_start=args.warm_start)
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from Code.black_litterman import entropy_pooling
+from Code.cvar_solver import _solve_restricted_lp, portfolio_cvar, solve_max_starr, solve_min_cvar
+
+
+@pytest.fixture(scope="module")
+def pooled_scenarios():
+    """
+    Scénarios t de Student et probabilités d'entropy pooling (vues : +0.5 écart-type sur
+    chaque actif) : les pires scénarios par nombre portent moins que alpha de la masse.
+    """
+    rng = np.random.default_rng(0)
+    returns = rng.standard_t(4, (5000, 5)) * 0.01
+    probs = entropy_pooling(returns, np.eye(5), returns.mean(axis=0) + 0.5 * returns.std(axis=0))
+    return returns, probs
+
+
+@pytest.mark.parametrize("alpha", [0.01, 0.05])
+def test_min_cvar_with_pooled_probabilities(pooled_scenarios, alpha):
+    returns, probs = pooled_scenarios
+    w, cvar = solve_min_cvar(returns, alpha=alpha, probs=probs)
+
+    # référence : LP de Rockafellar–Uryasev sur tous les scénarios
+    w_full, _ = _solve_restricted_lp(returns, probs, np.zeros(returns.shape[1]), 1.0, alpha, (0.0, 1.0))
+    cvar_full, _ = portfolio_cvar(returns, w_full, alpha, probs)
+
+    assert w.sum() == pytest.approx(1.0)
+    assert cvar == pytest.approx(cvar_full, rel=1e-8)
+
+
+@pytest.mark.parametrize("alpha", [0.01, 0.05])
+def test_max_starr_with_pooled_probabilities(pooled_scenarios, alpha):
+    returns, probs = pooled_scenarios
+    mu = probs @ returns
+    w, mean_return, cvar = solve_max_starr(returns, alpha=alpha, lambda_cvar=10, probs=probs)
+
+    w_full, _ = _solve_restricted_lp(returns, probs, mu, 10, alpha, (0.0, 1.0))
+    cvar_full, _ = portfolio_cvar(returns, w_full, alpha, probs)
+
+    assert mean_return - 10 * cvar == pytest.approx(mu @ w_full - 10 * cvar_full, rel=1e-8, abs=1e-12)